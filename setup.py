@@ -53,6 +53,7 @@ setup(name='thedom',
       requires=['pies'],
       install_requires=['pies>=2.5.5'],
       cmdclass={'test': PyTest},
+      entry_points={'console_scripts': ['thedom-precompile = thedom.Precompile:main']},
       keywords='Web, Python, Python2, Python3, Dom, HTML, Library, Parser',
       classifiers=['Development Status :: 6 - Mature',
                    'Intended Audience :: Developers',
@@ -828,6 +828,97 @@ thedom.remove = function(element)
     return true;
 }
 
+//returns the element found by following 'path' (a list of child element indexes and element ids) from 'root'
+thedom.patchTarget = function(root, path)
+{
+    var element = thedom.get(root);
+    for(var step = 0; step < path.length; step++)
+    {
+        if(typeof(path[step]) == "string")
+        {
+            element = thedom.get(path[step]);
+        }
+        else
+        {
+            element = element.children[path[step]];
+        }
+    }
+    return element;
+}
+
+//applies a list of patch operations (as produced server side by thedom.Diff) to the html contained in 'root',
+//returning the elements whose html was replaced
+thedom.applyPatch = function(root, patch)
+{
+    var root = thedom.get(root);
+    var updated = [];
+    thedom.forEach(patch, function(operation)
+    {
+        var element = thedom.patchTarget(root, operation[1]);
+        if(operation[0] == "replace")
+        {
+            element.insertAdjacentHTML('beforebegin', operation[2]);
+            updated.push(element.previousElementSibling);
+            element.parentNode.removeChild(element);
+        }
+        else if(operation[0] == "content")
+        {
+            element.innerHTML = operation[2];
+            updated.push(element);
+        }
+        else if(operation[0] == "attribute")
+        {
+            element.setAttribute(operation[2], operation[3]);
+        }
+        else if(operation[0] == "removeAttribute")
+        {
+            element.removeAttribute(operation[2]);
+        }
+        else if(operation[0] == "insert")
+        {
+            var sibling = element.children[operation[2]];
+            if(sibling)
+            {
+                sibling.insertAdjacentHTML('beforebegin', operation[3]);
+                updated.push(sibling.previousElementSibling);
+            }
+            else
+            {
+                element.insertAdjacentHTML('beforeend', operation[3]);
+                updated.push(element.lastElementChild);
+            }
+        }
+        else if(operation[0] == "remove")
+        {
+            element.parentNode.removeChild(element);
+        }
+        else if(operation[0] == "move")
+        {
+            var child = element.children[operation[2]];
+            element.removeChild(child);
+            element.insertBefore(child, element.children[operation[3]] || null);
+        }
+    });
+    return updated;
+}
+
+//replaces the script tags within 'element' (or 'element' itself if it is one) so their scripts are ran
+thedom.runScripts = function(element)
+{
+    var element = thedom.get(element);
+    var scripts = element.tagName && element.tagName.toLowerCase() == "script" ? [element] :
+                  element.getElementsByTagName('script');
+    thedom.forEach(scripts, function(scr){
+            if(scr.innerHTML)
+            {
+                scriptTag = document.createElement('script');
+                scriptTag.type = "text/javascript"
+                thedom.replace(scr, scriptTag);
+                scriptTag.text = scr.innerHTML;
+            }
+        });
+}
+
 //clears the innerHTML of an element
 thedom.clear = function(element)
 {
@@ -3029,7 +3120,9 @@ var DynamicForm = DynamicForm || {};
 DynamicForm.RestClient = RestClient;
 DynamicForm.handlers = {};
 DynamicForm.loading = {};
+DynamicForm.rendered = {};
 DynamicForm.baseURL = '';
+DynamicForm.PATCH = 'application/x-thedom-patch+json';
 
 // Returns a serialized string representation of a single control
 DynamicForm.serializeControl = function(pageControl)
@@ -3070,6 +3163,10 @@ DynamicForm.serializeControls = function(pageControls, fresh)
         {
                 serializedHandlers.push("requestID=" + pageControl.id);
         }
+        if(DynamicForm.rendered[pageControl.id])
+        {
+                serializedHandlers.push("rendered=" + DynamicForm.rendered[pageControl.id]);
+        }
     }
     return serializedHandlers.concat([thedom.serializeElements(thedom.sortUnique(fields))]).join("&");
 }
@@ -3186,24 +3283,37 @@ DynamicForm._applyUpdates = function(xmlhttp, pageControls, lostConnection)
         {
             thedom.addClass(pageControl, "NoConnection");
             pageControl.innerHTML = "";
+            delete DynamicForm.rendered[pageControl.id];
             thedom.show(pageControl);
             thedom.hide(pageControl.id + ':Loading');
             continue;
         }
 
-        pageControl.innerHTML = response.responseText;
+        var contentType = response.contentType ||
+                          (response.getResponseHeader && response.getResponseHeader('Content-Type')) || '';
+        if(contentType.indexOf(DynamicForm.PATCH) == 0)
+        {
+            var update = JSON.parse(response.responseText);
+            DynamicForm.rendered[pageControl.id] = update.rendered;
+            if(update.patch)
+            {
+                thedom.applyPatch(pageControl, update.patch);
+            }
+            else
+            {
+                pageControl.innerHTML = update.html;
+            }
+        }
+        else
+        {
+            delete DynamicForm.rendered[pageControl.id];
+            pageControl.innerHTML = response.responseText;
+        }
         thedom.show(pageControl);
         thedom.hide(pageControl.id + ':Loading');
 
-        thedom.forEach(pageControl.getElementsByTagName('script'), function(scr){
-                if(scr.innerHTML)
-                {
-                    scriptTag = document.createElement('script');
-                    scriptTag.type = "text/javascript"
-                    thedom.replace(scr, scriptTag);
-                    scriptTag.text = scr.innerHTML;
-                }
-            });
+        // every script is ran again, even those the patch left unchanged (such as the one re-arming autoReload)
+        thedom.runScripts(pageControl);
         thedom.addPlaceholders(pageControl);
     }
 }
@@ -29,6 +29,7 @@ except ImportError:
 import gc
 import sys
 import time
+import types
 
 from thedom import DictUtils, UITemplate
 from thedom.All import DOM, Factory
@@ -126,6 +127,34 @@ def getBigTableGenerationTime():
     results['bigTable'] = time.time() - startTime
     results['bigTableSize'] = len(html)
 
+def memoryUsed(element):
+    """
+        Returns the number of bytes used by element and every object it references
+        (excluding shared objects such as classes, functions, and modules)
+    """
+    seen = set()
+    toMeasure = [element]
+    size = 0
+    while toMeasure:
+        measuring = toMeasure.pop()
+        if id(measuring) in seen or isinstance(measuring, (type, types.ModuleType, types.FunctionType,
+                                                           types.BuiltinFunctionType)):
+            continue
+        seen.add(id(measuring))
+        size += sys.getsizeof(measuring)
+        toMeasure.extend(gc.get_referents(measuring))
+    return size
+
+def getBigTableMemoryUsage():
+    rows = [dict(a=x, b='b', c=x * 2, d='d', e=x % 7) for x in xrange(10000)]
+    for product, result in (('Table', 'bigTableMemory'), ('CompactTable', 'compactTableMemory')):
+        table = Factory.build(product, 'bigTableTest')
+        table.addColumns(['a', 'b', 'c', 'd', 'e'])
+        table.addRows(rows)
+        results[result] = memoryUsed(table)
+        doneSection()
+    results['compactTableMemoryReduction'] = results['bigTableMemory'] / float(results['compactTableMemory'])
+
 def getNestedElementTime():
     startTime = time.time()
     rootElement = Node('root')
@@ -156,6 +185,9 @@ if __name__ == "__main__":
     gc.collect()
     doneSection()
     getBigTableGenerationTime()
+    gc.collect()
+    doneSection()
+    getBigTableMemoryUsage()
 
     print(".")
 
@@ -186,5 +218,10 @@ if __name__ == "__main__":
     print("    Html Size: " + str(results['bigTableSize'] / 1024.0 / 1024.0) + " MB")
     results['nestedGeneration'] = generationTime
 
+    print("######## Big table memory usage #########")
+    print("    A 5X10000 Table used: " + str(results['bigTableMemory'] / 1024.0 / 1024.0) + " MB")
+    print("    A 5X10000 CompactTable used: " + str(results['compactTableMemory'] / 1024.0 / 1024.0) + " MB")
+    print("    Reduction: " + str(results['compactTableMemoryReduction']) + "X")
+
     with open(".test_thedom_Benchmark.results", 'w') as resultFile:
         resultFile.write(str(pickle.dumps(results)))
@@ -27,6 +27,7 @@ except ImportError:
 
 from lxml import etree
 
+from thedom import Base
 from thedom.All import Factory
 from thedom.Base import Invalid, Node, TemplateElement
 from thedom.Resources import ScriptContainer
@@ -62,6 +63,62 @@ class TestNode(object):
         assert self.container.childElements[1] == addElement
         assert self.container.childElements[2] == addElement
 
+    def test_removeChild(self):
+        #Ensure children are tracked by identity through additions, replacements and removals
+        children = [self.container.add(Node()) for index in range(5)]
+        assert self.container.childElements.index(children[2]) == 3
+        assert Node() not in self.container.childElements
+
+        replacement = children[2].replaceWith(Node())
+        assert self.container.childElements.index(replacement) == 3
+        assert children[2] not in self.container.childElements
+
+        assert self.container.removeChild(children[0]) == children[0]
+        assert children[0].parent is None
+        assert self.container.removeChild(children[0]) is None
+        assert self.container.childElements.index(children[4]) == 4
+        assert list(self.container.childElements) == [self.firstChild, children[1], replacement, children[3],
+                                                      children[4]]
+
+        self.container.childElements.insert(0, children[0])
+        assert self.container.childElements.index(children[4]) == 5
+        del self.container.childElements[1:3]
+        assert list(self.container.childElements) == [children[0], replacement, children[3], children[4]]
+
+        #Ensure removing the same element added more than once only removes one occurrence
+        self.container.add(children[3], ensureUnique=False)
+        self.container.removeChild(children[3])
+        assert list(self.container.childElements) == [children[0], replacement, children[4], children[3]]
+
+        #Ensure the child collection survives pickling
+        container = pickle.loads(pickle.dumps(self.container, -1))
+        assert container.childElements.index(container.childElements[-1]) == 3
+
+    def test_extend(self):
+        #Ensure elements are moved from their previous parents in one go, keeping their order
+        otherContainer = Factory.build('Box', 'other')
+        moving = [otherContainer.add(Node()) for index in range(4)]
+        staying = otherContainer.childElements[1]
+        otherContainer.childElements.remove(staying)
+        otherContainer.childElements.append(staying)
+        created = Node()
+        added = self.container.extend([moving[0], moving[2], created, moving[3]])
+        assert added == [moving[0], moving[2], created, moving[3]]
+        assert list(self.container.childElements) == [self.firstChild] + added
+        assert list(otherContainer.childElements) == [moving[1]]
+        assert all(childElement.parent is self.container for childElement in added)
+
+        #Ensure elements are not added if the element does not allow children
+        assert self.firstChild.extend([Node()]) == []
+
+        #Ensure moving many children between parents is not quadratic
+        manyChildren = self.container.extend(Node() for index in range(20000))
+        for childElement in manyChildren:
+            otherContainer.add(childElement)
+        assert len(self.container.childElements) == 5
+        self.container.extend(manyChildren)
+        assert len(otherContainer.childElements) == 1
+
     def test_editable(self):
         self.firstChild.setEditable(False)
         self.container.setEditable(False)
@@ -195,6 +252,18 @@ class TestNode(object):
         assert self.container.startTag() == '<div name="1" id="1">'
         assert self.firstChild.startTag() == '<input name="2" id="2" type="text" />'
 
+    def test_startTagAttributes(self):
+        """Test to ensure startTag() serializes static and dynamic attributes correctly"""
+        self.firstChild.attributes['title'] = 'Say "<hi>" & bye'
+        self.firstChild.attributes['autofocus'] = '_EMPTY_'
+        assert ' title="Say &quot;&lt;hi&gt;&quot; &amp; bye"' in self.firstChild.startTag()
+        assert ' autofocus ' in self.firstChild.startTag()
+
+        scriptContainer = ScriptContainer()
+        assert scriptContainer.startTag() == '<script language="javascript" type="text/javascript">'
+        scriptContainer.attributes['type'] = 'text/x-template'
+        assert scriptContainer.startTag() == '<script language="javascript" type="text/x-template">'
+
     def test_endTag(self):
         """Test to ensure endTag() works correctly"""
         self.container._tagName = 'div'
@@ -212,6 +281,228 @@ class TestNode(object):
                                           ' name="2" id="2" type="text" /></div>'
         assert self.firstChild.toHTML({}) == '<input name="2" id="2" type="text" />'
 
+    def test_toHTMLFormatted(self):
+        """Test to ensure toHTML(formatted=True) indents each line once, based on its depth"""
+        outer = Factory.build('Box')
+        inner = outer.add(Factory.build('Box'))
+        inner += Factory.build('Textbox', 't')
+        inner += Factory.build('StraightHTML').setProperties({'html':"a\n\nb"})
+
+        assert outer.toHTML(True) == ('<div>\n'
+                                      ' <div>\n'
+                                      '  <input name="t" id="t" type="text" />\n'
+                                      '  a\n'
+                                      '  b\n'
+                                      ' </div>\n'
+                                      '</div>')
+        assert outer.content(True) == "\n".join(outer.toHTML(True).split("\n")[1:-1])
+
+    def test_iterHTML(self):
+        """Test to ensure iterHTML() streams the same html toHTML() returns"""
+        layout = self.container.add(Factory.build('Horizontal'))
+        layout += Factory.build('Label').setProperties({'text':"multiple\n\nlines"})
+        layout += Factory.build('Textbox', '3')
+        self.container += Factory.build('StraightHTML').setProperties({'html':"<b>\n raw</b>"})
+
+        for formatted in (False, True):
+            chunks = list(self.container.iterHTML(formatted, chunkSize=10))
+            assert len(chunks) > 1
+            assert "".join(chunks) == self.container.toHTML(formatted)
+            assert list(self.container.iterHTML(formatted, chunkSize=100000)) == [self.container.toHTML(formatted)]
+
+    def test_toHTMLDeepNesting(self):
+        """Test to ensure toHTML() renders trees nested deeper than a recursive renderer could"""
+        element = self.container
+        for level in range(800):
+            element = element.add(Factory.build('Box'))
+        element += Factory.build('Textbox', 'deepest')
+
+        html = self.container.toHTML()
+        assert html.count('<div') == html.count('</div>') == 801
+        assert html.endswith('type="text" />' + '</div>' * 801)
+        assert "".join(self.container.iterHTML()) == html
+
+    def test_memoized(self):
+        """Test to ensure memoized elements only re-render what changed since the last render"""
+        from thedom.Base import renderCacheStats
+
+        unchanged = self.container.add(Factory.build('Box', 'unchanged'))
+        unchanged += Factory.build('Textbox', 'unchangedChild')
+        self.container.setMemoized(True)
+        assert self.container.memoized() and self.firstChild.memoized()
+
+        html = self.container.toHTML()
+        misses = renderCacheStats['misses']
+        hits = renderCacheStats['hits']
+        assert self.container.toHTML() == html
+        assert renderCacheStats['hits'] == hits + 1
+        assert renderCacheStats['misses'] == misses
+
+        self.firstChild.addClass('changed')
+        assert 'class="changed"' in self.container.toHTML()
+        assert renderCacheStats['misses'] == misses + 2
+        assert renderCacheStats['hits'] == hits + 2
+
+        label = self.container.add(Factory.build('Label'))
+        assert label.memoized()
+        label.setText('new text')
+        assert self.container.toHTML().endswith('new text</label></div>')
+
+        self.container.setPrefix('prefix-')
+        assert 'id="prefix-unchangedChild"' in self.container.toHTML()
+
+        self.container.setMemoized(False)
+        assert not unchanged.memoized()
+
+    def test_memoizedChanges(self):
+        """Test to ensure memoized html is discarded when attributes, classes, or style change - not when read"""
+        from thedom.Base import renderCacheStats
+
+        self.container.setMemoized(True)
+        assert Base._memoizing
+        html = self.container.toHTML()
+        misses = renderCacheStats['misses']
+        assert self.firstChild.attributes['type'] == 'text' and not self.firstChild.classes and not self.firstChild.style
+        assert self.container.toHTML() == html
+        assert renderCacheStats['misses'] == misses
+
+        self.firstChild.attributes['title'] = 'changed'
+        assert 'title="changed"' in self.container.toHTML()
+        self.firstChild.classes.add('changed')
+        assert 'class="changed"' in self.container.toHTML()
+        self.firstChild.style['color'] = 'red'
+        assert 'style="color:red"' in self.container.toHTML()
+        del self.firstChild.style['color']
+        assert 'style=' not in self.container.toHTML()
+
+        copy = pickle.loads(pickle.dumps(self.container, -1))
+        copy.childElements[0].classes.discard('changed')
+        assert 'class="changed"' not in copy.toHTML()
+
+        self.container.setMemoized(False)
+        copy.setMemoized(False)
+        assert self.container not in Base._memoized and copy not in Base._memoized
+        assert Base._memoizing == bool(Base._memoized)
+
+    def test_memoizedMove(self):
+        """Test to ensure memoized elements moved to a new parent render using the prefix they now inherit"""
+        first = Factory.build('Box')
+        first.setPrefix('a')
+        second = Factory.build('Box')
+        second.setPrefix('b')
+        moved = first.add(Factory.build('Label', 'x'))
+        first.setMemoized(True)
+        second.setMemoized(True)
+        assert first.toHTML() == '<div><label id="ax"></label></div>'
+
+        second.add(moved)
+        assert first.toHTML() == '<div></div>'
+        assert second.toHTML() == '<div><label id="bx"></label></div>'
+
+        first.extend([moved])
+        assert first.toHTML() == '<div><label id="ax"></label></div>'
+
+        replaced = second.add(Factory.build('Box'))
+        assert second.toHTML() == '<div><div></div></div>'
+        replaced.replaceWith(moved)
+        assert second.toHTML() == '<div><label id="bx"></label></div>'
+
+    def test_memoizedChildElements(self):
+        """Test to ensure memoized html is discarded when child elements are changed directly"""
+        box = Factory.build('Box')
+        box.setMemoized(True)
+        assert box.toHTML() == '<div></div>'
+
+        first = Factory.build('Box', 'first')
+        box.childElements.append(first)
+        assert box.toHTML() == '<div><div id="first"></div></div>'
+        second = Factory.build('Box', 'second')
+        box.childElements.insert(0, second)
+        assert box.toHTML() == '<div><div id="second"></div><div id="first"></div></div>'
+        box.childElements.reverse()
+        assert box.toHTML() == '<div><div id="first"></div><div id="second"></div></div>'
+        box.childElements.sort(key=lambda childElement: childElement.id, reverse=True)
+        assert box.toHTML() == '<div><div id="second"></div><div id="first"></div></div>'
+        box.childElements[0] = first
+        assert box.toHTML() == '<div><div id="first"></div><div id="first"></div></div>'
+        box.childElements.pop()
+        assert box.toHTML() == '<div><div id="first"></div></div>'
+        del box.childElements[:]
+        assert box.toHTML() == '<div></div>'
+
+        box.childElements.extend([first, second])
+        copy = pickle.loads(pickle.dumps(box, -1))
+        assert copy.childElements.owner is copy
+        copy.childElements.remove(copy.childElements[0])
+        assert copy.toHTML() == '<div><div id="second"></div></div>'
+        box.setMemoized(False)
+        copy.setMemoized(False)
+
+    def test_memoizedRenderHooks(self):
+        """Test to ensure memoized elements that emit signals or add javascript events while rendering stay memoized"""
+        from thedom.Base import renderCacheStats
+
+        class Clickable(Node):
+            __slots__ = ()
+            tagName = 'span'
+
+            def _render(self):
+                self.addJavascriptEvent('onclick', "alert('clicked')")
+                self.emit('rendered')
+
+        clickable = self.container.add(Clickable())
+        self.container.setMemoized(True)
+        html = self.container.toHTML()
+        formattedHTML = self.container.toHTML(formatted=True)
+        misses = renderCacheStats['misses']
+        assert self.container.toHTML() == html
+        assert self.container.toHTML(formatted=True) == formattedHTML
+        assert renderCacheStats['misses'] == misses
+        assert html.count("alert('clicked')") == 1
+
+        clickable.addJavascriptEvent('onclick', "alert('again')")
+        assert "alert('clicked');alert('again')" in self.container.toHTML()
+        clickable.removeJavascriptEvent('onclick', "alert('again')")
+        assert self.container.toHTML() == html
+        self.container.setMemoized(False)
+
+    def test_renderContext(self):
+        """
+            Test to ensure the render context resolves prefix, editable state, script container and request the
+            same way walking up the tree would, and is only current while the tree is being rendered
+        """
+        scripts = ScriptContainer()
+        self.container.setScriptContainer(scripts)
+        self.container.setPrefix('outer-')
+        inner = self.container.add(Factory.build('Box', 'inner'))
+        inner.setPrefix('inner-')
+        inner.setEditable(False)
+        deepest = inner.add(Factory.build('Box', 'deepest'))
+
+        seen = []
+        class Recorder(Node):
+            def content(self, formatted=False, *args, **kwargs):
+                seen.append((self.fullId(), self.editable(), self.scriptContainer(),
+                             Base.renderContext().request))
+                return ''
+        deepest.add(Recorder('recorder'))
+        self.container.add(Recorder('other'))
+
+        assert Base.renderContext() is None
+        html = self.container.toHTML(request='request')
+        assert 'id="inner-deepest"' in html
+        assert seen == [('inner-recorder', False, scripts, 'request'), ('outer-other', True, scripts, 'request')]
+        assert Base.renderContext() is None
+
+        del seen[:]
+        assert "".join(self.container.iterHTML(chunkSize=1)) == html
+        assert seen == [('inner-recorder', False, scripts, None), ('outer-other', True, scripts, None)]
+        assert Base.renderContext() is None
+
+        assert deepest.fullId() == 'inner-deepest'
+        assert not deepest.editable()
+        assert deepest.scriptContainer() is scripts
+
     def test_insertExportVariables(self):
         """
           Test to ensure inserting variables updates a webElement correctly,
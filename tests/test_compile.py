@@ -0,0 +1,258 @@
+'''
+    test_Compile.py
+
+    Tests the functionality of thedom/Compile.py
+
+    Copyright (C) 2015  Timothy Edmund Crosley
+
+    This program is free software; you can redistribute it and/or
+    modify it under the terms of the GNU General Public License
+    as published by the Free Software Foundation; either version 2
+    of the License, or (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program; if not, write to the Free Software
+    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+'''
+
+import os
+
+from thedom import Compile, UITemplate
+from thedom.All import Factory
+from thedom.Base import Node, TextNode
+from thedom.Compile import CompiledRenderer, CompiledTemplate
+from thedom.Factory import Composite
+
+TEMPLATE = UITemplate.fromSHPAML("""
+box
+    > label@title text=Hello
+    static
+        box
+            > label text=Static
+    > textbox#name value=World
+""")
+EXPECTED = Factory.buildFromTemplate(TEMPLATE).toHTML()
+
+
+def test_compiledTemplate():
+    """Ensure a compiled template builds the same structure the template describes"""
+    built = CompiledTemplate.create(TEMPLATE).build()
+    assert built.toHTML() == EXPECTED
+    assert built.title.text() == 'Hello'
+    assert built.name.value() == 'World'
+
+def test_cache(tmpdir):
+    """Ensure compiled templates are stored on disk, and reused instead of recompiled"""
+    cacheDirectory = str(tmpdir.join('cache'))
+    assert CompiledTemplate.create(TEMPLATE, cacheDirectory=cacheDirectory).build().toHTML() == EXPECTED
+    assert os.listdir(cacheDirectory) == [Compile.cacheKey(TEMPLATE) + Compile.CACHE_EXTENSION]
+
+    toPython = Compile.toPython
+    Compile.toPython = None
+    try:
+        assert CompiledTemplate.create(TEMPLATE, cacheDirectory=cacheDirectory).build().toHTML() == EXPECTED
+    finally:
+        Compile.toPython = toPython
+
+    #Ensure the key changes with the template structure and the set of products
+    otherTemplate = UITemplate.fromSHPAML("box\n    > label text=Hello\n")
+    assert Compile.cacheKey(otherTemplate) != Compile.cacheKey(TEMPLATE)
+    assert Compile.cacheKey(TEMPLATE, Composite((Factory, ))) == Compile.cacheKey(TEMPLATE)
+    extendedFactory = Composite((Factory, ))
+    extendedFactory.addProduct(type('Extra', (Node, ), {}))
+    assert Compile.cacheKey(TEMPLATE, extendedFactory) != Compile.cacheKey(TEMPLATE)
+
+    #Ensure corrupt cache entries are ignored and replaced
+    cacheFile = os.path.join(cacheDirectory, os.listdir(cacheDirectory)[0])
+    with open(cacheFile, 'wb') as openFile:
+        openFile.write(b'corrupt')
+    assert CompiledTemplate.create(TEMPLATE, cacheDirectory=cacheDirectory).build().toHTML() == EXPECTED
+    assert Compile.loadCode(cacheFile) is not None
+    assert len(os.listdir(cacheDirectory)) == 1
+
+def test_staticSubtrees():
+    """Ensure subtrees that can never change are pre-rendered, without changing the html produced"""
+    template = UITemplate.fromSHPAML("""
+box
+    > label@title text=Hello
+    horizontal
+        > label text=a
+        box
+            > label text='"b"'
+    box
+        > label text=c
+        > button text=go
+    layout-vertical
+        > label text=d
+        > textbox#name
+""")
+    compiled = CompiledTemplate.create(template, foldStatic=True)
+    assert compiled.staticSubtrees == ('box > horizontal', 'box > box > label')
+
+    unfolded = {}
+    exec(compile(Compile.toPython(template, foldStatic=False), '<string>', 'exec'), unfolded)
+    assert 'PreRendered(' not in Compile.toPython(template, foldStatic=False)
+
+    built = compiled.build()
+    expected = unfolded['build'](Factory)
+    assert built.toHTML() == expected.toHTML()
+    assert built.toHTML(formatted=True) == expected.toHTML(formatted=True)
+    assert built.title.text() == 'Hello'
+    assert built.name.tagName == 'input'
+    assert len(built.select('label')) == 2
+
+    #Ensure folding is opt-in, as the elements within folded subtrees are left out of the built tree
+    template = UITemplate.fromSHPAML("box\n    box class=row\n        > label class=hint text=Hint\n")
+    assert Compile.staticSubtrees(template) == ['box > box']
+    for built in (Factory.buildFromTemplate(template), CompiledTemplate.create(template).build()):
+        assert len(built.getChildElementsWithClass('hint')) == 1
+        assert len(built.select('.row')) == 1
+    assert CompiledTemplate.create(template).staticSubtrees == ()
+    assert 'PreRendered(' not in Compile.toPython(template)
+    assert len(CompiledTemplate.create(template, foldStatic=True).build().select('.row')) == 0
+
+def test_sharedSubtrees():
+    """Ensure identical subtrees are only folded where their parent allows it, even though they are shared"""
+    template = UITemplate.fromSHPAML("""
+box
+    box
+        > label text=d
+    layout-vertical
+        > label text=d
+        > textbox#name
+    box
+        > label text=d
+""")
+    interned = UITemplate.internTemplate(template)
+    assert interned.childElements[0] is interned.childElements[2]
+    assert interned.childElements[0].childElements[0] is interned.childElements[1].childElements[0]
+
+    compiled = CompiledTemplate.create(template, foldStatic=True)
+    assert compiled.staticSubtrees == ('box > box', 'box > box')
+    assert Compile.staticSubtrees(template) == ['box > box', 'box > box']
+    assert compiled.build().toHTML() == Compile.preRender(template).toHTML()
+    assert CompiledRenderer.create(template).render() == Compile.preRender(template).toHTML()
+
+def test_typedProperties():
+    """Ensure properties that compare equal but differ in type (True, 1 and 1.0) are never shared when compiling"""
+    for values in ((True, 1, 1.0), (False, 0, 0.0)):
+        template = UITemplate.Template('box', childElements=[UITemplate.Template('label', properties=[('text', value)])
+                                                             for value in values])
+        interned = UITemplate.internTemplate(template)
+        assert [child.properties[0][1] for child in interned.childElements] == list(values)
+        assert [type(child.properties[0][1]) for child in interned.childElements] == [bool, int, float]
+
+        expected = Factory.buildFromTemplate(template).toHTML()
+        assert CompiledTemplate.create(template).build().toHTML() == expected
+        assert CompiledRenderer.create(template).render() == expected
+
+    template = UITemplate.Template('box', childElements=[UITemplate.Template('label', properties=[('text', value)])
+                                                         for value in (True, 1, 1.0)])
+    assert CompiledRenderer.create(template).render() == \
+           '<div><label>True</label><label>1</label><label>1.0</label></div>'
+
+def test_unhashableProperties():
+    """Ensure templates built in code with list or dict property values can still be compiled"""
+    template = UITemplate.Template('box', childElements=[
+        UITemplate.Template('box', properties=[('javascriptEvents', {'onclick':"alert('a')"})]),
+        UITemplate.Template('box', properties=[('javascriptEvents', {'onclick':"alert('b')"})]),
+        UITemplate.Template('box', properties=[('javascriptEvents', {'onclick':"alert('a')"})]),
+        UITemplate.Template('select', properties=[('items', [('a', 'A')])])])
+    interned = UITemplate.internTemplate(template)
+    assert interned.childElements[0] is interned.childElements[2]
+    assert interned.childElements[0] is not interned.childElements[1]
+
+    expected = Factory.buildFromTemplate(template).toHTML()
+    assert "alert('a')" in expected and "alert('b')" in expected
+    assert CompiledTemplate.create(template).build().toHTML() == expected
+    assert CompiledRenderer.create(template).render() == expected
+
+def test_placedSubtrees():
+    """Ensure subtrees whose html depends on the prefix or editable state of their parent are never folded"""
+    template = UITemplate.fromSHPAML("""
+box
+    > table
+    > compacttable
+    > storedvalue value=1
+    > popupbutton
+    box
+        > label text=d
+""")
+    assert Compile.staticSubtrees(template) == ['box > box']
+    assert CompiledTemplate.create(template, foldStatic=True).staticSubtrees == ('box > box', )
+    assert CompiledRenderer.create(template).staticSubtrees == ('box > box', )
+    assert CompiledRenderer.create(template).render() == Compile.preRender(template).toHTML()
+
+    for prefix, editable in (('prefix-', True), (None, False), ('prefix-', False)):
+        built = CompiledTemplate.create(template, foldStatic=True).build()
+        expected = Compile.preRender(template)
+        for element in (built, expected):
+            element.setPrefix(prefix)
+            element.setEditable(editable)
+        assert built.toHTML() == expected.toHTML()
+
+def test_renderer():
+    """Ensure templates compiled to render html directly produce the same html as built templates"""
+    template = UITemplate.fromSHPAML("""
+box
+    > label@title text=Hello
+    horizontal
+        > label text=a
+    box
+        > label text=b
+        > button text=go
+        > textbox name=email
+    form
+        > textbox#name
+        | some text
+""")
+    renderer = CompiledRenderer.create(template)
+    built = CompiledTemplate.create(template).build()
+    assert renderer.render() == built.toHTML()
+    assert renderer.staticSubtrees == ('box > horizontal', 'box > box > label')
+
+    built.insertVariables({'name':'Tim', 'email':'tim@example.com'})
+    assert renderer.render(name='Tim', email='tim@example.com') == built.toHTML()
+    assert renderer.render() != built.toHTML()
+
+    #Ensure only the accessor bound and variable driven parts of the template are built on render
+    python = Compile.toRenderer(template)
+    assert python.count("def live") == 3
+    assert "button(" in python and "textbox(" in python and "horizontal(" not in python
+
+    #Ensure renderers and templates are cached separately
+    assert Compile.cacheKey(template, Factory, 'CompiledRenderer') != Compile.cacheKey(template, Factory)
+
+def test_foldedCache(tmpdir):
+    """Ensure folded code cached on disk is not reused once the html of a product it pre-rendered changes"""
+    cacheDirectory = str(tmpdir.join('cache'))
+    template = UITemplate.fromSHPAML("box\n    > badge\n")
+
+    def badge(text):
+        def _create(self, id=None, name=None, parent=None, **kwargs):
+            Node._create(self, id, name, parent, **kwargs)
+            self.add(TextNode(text))
+        return type('Badge', (Node, ), {'__slots__':(), 'tagName':'span', '_create':_create,
+                                        '__module__':'badges'})
+
+    first = Composite((Factory, ))
+    first.addProduct(badge('v1'))
+    assert CompiledRenderer.create(template, first, cacheDirectory=cacheDirectory).render() == \
+           '<div><span>v1</span></div>'
+
+    second = Composite((Factory, ))
+    second.addProduct(badge('v2'))
+    assert Compile.factorySignature(second) == Compile.factorySignature(first)
+    assert Compile.cacheKey(template, second) == Compile.cacheKey(template, first)
+    assert Compile.cacheKey(template, second, implementation=True) != \
+           Compile.cacheKey(template, first, implementation=True)
+    assert CompiledRenderer.create(template, second, cacheDirectory=cacheDirectory).render() == \
+           '<div><span>v2</span></div>'
+    assert CompiledTemplate.create(template, second, cacheDirectory=cacheDirectory,
+                                   foldStatic=True).build().toHTML() == '<div><span>v2</span></div>'
+    assert len(os.listdir(cacheDirectory)) == 3
@@ -20,7 +20,15 @@
     Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
 '''
 
-from thedom.Connectable import Connectable
+import gc
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from thedom import MethodUtils
+from thedom.Connectable import Connectable, bus, emitCounts
 
 
 class Value(Connectable):
@@ -117,3 +125,73 @@ class TestConnectable(object):
         self.value1.disconnect('valueChanged')
         self.value1.setValue('Still Wont')
         assert self.value2.value == 'It changes the value'
+
+    def test_dispatch(self):
+        #Ensure slots are resolved once when connected, not on every emit
+        self.value1.connect('valueChanged', None, self.value2, 'setValue')
+        connection = self.value1.connections['valueChanged'][0]
+        assert connection.method == self.value2.setValue and connection.arity == 1
+
+        acceptsArguments = MethodUtils.acceptsArguments
+        MethodUtils.acceptsArguments = None
+        try:
+            emitted = emitCounts.get('valueChanged', 0)
+            for value in range(10):
+                self.value1.setValue(value)
+            assert self.value2.value == 9
+            assert emitCounts['valueChanged'] == emitted + 20
+        finally:
+            MethodUtils.acceptsArguments = acceptsArguments
+
+        #Ensure connecting the same slot twice only calls it once
+        self.value1.connect('valueChanged', None, self.value2, 'setValue')
+        assert len(self.value1.emit('valueChanged', 'once')) == 1
+
+        #Ensure connections survive pickling, binding their slots again on first emit
+        value1, value2 = pickle.loads(pickle.dumps((self.value1, self.value2), -1))
+        value1.setValue('pickled')
+        assert value2.value == 'pickled'
+
+    def test_subscribe(self):
+        #Ensure many receivers can be subscribed at once through the signal bus
+        receivers = [Value(index) for index in range(5)]
+        self.value1.connect('valueChanged', None, self.value2, 'setValue')
+        self.value1.subscribe('valueChanged', receivers, 'setValue')
+        self.value1.subscribe('valueChanged', receivers[:2], 'setValue')
+        self.value1.subscribe('valueChanged', receivers[:1], 'setValue', 'Hello', 'Goodbye')
+        assert bus.count(self.value1) == 6
+
+        assert self.value1.emit('valueChanged', 'Hi') == [None] * 6
+        assert list(receiver.value for receiver in receivers) == ['Hi'] * 5 and self.value2.value == 'Hi'
+        self.value1.setValue('Hello')
+        assert receivers[0].value == 'Goodbye' and receivers[1].value == 'Hello'
+
+        self.value1.unsubscribe('valueChanged', receivers[1:3])
+        self.value1.setValue('Again')
+        assert list(receiver.value for receiver in receivers) == ['Again', 'Hello', 'Hello', 'Again', 'Again']
+
+        #Ensure receivers are only referenced weakly, and that subscriptions end with the emitter
+        del receivers[3:]
+        gc.collect()
+        assert bus.count(self.value1) == 2
+        self.value1.setValue('Collected')
+
+        self.value1 = None
+        gc.collect()
+        assert bus.count() == 0
+
+        self.value2.subscribe('valueChanged', receivers, 'setValue')
+        self.value2.unsubscribe()
+        assert self.value2 not in bus
+
+        #Ensure subscriptions are kept per emitter, so forgetting one leaves the others alone
+        emitters = [Value(index) for index in range(3)]
+        for emitter in emitters:
+            emitter.subscribe('valueChanged', receivers, 'setValue')
+        assert set(id(emitter) for emitter in emitters) <= set(bus.subscriptions)
+        emitters[0].unsubscribe('valueChanged', receivers[:1])
+        del emitters[1]
+        gc.collect()
+        assert bus.count(emitters[0]) == 2 and bus.count(emitters[1]) == 3
+        emitters[1].setValue('Kept')
+        assert receivers[0].value == 'Kept'
@@ -22,7 +22,8 @@
 
 from test_Base import ElementTester
 from thedom.All import Factory
-from thedom.DataViews import Table
+from thedom.DataViews import CompactTable, Table
+from thedom.IteratorUtils import Avg, Count, Sum
 
 
 class TestTable(ElementTester):
@@ -96,6 +97,18 @@ class TestTable(ElementTester):
         assert self.element.rows[1][0][0].text() == "Cell3"
         assert self.element.rows[1][1][0].text() == "Cell4"
 
+    def test_addSummaryRow(self):
+        rows = ({'Item':'Apple', 'Price':2}, {'Item':'Pear', 'Price':3}, {'Item':'Plum', 'Price':None})
+        self.element.addRows(rows)
+        summary = self.element.addSummaryRow(rows, Price=Sum('Price'), Item=Count('Item'))
+        assert summary.hasClass('WSummary')
+        assert self.element.rows[-1] is summary
+        assert summary.cell('Price').text() == "5"
+        assert summary.cell('Item').text() == "3"
+
+        summary = self.element.addSummaryRow((), Price=Avg('Price'))
+        assert summary.cell('Price').text() == ""
+
     def test_setCell(self):
         newRow = self.element.addRow()
         newRow.cell("Name").setText("Tim")
@@ -183,6 +196,36 @@ class TestTable(ElementTester):
         self.element.cell(1, "Location").setText("~/documents")
 
 
+class TestCompactTable(ElementTester):
+
+    def setup_method(self, element):
+        self.element = Factory.build("CompactTable", "Test")
+
+    def test_addRows(self):
+        rows = ((('Name', 'Tim'), ('Type', 'Developer <3')), {'Name':'Josh'}, (('Country', 'United States'), ))
+        self.element.addRows(rows)
+        assert self.element.columns == ['Name', 'Type', 'Country']
+        assert len(self.element.rows) == 3
+
+        table = Factory.build("Table", "Test")
+        table.addColumns(self.element.columns)
+        table.addRows(rows)
+        assert self.element.toHTML() == table.toHTML()
+        assert self.element.toHTML(formatted=True) == table.toHTML(formatted=True)
+
+    def test_cell(self):
+        self.element.addColumns(['Name', 'Type'])
+        self.element.addRow({'Name':'Tim'})
+        assert self.element.cell(0, 'Name').text() == "Tim"
+        assert self.element.cell(0, 'Type').text() == ""
+        assert self.element.cell(1, 'Name') is None
+
+        self.element.setCellText(0, 'Type', 'Developer')
+        assert self.element.cell(0, 'Type').text() == "Developer"
+        assert self.element.cell(0, 'Type').hasClass('TypeColumn')
+        assert 'Developer' in self.element.toHTML()
+
+
 class TestStoredValue(ElementTester):
 
     def setup_class(self):
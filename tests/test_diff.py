@@ -0,0 +1,107 @@
+'''
+    test_Diff.py
+
+    Tests the functionality of thedom/Diff.py
+
+    Copyright (C) 2015  Timothy Edmund Crosley
+
+    This program is free software; you can redistribute it and/or
+    modify it under the terms of the GNU General Public License
+    as published by the Free Software Foundation; either version 2
+    of the License, or (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program; if not, write to the Free Software
+    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+'''
+
+import json
+
+from thedom import Diff
+from thedom.All import Factory
+from thedom.Controllers import HTTP
+from thedom.Controllers.PageControls import ElementControl
+
+
+def test_snapshot():
+    """Ensure snapshots mirror the element structure of the html they are taken from"""
+    snapshot = Diff.snapshot('<div id="a" class="b">text<input name="c" /><br><table><tr><td>1</td></tr></table></div>')
+    assert len(snapshot.childElements) == 1
+
+    div = snapshot.childElements[0]
+    assert div.tagName == 'div'
+    assert div.attributes == {'id':'a', 'class':'b'}
+    assert [child.tagName for child in div.childElements] == ['input', 'br', 'table']
+    assert div.text() == [(0, 'text')]
+    assert div.childElements[0].outerHTML() == '<input name="c" />'
+
+    tableBody = div.childElements[2].childElements[0]
+    assert tableBody.tagName == 'tbody'
+    assert tableBody.outerHTML() == '<tbody><tr><td>1</td></tr></tbody>'
+
+def test_diff():
+    """Ensure diff returns the minimal set of operations needed to update the html"""
+    assert Diff.diff('<div id="a">1</div>', '<div id="a">1</div>') == []
+    assert Diff.diff('<div class="b">1</div>', '<div class="c" title="d">1</div>') == \
+                [['attribute', [0], 'class', 'c'], ['attribute', [0], 'title', 'd']]
+    assert Diff.diff('<div title="d">1</div>', '<div>2</div>') == \
+                [['removeAttribute', [0], 'title'], ['content', [0], '2']]
+    assert Diff.diff('<div><span>1</span></div>', '<div><b>1</b></div>') == [['replace', [0, 0], '<b>1</b>']]
+    assert Diff.diff('<table><tr><td>1</td></tr></table>', '<table><tr><td>2</td></tr></table>') == \
+                [['content', [0, 0, 0, 0], '2']]
+
+    assert Diff.diff('<ul><li id="a">a</li><li id="b">b</li></ul>', '<ul><li id="b">b!</li><li id="c">c</li></ul>') == \
+                [['remove', [0, 0]], ['insert', [0], 1, '<li id="c">c</li>'], ['content', ['b'], 'b!']]
+
+def test_diffKeyed():
+    """Ensure elements are matched by key when a keyAttribute is given, allowing them to be moved"""
+    rows = '<ul>%s</ul>'
+    old = rows % "".join('<li key="%d">%d</li>' % (index, index) for index in range(5))
+    new = rows % "".join('<li key="%d">%d</li>' % (index, index) for index in (1, 2, 3, 4, 0))
+    assert Diff.diff(old, new, 'key') == [['move', [0], 0, 4]]
+    assert len(Diff.diff(old, new)) == 10
+
+def test_diffNodes():
+    """Ensure Node trees can be diffed directly, and against a previously taken snapshot"""
+    container = Factory.build('Box', 'container')
+    label = container.add(Factory.build('Label', 'label'))
+    label.setText('before')
+    snapshot = Diff.snapshot(container)
+
+    label.setText('after')
+    assert Diff.diff(snapshot, container) == [['content', ['label'], 'after']]
+
+def test_diffedControl():
+    """Ensure diffed controls respond to AJAX requests with html until the html the client has is known, then patches"""
+    class Greeting(ElementControl):
+        diffed = True
+        greeting = 'Hello'
+
+        def initUI(self, ui, request):
+            ui.add(Factory.build('Label', 'greeting')).setText(self.greeting)
+
+    control = Greeting()
+
+    def request(**fields):
+        fields['requestHandler'] = control.baseName
+        return HTTP.Request(fields=fields, meta={'HTTP_X_REQUESTED_WITH':'XMLHttpRequest'})
+
+    response = control.handleRequest(request())
+    assert response.contentType == HTTP.Response.ContentType.PATCH
+    first = json.loads(response.content)
+    assert 'Hello' in first['html'] and 'patch' not in first
+
+    control.greeting = 'Goodbye'
+    second = json.loads(control.handleRequest(request(rendered=first['rendered'])).content)
+    assert 'html' not in second and second['rendered'] != first['rendered']
+    assert ['content', ['greeting'], 'Goodbye'] in second['patch']
+
+    unknown = json.loads(control.handleRequest(request(rendered='unknown')).content)
+    assert 'Goodbye' in unknown['html'] and 'patch' not in unknown
+    assert control.handleRequest(HTTP.Request(fields={'requestHandler':control.baseName})).contentType == \
+           HTTP.Response.ContentType.HTML
@@ -20,8 +20,15 @@
     Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 '''
 
+import threading
+import time
+
 from test_Base import ElementTester
+from thedom import UITemplate
 from thedom.All import Factory
+from thedom.Base import TextNode
+from thedom.Compile import CompiledTemplate
+from thedom.Display import RenderCache
 
 
 class TestImage(ElementTester):
@@ -98,3 +105,84 @@ class TestEmpty(ElementTester):
     def setup_class(self):
         self.element = Factory.build("box")
         self.element.add(Factory.build("empty", name="Test"))
+
+
+class TestKeyedCacheElement(ElementTester):
+
+    def setup_class(self):
+        self.element = Factory.build("keyedCacheElement", name="Test")
+        self.element.setProperties({'varyBy':'user locale', 'ttl':60})
+        self.box = self.element.add(Factory.build("box"))
+        self.text = self.box.add(TextNode())
+
+    def test_varyBy(self):
+        self.text.setText("Welcome")
+        assert self.element.toHTML(request={'user':'tim'}) == '<div>Welcome</div>'
+        self.text.setText("Changed")
+        assert self.element.toHTML(request={'user':'tim'}) == '<div>Welcome</div>'
+        assert self.element.toHTML(request={'user':'tim', 'locale':'fr'}) == '<div>Changed</div>'
+        assert self.element.cache.stats['hits'] == 1
+
+        self.element.key = lambda request: 'everyone'
+        assert self.element.toHTML(request={'user':'tim'}) == '<div>Changed</div>'
+        self.text.setText("Welcome")
+        assert self.element.toHTML(request={'user':'other'}) == '<div>Changed</div>'
+        self.element.key = None
+
+    def test_renderCache(self):
+        cache = RenderCache(maxEntries=2)
+        cache.set('a', 'a')
+        cache.set('b', 'b')
+        assert cache.fetch('a', lambda: 'new') == 'a'
+        cache.set('c', 'c')
+        assert 'a' in cache and 'c' in cache and 'b' not in cache
+        assert cache.stats['evictions'] == 1
+
+        cache = RenderCache(maxBytes=4, ttl=0)
+        cache.set('a', u'\xe9\xe9')
+        assert cache.size == 4
+        assert 'a' not in cache
+        assert cache.stats['expirations'] == 1
+        cache.set('b', 'b', ttl=60)
+        cache.set('c', 'long text')
+        assert len(cache) == 0 and cache.size == 0
+        assert RenderCache.shared('test') is RenderCache.shared('test')
+
+    def test_singleFlight(self):
+        cache = RenderCache()
+        rendering = threading.Event()
+        renders = []
+        def render():
+            renders.append(1)
+            rendering.wait(5)
+            return 'html'
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.fetch('key', render))) for index in range(5)]
+        for thread in threads:
+            thread.start()
+        while cache.stats['misses'] < 5:
+            time.sleep(0.001)
+        rendering.set()
+        for thread in threads:
+            thread.join()
+        assert results == ['html'] * 5
+        assert len(renders) == 1
+        assert cache.stats['waits'] == 4
+
+    def test_compiled(self):
+        template = UITemplate.fromSHPAML("box\n    keyedcacheelement varyBy=user\n        > label text=Hi\n")
+        compiled = CompiledTemplate.create(template)
+        (first, second) = (compiled.build(), compiled.build())
+        assert first.childElements[0].childElements[0].cache is second.childElements[0].childElements[0].cache
+        assert first.toHTML(request={'user':'tim'}) == '<div><label>Hi</label></div>'
+        assert second.toHTML(request={'user':'tim'}) == '<div><label>Hi</label></div>'
+        assert second.childElements[0].childElements[0].cache.stats == {'hits':1, 'misses':1, 'evictions':0,
+                                                                        'expirations':0, 'waits':0}
+
+        #Ensure the html is cached separately for elements with a different prefix or editable state
+        for element in (first, second):
+            element.childElements[0].childElements[0].childElements[0].id = 'greeting'
+        second.setPrefix('prefix-')
+        assert second.toHTML(request={'user':'tim'}) == '<div><label id="prefix-greeting">Hi</label></div>'
+        first.setEditable(False)
+        assert first.toHTML(request={'user':'tim'}) == '<div><label id="greeting">Hi</label></div>'
@@ -0,0 +1,69 @@
+'''
+    test_HTTP.py
+
+    Tests the functionality of thedom/Controllers/HTTP.py
+
+    Copyright (C) 2015  Timothy Edmund Crosley
+
+    This program is free software; you can redistribute it and/or
+    modify it under the terms of the GNU General Public License
+    as published by the Free Software Foundation; either version 2
+    of the License, or (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program; if not, write to the Free Software
+    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+'''
+
+from thedom.Controllers import HTTP
+
+
+class FakeDjangoResponse(dict):
+
+    def __init__(self, content, contentType, status):
+        dict.__init__(self)
+        self.content = content
+        self.contentType = contentType
+        self.status = status
+        self.cookies = []
+
+    def set_cookie(self, *cookie):
+        self.cookies.append(cookie)
+
+
+class FakeDjangoStreamingResponse(FakeDjangoResponse):
+    pass
+
+
+class FakeCustomResponse(FakeDjangoResponse):
+    pass
+
+
+def test_toDjangoResponse(monkeypatch):
+    '''Test to ensure responses convert to django responses, streaming ones using the streaming class'''
+    monkeypatch.setattr(HTTP, 'djangoResponse', FakeDjangoResponse)
+    monkeypatch.setattr(HTTP, 'djangoStreamingResponse', FakeDjangoStreamingResponse)
+
+    response = HTTP.Response("Hello", isDynamic=False)
+    response['X-Test'] = 'value'
+    response.setCookie('session', 'id')
+    converted = response.toDjangoResponse(FakeDjangoResponse)
+    assert type(converted) == FakeDjangoResponse
+    assert converted.content == "Hello"
+    assert converted.contentType == "text/html;charset=UTF-8"
+    assert converted.status == HTTP.Response.Status.OK
+    assert converted['X-Test'] == 'value'
+    assert converted.cookies == [tuple(response.cookies['session'])]
+
+    chunks = iter(("Hello", " ", "World"))
+    streamed = HTTP.Response(chunks, isDynamic=False).toDjangoResponse(FakeDjangoResponse)
+    assert type(streamed) == FakeDjangoStreamingResponse
+    assert streamed.content is chunks
+
+    explicit = HTTP.Response(iter(()), isDynamic=False).toDjangoResponse(FakeCustomResponse)
+    assert type(explicit) == FakeCustomResponse
@@ -20,7 +20,7 @@
     Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 '''
 
-from thedom.IteratorUtils import IterableCollection, Queryable, SortedSet
+from thedom.IteratorUtils import Aggregate, Avg, Count, IterableCollection, Max, Min, Queryable, SortedSet, Sum
 from thedom.MultiplePythonSupport import *
 
 
@@ -95,3 +95,78 @@ def test_Queryable():
     assert queryable.__lowerStrings__(u('Hi There')) == u('hi there')
     assert queryable.__lowerStrings__(u('HI THERE')) == u('hi there')
     assert queryable.__lowerStrings__(57) == 57
+
+def test_QueryableFilter():
+    """Test Queryable filtering, excluding, and ordering produce lazy querysets with the expected results"""
+    people = Queryable([{'name': 'Timothy', 'age': 27, 'city': 'Tampa'},
+                        {'name': 'Ryan', 'age': 30, 'city': 'Miami'},
+                        {'name': 'Gary', 'age': 27, 'city': 'Tampa'},
+                        {'name': 'Savannah', 'age': 22, 'city': 'Orlando'}])
+    names = lambda results: [person['name'] for person in results]
+
+    assert names(people.filter(age=27)) == ['Timothy', 'Gary']
+    assert names(people.filter(age=27, name__istartswith='t')) == ['Timothy']
+    assert names(people.filter(age__gte=27).exclude(city='Miami')) == ['Timothy', 'Gary']
+    assert names(people.filter(name__in=('Ryan', 'Gary'))) == ['Ryan', 'Gary']
+    assert names(people.filter(city__icontains='AMP')) == ['Timothy', 'Gary']
+    assert names(people.exclude(age=27)) == ['Ryan', 'Savannah']
+    assert people.get(name='Ryan')['age'] == 30
+    assert people.get(name='Nobody') is None
+    assert people.filter(age=27).count() == 2
+    assert not people.filter(age=99)
+    assert people.filter(age=22) == [people[3]]
+
+    assert names(people.order_by('age', 'name')) == ['Savannah', 'Gary', 'Timothy', 'Ryan']
+    assert names(people.order_by('-age', 'name')) == ['Ryan', 'Gary', 'Timothy', 'Savannah']
+    assert names(people.order_by('city', '-name').filter(age=27)) == ['Timothy', 'Gary']
+
+    people.append({'name': 'nobody', 'age': None, 'city': None})
+    people.append({'name': 'Ageless', 'age': 'unknown', 'city': 'Tampa'})
+    assert names(people.order_by('age')) == ['nobody', 'Savannah', 'Timothy', 'Gary', 'Ryan', 'Ageless']
+    assert names(people.order_by('-city', 'name')) == ['Ageless', 'Gary', 'Timothy', 'Savannah', 'Ryan', 'nobody']
+    assert names(people.order_by('name')) == ['Ageless', 'Gary', 'nobody', 'Ryan', 'Savannah', 'Timothy']
+    people[-2:] = []
+
+    matches, nonMatches = people.getMatches({'city': 'Tampa'})
+    assert names(matches) == ['Timothy', 'Gary'] and names(nonMatches) == ['Ryan', 'Savannah']
+
+def test_QueryableLazy():
+    """Test querysets only evaluate as many items as needed"""
+    evaluated = []
+    class Model(object):
+        def __init__(self, value):
+            self.value = value
+
+        def checked(self):
+            evaluated.append(self.value)
+            return True
+
+    queryable = Queryable(Model(value) for value in range(1, 1000))
+    queryset = queryable.filter(checked=True).filter(value__gt=10)
+    assert not evaluated
+    assert queryset.get().value == 11
+    assert evaluated == list(range(1, 12))
+
+def test_QueryableAggregate():
+    """Test aggregates are computed correctly over all items, and per group"""
+    sales = Queryable([{'city': 'Tampa', 'amount': 10, 'rep': 'Timothy'},
+                       {'city': 'Miami', 'amount': 5, 'rep': 'Ryan'},
+                       {'city': 'Tampa', 'amount': 3, 'rep': None},
+                       {'city': 'Miami', 'amount': 2.5, 'rep': 'Gary'}])
+
+    assert sales.aggregate(Sum('amount'), Count('rep'), items=Count(), average=Avg('amount'),
+                           lowest=Min('amount'), highest=Max('amount')) == \
+                {'amount__sum': 20.5, 'rep__count': 3, 'items': 4, 'average': 5.125, 'lowest': 2.5, 'highest': 10}
+    assert sales.filter(city='Tampa').aggregate(Avg('amount'), Max('rep')) == {'amount__avg': 6.5,
+                                                                              'rep__max': 'Timothy'}
+    assert sales.filter(city='Orlando').aggregate(Sum('amount'), Count('amount')) == {'amount__sum': None,
+                                                                                     'amount__count': 0}
+
+    assert sales.group_by('city').aggregate(total=Sum('amount'), reps=Count('rep')) == \
+                [{'city': 'Tampa', 'total': 13, 'reps': 1}, {'city': 'Miami', 'total': 7.5, 'reps': 2}]
+    assert sales.group_by('city', 'rep').aggregate(Count())[0] == {'city': 'Tampa', 'rep': 'Timothy',
+                                                                   '__count': 1}
+    assert sales.aggregate(Aggregate('amount')) == {'amount__values': [10, 5, 3, 2.5]}
+
+    large = Queryable({'amount': 2 ** 62} for item in range(4))
+    assert large.aggregate(Sum('amount'), Max('amount')) == {'amount__sum': 2 ** 64, 'amount__max': 2 ** 62}
@@ -0,0 +1,85 @@
+'''
+    test_NodeStore.py
+
+    Tests the functionality of thedom/NodeStore.py
+
+    Copyright (C) 2015  Timothy Edmund Crosley
+
+    This program is free software; you can redistribute it and/or
+    modify it under the terms of the GNU General Public License
+    as published by the Free Software Foundation; either version 2
+    of the License, or (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program; if not, write to the Free Software
+    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+'''
+
+from test_Base import ElementTester
+from thedom.All import Factory
+from thedom.NodeStore import NodeStore
+
+
+class TestNodeStore(ElementTester):
+
+    def setup_method(self, method):
+        self.element = NodeStore('store')
+        self.container = self.element.addNode('div')
+        self.list = self.element.addNode('ul', self.container, id='list', classes='WList')
+        for index in range(3):
+            item = self.element.addNode('li', self.list, name='item', classes=('WItem', ), style='color:red')
+            self.element.addText('<%d>' % index, item)
+        self.element.addNode('br', self.container, selfCloses=True)
+
+    def test_toHTML(self):
+        item = '<li name="item" class="WItem" style="color:red">&lt;%d&gt;</li>'
+        assert self.element.toHTML() == ('<div><ul id="list" class="WList">' +
+                                         "".join(item % index for index in range(3)) + '</ul><br /></div>')
+        assert "".join(self.element.iterHTML(chunkSize=1)) == self.element.toHTML()
+
+        self.element.setPrefix('prefix-')
+        assert 'id="prefix-list"' in self.element.toHTML()
+
+    def test_interning(self):
+        assert len(self.element.tags) == 10
+        assert len(self.element._attributeTable) == 3
+        assert self.element._strings.count('item') == 1
+
+    def test_storedNode(self):
+        container, = self.element.storedNodes()
+        assert container.parent is self.element
+
+        unorderedList, lineBreak = container.childElements
+        assert unorderedList.tagName == 'ul'
+        assert unorderedList.id == 'list'
+        assert unorderedList.parent == container
+        assert unorderedList.hasClass('WList')
+        assert unorderedList.count() == 3
+        assert lineBreak.toHTML() == '<br />'
+
+        item = unorderedList.childElements[1]
+        assert item.parent == unorderedList
+        assert item.name == 'item'
+        assert item.style == {'color':'red'}
+        assert item.text() == '&lt;1&gt;'
+        assert item.toHTML(formatted=True) == '<li name="item" class="WItem" style="color:red">\n &lt;1&gt;\n</li>'
+
+        self.element.setText(item.childElements[0].index, 'changed')
+        assert item.text() == 'changed'
+
+    def test_addTree(self):
+        container = Factory.build('Box', 'container')
+        container.setPrefix('prefix-')
+        container.add(Factory.build('Label', 'label')).setText('text')
+        container.add(Factory.build('Textbox', 'textbox'))
+        container.add(Factory.build('Image', 'image'))
+
+        store = NodeStore()
+        store.addTree(container)
+        assert store.toHTML() == container.toHTML()
+        assert store.toHTML(formatted=True) == container.toHTML(formatted=True)
@@ -64,3 +64,29 @@ def test_formattedOutput():
     """
     output = TREE.toHTML(formatted=True)
     assert output == EXPECTED_FORMATTED_OUTPUT
+
+def test_recovery():
+    """
+        Test that NodeTree recovers from html that is not well formed the same way browsers would
+    """
+    assert NodeTree('<ul><li>one<li>two</ul>').toHTML() == '<ul><li>one</li><li>two</li></ul>'
+    assert NodeTree('<div><body><p>text</div>').toHTML() == '<div></div><body><p>text</p></body>'
+    assert NodeTree('<div></span></div>').toHTML() == '<div></div>'
+    assert (NodeTree('<script>if (a < b) { x = "</div>"; }</script><pre>  keep  </pre>').toHTML() ==
+            '<script>if (a < b) { x = "</div>"; }\n</script><pre>keep\n</pre>')
+    assert (NodeTree('<div id=a style="color: red;" checked><!-- a -- b --><br></div>').toHTML() ==
+            '<div id="a" style="color:red" checked="true"><!-- a == b --><br /></div>')
+    assert NodeTree('<tr><i><<').toHTML() == '<tr><i>&lt;&lt;</i></tr>'
+
+def test_largeDocument():
+    """
+        Test that all nodes of a tree share the position within the html being parsed
+    """
+    rows = "".join('<tr><td class="name">Item %d</td><td><a href="/%d">link</a><br></td></tr>\n' % (index, index)
+                   for index in range(2000))
+    tree = NodeTree('<html><body><table>' + rows + '</table></body></html>')
+    table = tree[0][0][0]
+    assert table.count() == 2000
+    assert table[1999][0][0].text() == 'Item 1999'
+    assert table[1999]._cursor is tree._cursor
+    assert tree.index() == 0 and table.length() == tree.length()
@@ -0,0 +1,72 @@
+'''
+    test_Precompile.py
+
+    Tests the functionality of thedom/Precompile.py
+
+    Copyright (C) 2015  Timothy Edmund Crosley
+
+    This program is free software; you can redistribute it and/or
+    modify it under the terms of the GNU General Public License
+    as published by the Free Software Foundation; either version 2
+    of the License, or (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program; if not, write to the Free Software
+    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+'''
+
+import json
+import os
+
+from thedom import Precompile
+from thedom.All import Factory
+
+
+def test_precompile(tmpdir):
+    """Ensure every template is compiled once, and only recompiled when it changes"""
+    templates = tmpdir.mkdir('templates')
+    templates.join('page.shpaml').write("box\n    > label@title text=Hello\n")
+    templates.mkdir('forms').join('login-form.xml').write('<form><textbox accessor="user" /></form>')
+    templates.join('broken.xml').write('<box>')
+    templates.join('notes.txt').write('not a template')
+    output = str(tmpdir.join('compiled'))
+
+    results = Precompile.precompile(str(templates), output, jobs=1)
+    assert sorted(results['compiled']) == ['forms/login-form.xml', 'page.shpaml']
+    assert list(results['failed']) == ['broken.xml']
+    with open(os.path.join(output, Precompile.IMPORT_MAP)) as openFile:
+        assert json.load(openFile) == {'forms/login-form.xml':'forms.login_form', 'page.shpaml':'page'}
+    assert os.path.exists(os.path.join(output, 'forms', '__init__.py'))
+    for module in ('page.py', Precompile.IMPORT_MAP):
+        assert os.stat(os.path.join(output, module)).st_mode & 0o777 == 0o666 & ~Precompile.currentUmask()
+
+    module = {}
+    with open(os.path.join(output, 'page.py')) as openFile:
+        exec(compile(openFile.read(), 'page.py', 'exec'), module)
+    assert module['build'](Factory).title.text() == 'Hello'
+
+    #Ensure unchanged templates are skipped, even when only their modification time changes
+    results = Precompile.precompile(str(templates), output, jobs=1)
+    assert sorted(results['skipped']) == ['forms/login-form.xml', 'page.shpaml']
+    assert results['compiled'] == []
+    os.utime(str(templates.join('page.shpaml')), (0, 0))
+    assert Precompile.precompile(str(templates), output, jobs=1)['skipped'] == results['skipped']
+
+    templates.join('page.shpaml').write("box\n    > label@title text=Changed\n")
+    templates.join('forms', 'login-form.xml').remove()
+    assert Precompile.main([str(templates), '--output', output, '--jobs', '2']) == 1
+    with open(os.path.join(output, Precompile.MANIFEST)) as openFile:
+        assert list(json.load(openFile)['templates']) == ['page.shpaml']
+    assert not os.path.exists(os.path.join(output, 'forms', 'login_form.py'))
+    with open(os.path.join(output, 'page.py')) as openFile:
+        assert 'Changed' in openFile.read()
+
+    templates.join('broken.xml').remove()
+    results = Precompile.precompile(str(templates), output, force=True)
+    assert results['compiled'] == ['page.shpaml']
+    assert not results['failed']
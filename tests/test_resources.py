@@ -68,3 +68,12 @@ class TestScriptContainer(ElementTester):
 
         self.element.removeScript("alert('I am a script :D');")
         assert self.element._scripts == []
+
+    def test_tagAttributes(self):
+        assert 'type' not in self.element.attributes
+        assert self.element.startTag() == '<script language="javascript" type="text/javascript">'
+
+        self.element.attributes['type'] = 'module'
+        assert self.element.startTag() == '<script language="javascript" type="module">'
+        self.element.attributes['language'] = None
+        assert self.element.startTag() == '<script type="module">'
@@ -0,0 +1,218 @@
+'''
+    test_Selectors.py
+
+    Tests the functionality of thedom/Selectors.py
+
+    Copyright (C) 2015  Timothy Edmund Crosley
+
+    This program is free software; you can redistribute it and/or
+    modify it under the terms of the GNU General Public License
+    as published by the Free Software Foundation; either version 2
+    of the License, or (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program; if not, write to the Free Software
+    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+'''
+
+import gc
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+import pytest
+
+from thedom import Selectors
+from thedom.All import Factory
+from thedom.Base import Node
+
+
+class TestSelectors(object):
+
+    def setup_method(self, method):
+        self.page = Factory.build('Box', 'page')
+        self.form = self.page.add(Factory.build('Form', 'main'))
+        self.error = self.form.add(Factory.build('Box', 'error'))
+        self.error.addClass('WError')
+        self.input = self.error.add(Factory.build('Textbox', 'foo'))
+        self.otherInput = self.form.add(Factory.build('Textbox', 'bar'))
+        self.otherInput.attributes['placeholder'] = 'enter a value'
+        self.label = self.form.add(Factory.build('Label', 'label'))
+
+    def test_select(self):
+        assert self.page.select("form#main .WError > input[name=foo]") == [self.input]
+        assert self.page.select("input") == [self.input, self.otherInput]
+        assert self.page.select("form input") == [self.input, self.otherInput]
+        assert self.page.select("form > input") == [self.otherInput]
+        assert self.page.select("#error + input") == [self.otherInput]
+        assert self.page.select("#error ~ label") == [self.label]
+        assert self.page.select("#main ~ label") == []
+        assert self.page.select("[placeholder]") == [self.otherInput]
+        assert self.page.select("[placeholder^=enter]") == [self.otherInput]
+        assert self.page.select("[placeholder~=value]") == [self.otherInput]
+        assert self.page.select("[type='text']") == [self.input, self.otherInput]
+        assert self.page.select("label, .WError") == [self.error, self.label]
+        assert self.page.select("#main > *") == [self.error, self.otherInput, self.label]
+        assert self.form.select("form") == []
+        assert self.error.select("input") == [self.input]
+
+        with pytest.raises(ValueError):
+            self.page.select("form >")
+        with pytest.raises(ValueError):
+            self.page.select("form:first-child")
+
+    def test_index(self):
+        #Ensure the index stays correct as elements are added, removed, and changed
+        assert self.page.getChildElementWithId('foo') is self.input
+        assert self.page.errors() == [self.error]
+
+        self.otherInput.addClass('WError')
+        assert self.page.errors() == [self.error, self.otherInput]
+        self.otherInput.hide()
+        assert self.page.errors() == [self.error]
+
+        self.error.removeChild(self.input)
+        assert self.page.getChildElementWithId('foo') is None
+        assert self.page.select("input") == [self.otherInput]
+
+        self.label.add(self.input)
+        assert self.page.getChildElementWithId('foo') is self.input
+        assert self.page.select("label input") == [self.input]
+
+        moved = Factory.build('Box', 'moved')
+        moved.add(Factory.build('Box', 'nested'))
+        assert moved.getChildElementWithId('nested')
+        self.form.extend([moved])
+        assert self.page.getChildElementWithId('nested').parent is moved
+        assert moved._index is None
+
+        self.input.id = 'renamed'
+        self.input.invalidate()
+        assert self.page.getChildElementWithId('foo') is None
+        assert self.page.getChildElementWithId('renamed') is self.input
+        assert self.page.getChildElementsWithName('foo') == [self.input]
+        assert self.page.getChildElementsWithTagName('label') == [self.label]
+
+        self.form.reset()
+        assert self.page.select("input") == []
+
+        page = pickle.loads(pickle.dumps(self.page, -1))
+        assert page.getChildElementWithId('main').tagName == 'form'
+
+    def test_indexMutations(self):
+        #Ensure changes made directly to elements after they have been indexed are found
+        assert all(isinstance(vars(Node)[name], property) for name in Selectors.REPORTED_ATTRIBUTES)
+        assert self.page.getChildElementWithId('foo') is self.input
+        assert self.page.getChildElementsWithName('bar') == [self.otherInput]
+
+        self.otherInput.id = 'two'
+        self.otherInput.name = 'renamed'
+        assert self.page.getChildElementWithId('two') is self.otherInput
+        assert self.page.getChildElementWithId('bar') is None
+        assert self.page.getChildElementsWithName('renamed') == [self.otherInput]
+        assert self.page.getChildElementsWithName('bar') == []
+
+        self.label.classes.add('WError')
+        assert self.page.getChildElementsWithClass('WError') == [self.error, self.label]
+        self.label.classes.discard('WError')
+        assert self.page.errors() == [self.error]
+
+        appended = Factory.build('Textbox', 'appended', parent=self.form)
+        self.form.childElements.append(appended)
+        assert self.page.getChildElementWithId('appended') is appended
+        assert self.page.select("form > input") == [self.otherInput, appended]
+
+        horizontal = self.form.add(Factory.build('Horizontal'))
+        inside = horizontal.add(Factory.build('Textbox', 'inside'))
+        assert self.page.getChildElementWithId('inside') is inside
+
+        self.form.childElements.remove(appended)
+        assert self.page.getChildElementWithId('appended') is None
+
+        tree = Factory.build('Box', 'tree')
+        tree.add(Factory.build('Box', 'branch'))
+        assert tree.getChildElementWithId('branch')
+        tree = pickle.loads(pickle.dumps(tree, -1))
+        tree.childElements[0].id = 'unpickled'
+        assert tree.getChildElementWithId('unpickled') is tree.childElements[0]
+
+    def test_rootChanges(self):
+        #Ensure changes reported for the root of an indexed tree leave its index in place
+        assert self.page.errors() == [self.error]
+        added = self.page.add(Factory.build('Textbox', 'added'))
+        assert self.page.getChildElementWithId('added') is added
+        self.page.addClass('changed')
+        self.page.removeChild(added)
+        assert self.page.getChildElementWithId('added') is None
+        assert self.page.select("#foo") == [self.input]
+        assert self.page._index is not None
+
+    def test_placedRoots(self):
+        #Ensure the index of a tree is dropped as soon as its root is placed within another tree
+        outer = Factory.build('Box', 'outer')
+        inner = Factory.build('Box', 'inner')
+        outer.add(inner)
+        assert outer.getChildElementsWithClass('c1') == []
+        assert outer._index is not None
+
+        tree = Factory.build('Box', 'tree')
+        tree.add(outer)
+        assert outer._index is None
+        added = inner.add(Factory.build('Box', 'added'))
+        added.addClass('c1')
+        tree.removeChild(outer)
+        assert outer.getChildElementsWithClass('c1') == [added]
+        assert outer.select('.c1') == [added]
+
+        #Ensure the same holds when the tree it is placed in rebuilds its index from scratch
+        assert outer._index is not None
+        assert tree.getChildElementsWithClass('c1') == []
+        outer.parent = tree
+        tree.childElements = [outer]
+        assert tree.getChildElementsWithClass('c1') == [added]
+        assert outer._index is None and id(outer) not in Selectors._indexed
+
+    def test_droppedIndexes(self):
+        #Ensure elements only report changes while a tree is indexed
+        others = Selectors._indexed.copy()
+        Selectors._indexed.clear()
+        try:
+            assert self.page.select("#foo") == [self.input]
+            assert Selectors.indexing and list(Selectors._indexed) == [id(self.page)]
+
+            tree = Factory.build('Box', 'tree')
+            branch = tree.add(Factory.build('Box', 'branch'))
+            assert tree.getChildElementWithId('branch') is branch
+            self.page.add(tree)
+            assert self.page.getChildElementWithId('branch') is branch
+            assert tree._index is None and id(tree) not in Selectors._indexed
+
+            del self.page, self.form, self.error, self.input, self.otherInput, self.label, tree, branch
+            gc.collect()
+            assert not Selectors._indexed and not Selectors.indexing
+        finally:
+            Selectors._indexed.update(others)
+            Selectors.indexing = bool(Selectors._indexed)
+
+    def test_largeTree(self):
+        #Ensure looking up an element by id does not walk the tree
+        rows = [self.page.add(Factory.build('Box', 'row' + str(index))) for index in range(2000)]
+        assert self.page.getChildElementWithId('row1999') is rows[-1]
+        assert len(Selectors.index(self.page).elements[(Selectors.TAG, 'div')]) == 2001
+
+        visited = []
+        walk = Selectors.walk
+        Selectors.walk = lambda scope: visited.append(scope) or walk(scope)
+        try:
+            assert self.page.select("#row1500") == [rows[1500]]
+            assert self.page.getChildElementWithId('row5') is rows[5]
+        finally:
+            Selectors.walk = walk
+        assert not visited
@@ -0,0 +1,57 @@
+'''
+    test_Types.py
+
+    Tests the functionality of thedom/Types.py
+
+    Copyright (C) 2015  Timothy Edmund Crosley
+
+    This program is free software; you can redistribute it and/or
+    modify it under the terms of the GNU General Public License
+    as published by the Free Software Foundation; either version 2
+    of the License, or (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program; if not, write to the Free Software
+    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+'''
+
+from thedom import Types
+from thedom.MultiplePythonSupport import *
+from thedom.Types import Bool, Safe, Set, StyleDict, Unsafe
+
+
+def test_escape():
+    """Ensure escape replaces every special html character, and only escapes once"""
+    assert Types.escape('<a href="#">&</a>') == '&lt;a href="#"&gt;&amp;&lt;/a&gt;'
+    assert Types.escape('<a href="#">&</a>', quote=True) == '&lt;a href=&quot;#&quot;&gt;&amp;&lt;/a&gt;'
+    assert Types.escape('plain text') == 'plain text'
+
+    escaped = Types.escape('&')
+    assert type(escaped) == Safe
+    assert Types.escape(escaped) == '&amp;'
+    assert Types.escape(Safe('&amp;')) == '&amp;'
+    assert Types.escape(escaped, quote=True) is escaped
+
+    #Ensure the cache of escaped values never grows past its size limit
+    for index in range(Types.ESCAPE_CACHE_SIZE + 10):
+        Types.escape('<' + str(index) + '>')
+    assert len(Types._escapedText) <= Types.ESCAPE_CACHE_SIZE
+    assert Types.escape('<' + str(index) + '>') == '&lt;' + str(index) + '&gt;'
+
+    longText = '<' * (Types.ESCAPE_CACHE_MAX_LENGTH + 1)
+    assert Types.escape(longText) == '&lt;' * len(longText)
+    assert longText not in Types._escapedText
+
+def test_unicode():
+    """Ensure each type is html escaped exactly once when converted to unicode"""
+    assert unicode(Unsafe('<b>')) == '&lt;b&gt;'
+    assert unicode(Safe('<b>')) == '<b>'
+    assert unicode(Set(['a&b'])) == 'a&amp;b'
+    assert unicode(StyleDict({'content':'"<"'})) == 'content:"&lt;"'
+    assert StyleDict.fromString('color:red;').toString() == 'color:red'
+    assert unicode(Bool(True)) == 'true'
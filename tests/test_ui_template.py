@@ -20,6 +20,11 @@
     Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 '''
 
+import pickle
+from xml.parsers.expat import ExpatError
+
+import pytest
+
 from thedom import UITemplate
 
 EXPECTED_STRUCTURE = UITemplate.Template('container', properties=(("randomattribute", "Hello"),),
@@ -59,3 +64,131 @@ def test_fromSHPAML():
              """
 
     assert UITemplate.fromSHPAML(shpmal) == EXPECTED_STRUCTURE
+
+def test_fromSHPAMLDirect():
+    """
+        Ensure shpaml templates are built directly into the same structure converting them to xml would produce
+    """
+    shpaml = """
+box#main@body title=true
+    | some
+    | text
+
+    label.title text='a b' > strong | bold
+    > br
+    span
+    PASS
+    ::comment
+        > ignored
+    pre VERBATIM
+        raw > text
+    || flush left
+    layout-horizontal
+        box > label text=None
+        {{ variable }}
+"""
+    direct = UITemplate.SHPAMLBuilder().parse(shpaml)
+    assert direct == UITemplate.TemplateBuilder().parse(UITemplate.shpaml.convert_text(shpaml))
+    assert UITemplate.fromSHPAML(shpaml) == direct
+    assert (direct.id, direct.accessor, direct.properties) == ('main', 'body', (('title', True), ))
+    (text, label, br, span, pre, flushLeft, layout) = direct.childElements
+    assert (text, span, flushLeft) == ('some\n    text', 'span', 'flush left')
+    assert label.properties == (('text', 'a b'), ('class', 'title'))
+    assert (br.childElements, pre.childElements) == (None, ('raw > text', ))
+    assert layout.childElements[0].childElements == ('label text=None', )
+
+    #Templates that need the xml parser to make sense of them are still supported, through xml
+    shpaml = """
+box
+    <b>bold &amp; raw</b>
+"""
+    with pytest.raises(UITemplate.SHPAMLBuilder.Unsupported):
+        UITemplate.SHPAMLBuilder().parse(shpaml)
+    assert UITemplate.fromSHPAML(shpaml).childElements[0].create == 'b'
+    with pytest.raises(ExpatError):
+        UITemplate.fromSHPAML("box\nbox")
+
+def test_fromXMLStructure():
+    """
+        Ensure templates are loaded from XML with the same structure as the XML has
+    """
+    template = UITemplate.fromXML('<!-- leading comment --><box x="true" y="None" id="box">'
+                                  '  text &amp; more<!-- comment -->after<![CDATA[ignored]]>'
+                                  '<label accessor="title" text="some text" /><label text="some text"></label>'
+                                  '<box>  </box></box>')
+    assert (template.create, template.id, template.properties) == ('box', 'box', (('x', True), ('y', None)))
+    (text, after, title, label, box) = template.childElements
+    assert (text, after) == ('text & more', 'after')
+    assert (title.accessor, title.childElements) == ('title', None)
+    assert label.properties == title.properties == (('text', 'some text'), )
+    assert label.properties[0][1] is title.properties[0][1]
+    assert box.childElements == ()
+
+    with pytest.raises(ExpatError):
+        UITemplate.fromXML('<box><label></box>')
+
+def test_internTemplate():
+    """
+        Ensure structurally identical subtrees are shared and compared by their cached hash
+    """
+    rows = UITemplate.fromXML('<box>' + '<box><label text="name" /><textbox name="name" />text</box>' * 3 +
+                              '<box><label text="name" /></box></box>')
+    (first, second, third, other) = rows.childElements
+    assert first == second and first is not second and first != other
+    assert hash(first) == hash(second) != hash(other)
+    assert UITemplate.Template('box') == UITemplate.Template('box', childElements=())
+    assert hash(UITemplate.Template('box')) == hash(UITemplate.Template('box', childElements=()))
+    assert first != 'box' and not UITemplate.Template('box') == 'box'
+
+    interned = UITemplate.internTemplate(rows)
+    assert interned == rows
+    assert interned.childElements[0] is interned.childElements[1] is interned.childElements[2]
+    assert interned.childElements[0].childElements[0] is interned.childElements[3].childElements[0]
+    assert UITemplate.internTemplate(interned) is interned
+
+    table = {}
+    assert UITemplate.internTemplate(first, table) is UITemplate.internTemplate(rows, table).childElements[1]
+
+    #Ensure templates built in code with lists for child elements and properties can be hashed and interned
+    built = UITemplate.Template('box', childElements=[UITemplate.Template('label', properties=[('text', 'hi')])])
+    assert built == UITemplate.fromXML('<box><label text="hi" /></box>')
+    assert UITemplate.internTemplate(built) == built
+    assert pickle.loads(pickle.dumps(built, -1)) == built
+
+def test_binary():
+    """
+        Ensure templates survive a round trip through the binary format, with shared data only stored once
+    """
+    template = UITemplate.Template('box', None, 5, u'\u2603', (u'text', EXPECTED_STRUCTURE,
+                                   UITemplate.Template('label', properties=(('size', -7), ('ratio', 1.5),
+                                                                            ('hidden', True), ('value', None))),
+                                   UITemplate.Template('label', childElements=()),
+                                   UITemplate.Template('label', properties=(('size', -7), ('ratio', 1.5),
+                                                                            ('hidden', True), ('value', None)))))
+    loaded = UITemplate.fromBinary(UITemplate.toBinary(template))
+    assert loaded == template
+    assert (loaded.accessor, loaded.id, loaded.name) == (None, 5, u'\u2603')
+    assert loaded.childElements[2].properties is loaded.childElements[4].properties
+    assert loaded.childElements[2].childElements is None and loaded.childElements[3].childElements == ()
+    assert UITemplate.fromBinary(UITemplate.toBinary(UITemplate.Template('box'))) == UITemplate.Template('box')
+
+    with pytest.raises(ValueError):
+        UITemplate.toBinary(UITemplate.Template('box', properties=(('value', object()), )))
+    with pytest.raises(ValueError):
+        UITemplate.fromBinary(b'<box />')
+
+def test_bundle():
+    """
+        Ensure bundles only rebuild the templates that are accessed
+    """
+    rows = UITemplate.Template('box', childElements=tuple(UITemplate.Template('label', id='label%d' % index)
+                                                           for index in range(300)))
+    bundle = UITemplate.TemplateBundle(UITemplate.toBundle({'structure':EXPECTED_STRUCTURE, 'rows':rows}))
+    assert sorted(bundle.keys()) == ['rows', 'structure'] and len(bundle) == 2
+    assert 'rows' in bundle and 'missing' not in bundle and bundle.get('missing') is None
+    assert not bundle.templates
+
+    assert bundle['rows'] == rows
+    assert list(bundle.templates) == ['rows']
+    assert bundle['rows'] is bundle['rows']
+    assert bundle.get('structure') == EXPECTED_STRUCTURE
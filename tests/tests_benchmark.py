@@ -47,3 +47,4 @@ class Testthedom_Benchmark(object):
         assert(results['loopedCreate'] < 20.0)
         assert(results['longestCreationTime'] < 0.010)
         assert(results['createAllOnce'] < 0.250)
+        assert(results['compactTableMemoryReduction'] > 5)
@@ -20,22 +20,24 @@
     Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 '''
 
-import cgi
 import re
-from itertools import chain
+import threading
+import weakref
+from bisect import bisect_left
 from types import FunctionType
 
-from . import ClientSide, DictUtils
+from . import ClientSide, DictUtils, Selectors
 from .Connectable import Connectable
 from .IteratorUtils import Queryable
 from .MethodUtils import CallBack, acceptsArguments
 from .MultiplePythonSupport import *
-from .Types import Safe, Scripts, Set, StyleDict, Unsafe, WebDataType
+from .Types import Safe, Scripts, Set, StyleDict, Unsafe, WebDataType, escape
 
 
 class Settings(object):
     STATIC_URL = ""
     INDENTATION = " "
+    CHUNK_SIZE = 8192
     BLOCK_TAGS = ('address', 'blockquote', 'center', 'dir', 'div', 'dl', 'fieldset', 'form', 'h1',
                 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'isindex', 'menu', 'noframes', 'noscript', 'ol',
                 'p', 'pre', 'table', 'ul', 'dd', 'dt', 'frameset', 'li', 'tbody', 'td', 'tfoot', 'th',
@@ -84,11 +86,571 @@ class AutoAddScripts(type):
 AutoAddScripts = AutoAddScripts('AutoAddScripts', (object, ), {})
 
 
+RENDERS_HTML = 1 # toHTML is overridden, the element must be rendered by calling it
+STREAMS_HTML = 2 # _iterHTML is overridden, the element is streamed by calling it
+RENDERS_TEXT = 3 # a plain TextNode, the element is rendered directly from its text
+RENDERS_CONTENT = 1 # content is overridden, the elements content must be rendered by calling it
+STREAMS_CONTENT = 2 # _iterContent is overridden, the elements content is streamed by calling it
+
+_renderPlans = {}
+
+def renderPlan(cls):
+    """
+        Returns how elements of the given Node class should be rendered, in the form of an
+        (html, content, rendersItself, endsItself) tuple, where html and content are one of the constants defined above
+        or None (if the Node implementation can be used as is) and rendersItself / endsItself signify that _render /
+        endTag have been overridden. The plan is computed once per class and then cached.
+    """
+    plan = _renderPlans.get(cls, None)
+    if plan is None:
+        definedAt = {}
+        for depth, baseClass in enumerate(reversed(cls.__mro__)):
+            for attribute in ('toHTML', '_iterHTML', 'content', '_iterContent', 'text', '_render', 'endTag'):
+                if attribute in baseClass.__dict__:
+                    definedAt[attribute] = (depth, baseClass)
+
+        htmlPlan = None
+        if definedAt['toHTML'][0] > definedAt['_iterHTML'][0]:
+            htmlPlan = RENDERS_HTML
+            if definedAt['toHTML'][1] is TextNode and definedAt['text'][1] is TextNode:
+                htmlPlan = RENDERS_TEXT
+        elif definedAt['_iterHTML'][1] is not Node:
+            htmlPlan = STREAMS_HTML
+
+        contentPlan = None
+        if definedAt['content'][0] > definedAt['_iterContent'][0]:
+            contentPlan = RENDERS_CONTENT
+        elif definedAt['_iterContent'][1] is not Node:
+            contentPlan = STREAMS_CONTENT
+
+        plan = _renderPlans[cls] = (htmlPlan, contentPlan, definedAt['_render'][1] is not Node,
+                                    definedAt['endTag'][1] is not Node)
+    return plan
+
+def htmlFragments(html, formatted=False, indent=None):
+    """
+        Returns the given html as a sequence of streamable fragments:
+            formatted - if True the html is broken up into non-empty lines
+            indent - the indentation to place before each line (None if the html is not nested)
+    """
+    if not html:
+        return ()
+    if not formatted or indent is None:
+        return (html, )
+
+    return [indent + line for line in html.split("\n") if line]
+
+class RenderContext(object):
+    """
+        Holds what the child elements of an element inherit from it and its parents: their prefix, whether they are
+        editable, the script container their scripts are added to, and the request they are being rendered for.
+        While an element's child elements are being rendered (or visited by validators, insertVariables, ...) the
+        context is kept current, so prefix(), editable() and scriptContainer() resolve without walking up the tree.
+    """
+    __slots__ = ('element', 'prefix', 'editable', 'scriptContainer', 'request')
+
+    def __init__(self, element=None, prefix='', editable=True, scriptContainer=None, request=None):
+        self.element = element
+        self.prefix = prefix
+        self.editable = editable
+        self.scriptContainer = scriptContainer
+        self.request = request
+
+    @classmethod
+    def of(cls, element, request=None):
+        """
+            Returns the context inherited by the child elements of element, resolved by walking up the tree
+        """
+        if element is None:
+            return cls(request=request)
+
+        return cls(element, element.prefix(), element.editable(), element.scriptContainer(), request)
+
+    def enter(self, element, request=None):
+        """
+            Returns the context inherited by the child elements of element - which must be a child of this
+            context's element (or have no parent, if this is the context of elements without one)
+        """
+        prefix = element._prefix
+        if prefix is None:
+            prefix = self.prefix
+        elif prefix == " ":
+            prefix = ''
+        editable = element._editable
+        if editable is None:
+            editable = self.editable
+
+        scriptContainer = self.scriptContainer
+        if self.element is None:
+            scriptContainer = element.__scriptContainer__
+
+        return RenderContext(element, prefix or '', editable, scriptContainer,
+                             self.request if request is None else request)
+
+_contexts = threading.local()
+
+def renderContext():
+    """
+        Returns the current RenderContext, or None if no elements are being rendered or visited
+    """
+    return getattr(_contexts, 'current', None)
+
+def childContext(element, request=None):
+    """
+        Returns the RenderContext inherited by the child elements of element (None for elements without a parent),
+        derived from the current context when possible. Unless a request is given the current one is kept.
+    """
+    current = getattr(_contexts, 'current', None)
+    if current is None:
+        return RenderContext.of(element, request)
+    if request is None or request is current.request:
+        if current.element is element:
+            return current
+        request = current.request
+    if element is not None and current.element is element.parent:
+        return current.enter(element, request)
+
+    return RenderContext.of(element, request)
+
+def enterChildren(element):
+    """
+        Makes the RenderContext inherited by the child elements of element current, returning the context it replaces
+        (which should be made current again once the child elements have been visited)
+    """
+    previous = getattr(_contexts, 'current', None)
+    _contexts.current = childContext(element)
+    return previous
+
+def leaveChildren(previous):
+    """
+        Makes the context returned by enterChildren current again
+    """
+    _contexts.current = previous
+
+def renderNodes(nodes, output, formatted=False, indent=None, flushAt=None, dispatch=True, args=(), kwargs=None,
+                request=None):
+    """
+        Renders the given elements(including child elements) into the output list of html fragments, using an
+        explicit stack as opposed to recursion:
+            formatted - if True each fragment is a single line prefixed by its indentation
+            indent - the indentation of the given elements (None if they are not nested)
+            flushAt - if set, the generator yields every time output holds at least this many fragments,
+                      allowing them to be streamed before rendering continues
+            dispatch - if False the html overrides (toHTML, _iterHTML) of the given elements are not used
+                       (used by Node.toHTML and its kind to render the element itself)
+            request - the request being rendered, made available through the RenderContext
+                      (a request keyword argument is treated the same way)
+        The given elements must share the same parent.
+    """
+    if kwargs and 'request' in kwargs:
+        kwargs = kwargs.copy()
+        request = kwargs.pop('request') or request
+    kwargs = kwargs or {}
+    previous = getattr(_contexts, 'current', None)
+    context = childContext(nodes[0].parent if nodes else None, request)
+    memoize = not args and not kwargs and context.request is None
+    _contexts.current = context
+    write = output.append
+    extend = output.extend
+    plans = _renderPlans
+    stack = []
+    siblings = iter(nodes)
+    siblingIndent = indent
+    try:
+        while True:
+            for node in siblings:
+                nodeClass = type(node)
+                htmlPlan, contentPlan, rendersItself, endsItself = plans.get(nodeClass, None) or renderPlan(nodeClass)
+                if dispatch and memoize and node._renderCache is not None and htmlPlan is not RENDERS_TEXT:
+                    htmlPlan = RENDERS_HTML
+                if htmlPlan and dispatch:
+                    if htmlPlan is STREAMS_HTML:
+                        for fragment in node._iterHTML(formatted, siblingIndent, *args, **kwargs):
+                            write(fragment)
+                            if flushAt and len(output) >= flushAt:
+                                _contexts.current = previous
+                                yield
+                                _contexts.current = context
+                        continue
+
+                    if htmlPlan is RENDERS_TEXT:
+                        html = unicode(node._text)
+                    else:
+                        html = node.toHTML(formatted, *args, **kwargs)
+                    if formatted:
+                        extend(htmlFragments(html, formatted, siblingIndent))
+                    else:
+                        write(html)
+                    continue
+
+                if rendersItself:
+                    node._render()
+                if formatted:
+                    extend(htmlFragments(node.startTag(), formatted, siblingIndent))
+                else:
+                    write(node.startTag())
+
+                if contentPlan is RENDERS_CONTENT:
+                    if formatted:
+                        extend(htmlFragments(node.content(formatted, *args, **kwargs), formatted, siblingIndent))
+                    else:
+                        write(node.content(formatted, *args, **kwargs))
+                elif contentPlan is STREAMS_CONTENT:
+                    for fragment in node._iterContent(formatted, siblingIndent, *args, **kwargs):
+                        write(fragment)
+                        if flushAt and len(output) >= flushAt:
+                            _contexts.current = previous
+                            yield
+                            _contexts.current = context
+                elif node._childElements:
+                    stack.append((siblings, siblingIndent, node, dispatch, endsItself, context))
+                    siblings = iter(node._childElements)
+                    if formatted:
+                        siblingIndent = (siblingIndent or '') + (node._tagName and Settings.INDENTATION or '')
+                    dispatch = True
+                    if node._prefix is None and node._editable is None and context.element is not None:
+                        context = RenderContext(node, context.prefix, context.editable, context.scriptContainer,
+                                                context.request)
+                    else:
+                        context = context.enter(node)
+                    _contexts.current = context
+                    break
+
+                if endsItself:
+                    if formatted:
+                        extend(htmlFragments(node.endTag(), formatted, siblingIndent))
+                    else:
+                        write(node.endTag())
+                elif node._tagName and not node._tagSelfCloses:
+                    write("</" + node._tagName + ">")
+                    if formatted and siblingIndent:
+                        output[-1] = siblingIndent + output[-1]
+                if flushAt and len(output) >= flushAt:
+                    _contexts.current = previous
+                    yield
+                    _contexts.current = context
+            else:
+                if not stack:
+                    return
+
+                siblings, siblingIndent, node, dispatch, endsItself, context = stack.pop()
+                _contexts.current = context
+                if endsItself:
+                    if formatted:
+                        extend(htmlFragments(node.endTag(), formatted, siblingIndent))
+                    else:
+                        write(node.endTag())
+                elif node._tagName and not node._tagSelfCloses:
+                    write("</" + node._tagName + ">")
+                    if formatted and siblingIndent:
+                        output[-1] = siblingIndent + output[-1]
+                if flushAt and len(output) >= flushAt:
+                    _contexts.current = previous
+                    yield
+                    _contexts.current = context
+    finally:
+        if getattr(_contexts, 'current', None) is context:
+            _contexts.current = previous
+
+def iterRendered(nodes, formatted=False, indent=None, dispatch=True, args=(), kwargs=None, request=None):
+    """
+        Returns a generator that yields the html fragments of the given elements as they are rendered
+        (see renderNodes)
+    """
+    output = []
+    for flush in renderNodes(nodes, output, formatted, indent, 64, dispatch, args, kwargs, request):
+        for fragment in output:
+            yield fragment
+        del output[:]
+
+    for fragment in output:
+        yield fragment
+
+_startTags = {}
+_memoizing = False # set while any element is memoized, until then changes don't need to be reported to parents
+_memoized = weakref.WeakSet()
+renderCacheStats = {'hits': 0, 'misses': 0}
+
+def attributeHTML(name, value):
+    """
+        Returns the given attribute as it should appear within a start tag (for example ' name="value"'),
+        or an empty string if the attribute should not be rendered. Values that are already Safe, Set or StyleDict
+        are serialized directly, anything else is treated as Unsafe.
+    """
+    valueType = type(value)
+    if valueType is Set or valueType is WatchedSet:
+        if not value:
+            return ''
+        return ' ' + name + '="' + escape(" ".join(value), True) + '"'
+    elif valueType is StyleDict or valueType is WatchedStyleDict:
+        if not value:
+            return ''
+        return ' ' + name + '="' + escape(value.toString(), True) + '"'
+    elif valueType is unicode or valueType is str or valueType is Unsafe:
+        if not value:
+            return ''
+        html = escape(value, True)
+    elif valueType is Safe:
+        if not value:
+            return ''
+        html = value.replace('"', '&quot;')
+    else:
+        if value is None:
+            return ''
+        if not isinstance(value, WebDataType):
+            value = Unsafe(value)
+        if not value:
+            return ''
+        html = unicode(value).replace('"', '&quot;')
+
+    if value == '_BLANK_':
+        html = ""
+    elif value == '_EMPTY_':
+        return ' ' + name
+
+    return ' ' + name + '="' + html + '"'
+
+def compileStartTag(cls, tagName):
+    """
+        Returns the static parts of the start tag for elements of the given class and tag name, in the form of an
+        (opening, tagAttributes, tagAttributeNames) tuple. The result is computed once and then cached.
+    """
+    startTag = _startTags.get((cls, tagName), None)
+    if startTag is None:
+        startTag = _startTags[(cls, tagName)] = ("<" + tagName,
+                                                 "".join([attributeHTML(name, value) for name, value in
+                                                          cls.tagAttributes]),
+                                                 frozenset([name for name, value in cls.tagAttributes]))
+    return startTag
+
+
+def watched(containerType, mutators):
+    """
+        Returns a subclass of containerType that is bound to an element, and reports every change made through one
+        of the given mutators by invalidating it (see Node.invalidate) - allowing memoized html and indexes to be
+        kept until an element's attributes, classes, or style actually change, instead of until they are accessed.
+        mutators maps the name of each mutator to a function telling whether a call will change the container
+        (or None if every call does), so setting a value the container already holds is not reported.
+    """
+    def reporting(mutator, changes):
+        def report(self, *args, **kwargs):
+            if changes is not None and not changes(self, *args, **kwargs):
+                return mutator(self, *args, **kwargs)
+            result = mutator(self, *args, **kwargs)
+            self.element.invalidate()
+            return result
+        report.__name__ = mutator.__name__
+        return report
+
+    def __init__(self, element, contents=()):
+        containerType.__init__(self, contents)
+        self.element = element
+
+    def __reduce__(self):
+        return (self.__class__, (self.element, containerType(self)))
+
+    namespace = dict((mutator, reporting(getattr(containerType, mutator), changes))
+                     for mutator, changes in iteritems(mutators))
+    namespace.update({'__slots__': ('element', ), '__init__': __init__, '__reduce__': __reduce__})
+    return type(str('Watched' + containerType.__name__[0].upper() + containerType.__name__[1:]), (containerType, ),
+                namespace)
+
+def _sameValue(value, otherValue):
+    return value is otherValue or (type(value) is type(otherValue) and value == otherValue)
+
+DICT_MUTATORS = {'__setitem__': lambda self, key, value: key not in self or not _sameValue(self[key], value),
+                 '__delitem__': None,
+                 'clear': lambda self: bool(self),
+                 'pop': lambda self, key, *default: key in self,
+                 'popitem': None,
+                 'setdefault': lambda self, key, default=None: key not in self,
+                 'update': None}
+SET_MUTATORS = {'add': lambda self, item: item not in self,
+                'discard': lambda self, item: item in self,
+                'remove': None,
+                'pop': None,
+                'clear': lambda self: bool(self),
+                'update': None, 'difference_update': None, 'intersection_update': None,
+                'symmetric_difference_update': None, '__ior__': None, '__iand__': None, '__isub__': None,
+                '__ixor__': None}
+WatchedDict = watched(dict, DICT_MUTATORS)
+WatchedSet = watched(Set, SET_MUTATORS)
+WatchedStyleDict = watched(StyleDict, DICT_MUTATORS)
+
+
+class ChildElements(list):
+    """
+        The list of child elements held by a Node, which additionally keeps track of where each child is placed -
+        allowing membership tests, index lookups, and removal of a child without scanning the list.
+        Every child is given an ascending sequence number on append, so its position can be found by bisecting
+        them; operations that reorder the list renumber it as a whole.
+        Any change made to the list discards the html memoized for the element owning it (see Node.setMemoized).
+    """
+    __slots__ = ('_sequence', '_nextSequence', '_positions', '_duplicates', 'owner')
+
+    def __init__(self, childElements=(), owner=None):
+        list.__init__(self, childElements)
+        self.owner = owner
+        self._reindex()
+
+    def __reduce__(self):
+        return (self.__class__, (list(self), self.owner))
+
+    def _changed(self):
+        if _memoizing and self.owner is not None:
+            self.owner.invalidate()
+
+    def _reindex(self):
+        self._sequence = list(range(len(self)))
+        self._nextSequence = len(self)
+        self._positions = positions = {}
+        self._duplicates = 0
+        for index, childElement in enumerate(self):
+            if id(childElement) in positions:
+                self._duplicates += 1
+            else:
+                positions[id(childElement)] = index
+
+    def _index(self, childElement):
+        sequenceNumber = self._positions.get(id(childElement), None)
+        if sequenceNumber is None:
+            return None
+        return bisect_left(self._sequence, sequenceNumber)
+
+    def _delete(self, index):
+        childElement = self[index]
+        list.__delitem__(self, index)
+        del self._sequence[index]
+        if self._duplicates:
+            self._reindex()
+        else:
+            del self._positions[id(childElement)]
+
+    def __contains__(self, childElement):
+        return id(childElement) in self._positions
+
+    def index(self, childElement, *args):
+        index = not args and self._index(childElement)
+        if index is None:
+            raise ValueError("%r is not a child element" % (childElement, ))
+        if index is False:
+            return list.index(self, childElement, *args)
+        return index
+
+    def append(self, childElement):
+        sequenceNumber = self._nextSequence
+        self._nextSequence = sequenceNumber + 1
+        list.append(self, childElement)
+        self._sequence.append(sequenceNumber)
+        positions = self._positions
+        if id(childElement) in positions:
+            self._duplicates += 1
+        else:
+            positions[id(childElement)] = sequenceNumber
+        if Selectors.indexing:
+            Selectors.placed(childElement)
+        self._changed()
+
+    def extend(self, childElements):
+        for childElement in childElements:
+            self.append(childElement)
+
+    def __iadd__(self, childElements):
+        self.extend(childElements)
+        return self
+
+    def remove(self, childElement):
+        index = self._index(childElement)
+        if index is None:
+            raise ValueError("%r is not a child element" % (childElement, ))
+        self._delete(index)
+        self._changed()
+
+    def removeAll(self, childElements):
+        """
+            Removes every occurrence of the given child elements in a single pass
+        """
+        removing = set(id(childElement) for childElement in childElements if id(childElement) in self._positions)
+        if removing:
+            list.__setitem__(self, slice(None), [childElement for childElement in self
+                                                 if id(childElement) not in removing])
+            self._reindex()
+            self._changed()
+
+    def pop(self, index=-1):
+        childElement = self[index]
+        self._delete(index)
+        self._changed()
+        return childElement
+
+    def __setitem__(self, index, value):
+        if type(index) is slice:
+            list.__setitem__(self, index, value)
+            self._reindex()
+            self._changed()
+            return
+
+        if self._duplicates or id(value) in self._positions:
+            list.__setitem__(self, index, value)
+            self._reindex()
+        else:
+            del self._positions[id(self[index])]
+            list.__setitem__(self, index, value)
+            self._positions[id(value)] = self._sequence[index]
+        if Selectors.indexing:
+            Selectors.placed(value)
+        self._changed()
+
+    def __delitem__(self, index):
+        if type(index) is slice:
+            list.__delitem__(self, index)
+            self._reindex()
+        else:
+            self._delete(index)
+        self._changed()
+
+    def __setslice__(self, start, end, values):
+        list.__setslice__(self, start, end, values)
+        self._reindex()
+        self._changed()
+
+    def __delslice__(self, start, end):
+        list.__delslice__(self, start, end)
+        self._reindex()
+        self._changed()
+
+    def __imul__(self, times):
+        list.__imul__(self, times)
+        self._reindex()
+        self._changed()
+        return self
+
+    def clear(self):
+        del self[:]
+
+    def insert(self, index, childElement):
+        list.insert(self, index, childElement)
+        self._reindex()
+        if Selectors.indexing:
+            Selectors.placed(childElement)
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        list.sort(self, *args, **kwargs)
+        self._reindex()
+        self._changed()
+
+    def reverse(self):
+        list.reverse(self)
+        self._reindex()
+        self._changed()
+
+
 class Node(Connectable):
     '''The base node wich all custom dom elements should extend.'''
     __slots__ = ('_tagName', '_prefix', '__scriptTemp__', 'validator', '_editable',
                  '__scriptContainer__', 'id', 'name', 'parent', '_style', '_classes', '_attributes',
-                 '_childElements', 'addsTo', '_tagSelfCloses', '_clientSide')
+                 '_childElements', 'addsTo', '_tagSelfCloses', '_clientSide', '_renderCache', '_index')
     tagSelfCloses = False
     allowsChildren = True
     displayable = True
@@ -113,6 +675,10 @@ class Node(Connectable):
     properties['itemtype'] = {'action':'attribute'}
     properties['text'] = {'action':'setContent'}
     tagName = ""
+    # (name, value) attributes rendered on the start tag of every instance, they are kept out of the attributes
+    # dictionary so instances don't have to store them - an attribute of the same name set on an instance replaces
+    # the class default (set it to None to leave it out)
+    tagAttributes = ()
 
     class ClientSide(AutoAddScripts):
         """
@@ -783,6 +1349,8 @@ class Node(Connectable):
 
         self._childElements = None
         self.addsTo = self
+        self._renderCache = None
+        self._index = None
 
         self.__scriptTemp__ = None
         self.__scriptContainer__ = None
@@ -795,7 +1363,7 @@ class Node(Connectable):
             Returns the element's attributes (creating them on-demand in a lazy fashion)
         """
         if self._attributes is None:
-            self._attributes = {}
+            self._attributes = WatchedDict(self) if _memoizing or Selectors.indexing else {}
 
         return self._attributes
 
@@ -805,7 +1373,7 @@ class Node(Connectable):
             Returns the element's classes (creating them on-demand in a lazy fashion)
         """
         if self._classes is None:
-            self._classes = Set([])
+            self._classes = WatchedSet(self) if _memoizing or Selectors.indexing else Set()
 
         return self._classes
 
@@ -815,7 +1383,7 @@ class Node(Connectable):
             Returns the element's style dictionary (creating it on-demand in a lazy fashion)
         """
         if self._style is None:
-            self._style = StyleDict()
+            self._style = WatchedStyleDict(self) if _memoizing or Selectors.indexing else StyleDict()
 
         return self._style
 
@@ -825,7 +1393,7 @@ class Node(Connectable):
             Returns the children of the element (creating them on-demand in a lazy fashion)
         """
         if self._childElements is None:
-            self._childElements = []
+            self._childElements = ChildElements(owner=self)
 
         return self._childElements
 
@@ -836,8 +1404,14 @@ class Node(Connectable):
         """
         if not childElements:
             self._childElements = None
-        else:
+        elif isinstance(childElements, ChildElements):
             self._childElements = childElements
+            childElements.owner = self
+        else:
+            self._childElements = ChildElements(childElements, self)
+        if Selectors.indexing:
+            Selectors.changed(self, childElements=True)
+        self.invalidate()
 
     @property
     def clientSide(self):
@@ -852,7 +1426,10 @@ class Node(Connectable):
         """
             clears the element of all children
         """
-        self._childElements = []
+        self._childElements = ChildElements(owner=self)
+        if Selectors.indexing:
+            Selectors.changed(self, childElements=True)
+        self.invalidate()
 
     def hide(self):
         """
@@ -874,7 +1451,7 @@ class Node(Connectable):
         """
             Returns True if the element is visible
         """
-        if self.style.get('display', "") == "none":
+        if self._style and self._style.get('display', "") == "none":
             return False
 
         return True
@@ -925,72 +1502,65 @@ class Node(Connectable):
         """
         return Queryable(self.allChildren())
 
+    def select(self, selector):
+        """
+            Returns all child elements matching a css selector, in the order they appear, for example:
+                form.select("#main .WError > input[name=foo]")
+
+            Supports tag names, ids, classes, attributes ([name], [name=value], [name~=value], [name^=value],
+            [name$=value], [name*=value], [name|=value]), the descendant, child (>), and sibling (+ ~) combinators,
+            and comma separated groups of selectors.
+        """
+        return Selectors.select(self, selector)
+
     def getChildElementsWithClass(self, className):
         """
             Returns all elements with className specified
         """
-        childrenWithClass = []
-        for child in self.childElements:
-            if child.hasClass(className):
-                childrenWithClass.append(child)
-            childrenWithClass.extend(child.getChildElementsWithClass(className))
-
-        return childrenWithClass
+        return Selectors.find(self, (Selectors.CLASS, className))
 
     def getChildElementsWithName(self, name):
         """
             Returns all elements with the name specified
         """
-        childrenWithName = []
-        for child in self.childElements:
-            if child.name == name:
-                childrenWithName.append(child)
-            childrenWithName.extend(child.getChildElementsWithName(name))
-
-        return childrenWithName
+        return Selectors.find(self, (Selectors.NAME, name))
 
     def getChildElementsWithTagName(self, tagName):
         """
             Returns all elements with the tagName specified
         """
-        childrenWithTagName = []
-        for child in self.childElements:
-            if child._tagName == tagName:
-                childrenWithTagName.append(child)
-            childrenWithTagName.extend(child.getChildElementsWithTagName(tagName))
-
-        return childrenWithTagName
+        return Selectors.find(self, (Selectors.TAG, tagName))
 
     def getChildElementWithId(self, elementId):
         """
-            Returns all elements with the id specified
+            Returns the first element with the id specified
         """
-        childrenWithId = None
-        for child in self:
-            if child.id == elementId:
-                return child
-            nestedChild = child.getChildElementWithId(elementId)
-            if nestedChild:
-                return nestedChild
+        childrenWithId = Selectors.find(self, (Selectors.ID, elementId))
+        if childrenWithId:
+            return childrenWithId[0]
 
     def errors(self):
         """
             Returns all errors present and visible within this element
         """
-        return self.query().filter(classes__contains="WError", shown=True)
+        return Queryable(self.getChildElementsWithClass("WError")).filter(shown=True).results()
 
     def prefix(self):
         """
             Returns the prefix set for this element or the first parent element with one set
         """
-        if self._prefix is None and self.parent:
-            prefix = self.parent.prefix()
-        elif self._prefix == " ":
-            return ''
-        else:
-            prefix = self._prefix or ''
-
-        return prefix
+        context = getattr(_contexts, 'current', None)
+        contextElement = context.element if context is not None else None
+        element = self
+        while True:
+            prefix = element._prefix
+            if prefix is not None:
+                return prefix != " " and prefix or ''
+            element = element.parent
+            if element is None:
+                return ''
+            if element is contextElement:
+                return context.prefix
 
     def setPrefix(self, prefix):
         """
@@ -999,6 +1569,7 @@ class Node(Connectable):
                 prefix - the string that will be placed before all ids/names
         """
         self._prefix = prefix
+        self.invalidate(childElements=True)
 
     def moveElement(self, childElement, putAfter):
         """
@@ -1029,6 +1600,11 @@ class Node(Connectable):
                 childElement.parent.removeChild(childElement)
             childElement.parent = self.addsTo
             self.addsTo.childElements.append(childElement)
+            if _memoizing:
+                childElement.discardRendered()
+            if self.addsTo._renderCache is not None and childElement._renderCache is None:
+                childElement.setMemoized(True)
+            self.addsTo.invalidate()
 
             scriptTemp = childElement.__scriptTemp__
             if scriptTemp:
@@ -1039,6 +1615,61 @@ class Node(Connectable):
         else:
             return False
 
+    def extend(self, childElements, ensureUnique=True):
+        """
+            Adds many child elements within this element at once, removing them from their previous parents
+            (one pass per previous parent) and invalidating this element only once:
+                childElements - the elements to add
+                ensureUnique - if set to True elements that already have a parent will be removed from it first
+
+            Returns the list of elements added
+        """
+        if type(self).add is not Node.add:
+            added = (self.add(childElement, ensureUnique) for childElement in childElements)
+            return [childElement for childElement in added if childElement is not False]
+
+        addsTo = self.addsTo
+        if not addsTo.allowsChildren:
+            return []
+
+        childElements = [type(childElement) == type and childElement(parent=self) or childElement
+                         for childElement in childElements]
+        if ensureUnique:
+            previousParents = {}
+            for childElement in childElements:
+                parent = childElement.parent
+                if parent:
+                    previousParents.setdefault(id(parent), (parent, []))[1].append(childElement)
+            for previousParent, removing in previousParents.values():
+                previousChildren = previousParent._childElements
+                if previousChildren and isinstance(previousChildren, ChildElements):
+                    if Selectors.indexing:
+                        for childElement in removing:
+                            Selectors.detached(childElement)
+                    previousChildren.removeAll(removing)
+                    previousParent.invalidate()
+                else:
+                    for childElement in removing:
+                        previousParent.removeChild(childElement)
+
+        memoize = addsTo._renderCache is not None
+        addsToChildren = addsTo.childElements
+        for childElement in childElements:
+            childElement.parent = addsTo
+            addsToChildren.append(childElement)
+            if _memoizing:
+                childElement.discardRendered()
+            if memoize and childElement._renderCache is None:
+                childElement.setMemoized(True)
+
+            scriptTemp = childElement.__scriptTemp__
+            if scriptTemp:
+                for script in scriptTemp:
+                    self.addScript(script)
+        addsTo.invalidate()
+
+        return childElements
+
     def indentationLevel(self):
         """
             Returns a number representing the number of parent elements
@@ -1054,9 +1685,16 @@ class Node(Connectable):
                 replacementElement - the element to replace it with
         """
         if self.parent:
+            if Selectors.indexing:
+                Selectors.detached(self)
             index = self.parent.childElements.index(self)
             self.parent.childElements[index] = replacementElement
             replacementElement.parent = self.parent
+            if Selectors.indexing:
+                Selectors.changed(replacementElement)
+            if _memoizing:
+                replacementElement.discardRendered()
+            self.parent.invalidate()
             return replacementElement
         else:
             return Invalid()
@@ -1091,8 +1729,12 @@ class Node(Connectable):
 
             validatorDict[validatorId] = validator
 
-        for child in (child  for child in self.childElements):
-            validatorDict.update(child.validators(useFullId))
+        previous = enterChildren(self)
+        try:
+            for child in self.childElements:
+                validatorDict.update(child.validators(useFullId))
+        finally:
+            leaveChildren(previous)
 
         return validatorDict
 
@@ -1101,7 +1743,7 @@ class Node(Connectable):
             Returns true if the elements classes includes className:
                 className - the class name to look for
         """
-        return className in self.classes
+        return self._classes is not None and className in self._classes
 
     def addClass(self, className):
         """
@@ -1129,7 +1771,8 @@ class Node(Connectable):
 
     def setClasses(self, classes):
         """ Replace all current classes with a list of classes """
-        self._classes = Set(classes)
+        self._classes = WatchedSet(self, classes) if _memoizing or Selectors.indexing else Set(classes)
+        self.invalidate()
         return self
 
     def removeClass(self, className):
@@ -1145,14 +1788,18 @@ class Node(Connectable):
         """
             Returns true if the input-type field in the element are editable
         """
-        editable = self._editable
-        if editable is None:
-            if self.parent:
-                return self.parent.editable()
-            else:
+        context = getattr(_contexts, 'current', None)
+        contextElement = context.element if context is not None else None
+        element = self
+        while True:
+            editable = element._editable
+            if editable is not None:
+                return editable
+            element = element.parent
+            if element is None:
                 return True
-
-        return editable
+            if element is contextElement:
+                return context.editable
 
     def setEditable(self, editable):
         """
@@ -1160,6 +1807,7 @@ class Node(Connectable):
                 editable - setting this to True would allow input fields to be user-editable
         """
         self._editable = editable
+        self.invalidate(childElements=True)
         self.emit('editableChanged', editable)
         return self
 
@@ -1170,10 +1818,17 @@ class Node(Connectable):
         """
             Returns the root script container
         """
-        if self.parent:
-            return self.parent.scriptContainer()
+        context = getattr(_contexts, 'current', None)
+        contextElement = context.element if context is not None else None
+        element = self
+        parent = element.parent
+        while parent is not None and parent is not element:
+            if parent is contextElement:
+                return context.scriptContainer
+            element = parent
+            parent = element.parent
 
-        return self.__scriptContainer__
+        return element.__scriptContainer__
 
     def setScriptContainer(self, scriptContainer):
         """
@@ -1239,15 +1894,15 @@ class Node(Connectable):
         """
             Adds a clientside action to be done on event:
                 event - the name of the event to connect the javascript to (such as onclick)
-                javascript - the script text or function to call on event
+                javascript - the script text or function to call on event (unless it is already connected to it)
         """
         if hasattr(javascript, 'claim'):
             javascript = javascript.claim() + ";"
-        if type(event) in (list, tuple):
-            for eventName in event:
-                self.attributes.setdefault(eventName, Scripts()).append(javascript)
-        else:
-            self.attributes.setdefault(event, Scripts()).append(javascript)
+        for eventName in (event if type(event) in (list, tuple) else (event, )):
+            scripts = self.attributes.setdefault(eventName, Scripts())
+            if javascript not in scripts:
+                scripts.append(javascript)
+                self.invalidate()
 
     def removeJavascriptEvent(self, event, javascript=None):
         """
@@ -1256,15 +1911,17 @@ class Node(Connectable):
                 javascript - the specific action to remove(if not set all actions are removed)
         """
         if javascript:
-            return self.attributes[event].remove(javascript)
-        self.attributes.pop(event, None)
+            self.attributes[event].remove(javascript)
+            self.invalidate()
+        else:
+            self.attributes.pop(event, None)
 
     def javascriptEvent(self, event):
         """
             Returns the action associated with a particular client-side event:
                 event - the name of the client side event
         """
-        return str(self.attributes.get(event, ''))
+        return str((self._attributes or {}).get(event, ''))
 
     def removeChild(self, child):
         """
@@ -1273,49 +1930,139 @@ class Node(Connectable):
 
             Returns the removed child on success or None on failure
         """
-        if child in self.childElements:
-            self.childElements.remove(child)
+        childElements = self._childElements
+        if childElements and child in childElements:
+            if Selectors.indexing:
+                Selectors.detached(child)
+            childElements.remove(child)
             child.parent = None
+            self.invalidate()
             return child
 
+    def memoized(self):
+        """
+            Returns True if the element keeps its rendered html between renders
+        """
+        return self._renderCache is not None
+
+    def setMemoized(self, memoized=True):
+        """
+            Changes whether the element and its child elements keep their rendered html between renders,
+            so that only the elements changed since the last render (and the elements containing them) are rendered
+            again:
+                memoized - if set to True html memoization is enabled for the element and all its children
+
+            Changes made through the element's methods (add, removeChild, setProperty, addClass, setPrefix, ...),
+            or through its attributes, classes, and style are detected automatically, others (such as setting id or
+            name) require a call to invalidate(). Html rendered with additional arguments, or for a request, is never
+            memoized.
+        """
+        global _memoizing
+        if memoized:
+            _memoizing = True
+            _memoized.add(self)
+
+        elements = [self]
+        while elements:
+            element = elements.pop()
+            if not memoized:
+                element._renderCache = None
+                _memoized.discard(element)
+            elif element._renderCache is None:
+                element._renderCache = {}
+                element.watchChanges()
+
+            if element._childElements:
+                elements.extend(element._childElements)
+
+        if not memoized:
+            _memoizing = bool(_memoized)
+        return self
+
+    def watchChanges(self):
+        """
+            Makes changes to the element's attributes, classes, and style invalidate it from now on (see watched),
+            as is needed once the element is memoized or indexed
+        """
+        if type(self._attributes) is dict:
+            self._attributes = WatchedDict(self, self._attributes)
+        if type(self._classes) is Set:
+            self._classes = WatchedSet(self, self._classes)
+        if type(self._style) is StyleDict:
+            self._style = WatchedStyleDict(self, self._style)
+        return self
+
+    def invalidate(self, childElements=False):
+        """
+            Discards the html memoized for the element and all its parents (see setMemoized):
+                childElements - if set to True the html memoized for all child elements is discarded as well
+
+            Elements that have been looked up using select are re-indexed as well (when childElements is set to True
+            all of the tree is).
+        """
+        if Selectors.indexing:
+            Selectors.changed(self, childElements)
+        if not _memoizing:
+            return self
+
+        element = self
+        while element is not None:
+            if element._renderCache:
+                element._renderCache.clear()
+            if element.parent is element:
+                break
+            element = element.parent
+
+        if childElements:
+            self.discardRendered()
+
+        return self
+
+    def discardRendered(self):
+        """
+            Discards the html memoized for the element and all its child elements, leaving its parents untouched
+            (used when the element is moved, as its html depends on the prefix and editable state it inherits)
+        """
+        elements = [self]
+        while elements:
+            element = elements.pop()
+            if element._renderCache:
+                element._renderCache.clear()
+            if element._childElements:
+                elements.extend(element._childElements)
+
+        return self
+
     def startTag(self):
         """
             Returns the elements html start tag,
                 for example '<span class="whateverclass">'
         """
-        if not self._tagName:
+        tagName = self._tagName
+        if not tagName:
             return u('')
 
-        nativeAttributes = (('name', self.fullName()),
-                            ('id', self.fullId()),
-                            ('class', self._classes),
-                            ('style', self._style),)
-        startTag = "<" + self._tagName + " "
-
-        attributes = nativeAttributes
-        if self._attributes is not None:
-            attributes = chain(attributes, iteritems(self.attributes))
-        for key, value in attributes:
-            if value is not None:
-                if not isinstance(value, WebDataType):
-                    value = Unsafe(value)
-                if value:
-                    if value == '_BLANK_':
-                        value = ""
-
-                    if value == '_EMPTY_':
-                        startTag += key + " "
-                    else:
-
-                        startTag += key + '="' + unicode(value).replace('"', '&quot;') + '" '
-
-        if self._tagSelfCloses:
-            startTag += '/'
+        opening, tagAttributes, tagAttributeNames = (_startTags.get((type(self), tagName), None) or
+                                                     compileStartTag(type(self), tagName))
+        startTag = [opening, attributeHTML('name', self.fullName()), attributeHTML('id', self.fullId())]
+        if self._classes:
+            startTag.append(attributeHTML('class', self._classes))
+        if self._style:
+            startTag.append(attributeHTML('style', self._style))
+
+        attributes = self._attributes
+        if not attributes:
+            startTag.append(tagAttributes)
         else:
-            startTag = startTag[:-1]
-        startTag += '>'
+            if tagAttributeNames.isdisjoint(attributes):
+                startTag.append(tagAttributes)
+            else:
+                startTag.extend([attributeHTML(name, value) for name, value in type(self).tagAttributes
+                                 if name not in attributes])
+            startTag.extend([attributeHTML(name, value) for name, value in iteritems(attributes)])
 
-        return unicode(startTag)
+        startTag.append(self._tagSelfCloses and ' />' or '>')
+        return unicode("".join(startTag))
 
     def endTag(self):
         """
@@ -1334,12 +2081,16 @@ class Node(Connectable):
         if self._childElements is None:
             return ''
 
-        elements = [element.toHTML(formatted=formatted, *args, **kwargs) for element in self.childElements]
+        output = []
         if formatted:
-            return "\n".join([(self._tagName and Settings.INDENTATION or '') +
-                               line for line in "\n".join(elements).split("\n") if line])
-        else:
-            return ''.join(elements)
+            for flush in renderNodes(self._childElements, output, True, self._tagName and Settings.INDENTATION or '',
+                                     args=args, kwargs=kwargs):
+                pass
+            return "\n".join(output)
+
+        for flush in renderNodes(self._childElements, output, args=args, kwargs=kwargs):
+            pass
+        return ''.join(output)
 
     def insertVariables(self, variableDict=None):
         """
@@ -1349,8 +2100,12 @@ class Node(Connectable):
         if variableDict is None:
             variableDict = {}
 
-        for child in self.childElements:
-            child.insertVariables(variableDict)
+        previous = enterChildren(self)
+        try:
+            for child in self.childElements:
+                child.insertVariables(variableDict)
+        finally:
+            leaveChildren(previous)
 
     def exportVariables(self, exportedVariables=None, flat=False):
         """
@@ -1360,8 +2115,12 @@ class Node(Connectable):
         if exportedVariables is None:
             exportedVariables = {}
 
-        for child in self.childElements:
-            child.exportVariables(exportedVariables, flat)
+        previous = enterChildren(self)
+        try:
+            for child in self.childElements:
+                child.exportVariables(exportedVariables, flat)
+        finally:
+            leaveChildren(previous)
 
         return exportedVariables
 
@@ -1377,8 +2136,12 @@ class Node(Connectable):
             reqDict.pop(self.name, '')
             reqDict.pop(self.fullName() , '')
 
-        for child in (child for child in self.childElements):
-            child.clearFromRequest(reqDict)
+        previous = enterChildren(self)
+        try:
+            for child in self.childElements:
+                child.clearFromRequest(reqDict)
+        finally:
+            leaveChildren(previous)
 
     def setStyleFromString(self, string):
         """
@@ -1433,6 +2196,7 @@ class Node(Connectable):
         else:
             objectWithProperty.__getattribute__(propertyAction)(value)
 
+        self.invalidate()
         return self
 
     def setProperties(self, properties):
@@ -1459,16 +2223,72 @@ class Node(Connectable):
         """
            Returns the element(including child elements) as standard html
         """
-        self._render()
+        cache = self._renderCache
+        if cache is not None and (args or kwargs or getattr(_contexts, 'current', None) is not None and
+                                  _contexts.current.request is not None):
+            cache = None
+        if cache is not None:
+            html = cache.get(bool(formatted), None)
+            if html is not None:
+                renderCacheStats['hits'] += 1
+                return html
+            renderCacheStats['misses'] += 1
+
+        output = []
+        for flush in renderNodes((self, ), output, formatted, dispatch=False, args=args, kwargs=kwargs):
+            pass
+        html = formatted and "\n".join(output) or "".join(output)
+
+        if cache is not None:
+            cache[bool(formatted)] = html
+        return html
 
-        data = (self.startTag() or '', self.content(formatted, *args, **kwargs), self.endTag() or '')
+    def iterHTML(self, formatted=False, chunkSize=None, *args, **kwargs):
+        """
+            Returns a generator that yields the element(including child elements) as standard html, in chunks of
+            at least chunkSize characters (Settings.CHUNK_SIZE by default). Joined together the chunks are identical
+            to the output of toHTML, but the page is never held in memory as a whole.
+        """
+        chunkSize = chunkSize or Settings.CHUNK_SIZE
+        separator = formatted and "\n" or ""
 
-        if formatted:
-            html = "\n".join([data for data in data if data])
-        else:
-            html = "".join(data)
+        chunk = []
+        chunkLength = 0
+        leading = ""
+        for fragment in iterRendered((self, ), formatted, None, True, args, kwargs):
+            if leading:
+                chunk.append(leading)
+            chunk.append(fragment)
+            leading = separator
+            chunkLength += len(fragment)
+            if chunkLength >= chunkSize:
+                yield "".join(chunk)
+                chunk = []
+                chunkLength = 0
 
-        return html
+        if chunk:
+            yield "".join(chunk)
+
+    def _iterHTML(self, formatted=False, indent=None, *args, **kwargs):
+        """
+            Yields the html fragments that make up the element(including child elements), when formatted each
+            fragment is a single line prefixed with indent (unless indent is None - meaning the element is the
+            one being rendered).
+            Should be overriden alongside toHTML by child classes that want to stream their output.
+        """
+        return iterRendered((self, ), formatted, indent, False, args, kwargs)
+
+    def _iterContent(self, formatted=False, indent=None, *args, **kwargs):
+        """
+            Yields the html fragments of the elements content (the html bettween startTag and endTag)
+            Should be overriden alongside content by child classes that want to stream their output.
+        """
+        if self._childElements is None:
+            return ()
+
+        if formatted:
+            indent = (indent or '') + (self._tagName and Settings.INDENTATION or '')
+        return iterRendered(self._childElements, formatted, indent, True, args, kwargs)
 
     def setContent(self, content):
         self.add(TextNode(content))
@@ -1493,11 +2313,13 @@ class Node(Connectable):
     def __setitem__(self, index, value):
         if type(index) == int:
             self.childElements.__setitem__(index, value)
+            self.invalidate()
         else:
             self.setProperty(index, value)
 
     def __delitem__(self, index):
-        return self.childElements.__delitem__(index)
+        self.childElements.__delitem__(index)
+        self.invalidate()
 
     def count(self):
         """
@@ -1538,6 +2360,8 @@ class Node(Connectable):
                     representation.append("|  " + line)
         return "\n".join(representation)
 
+Selectors.reportAssignments(Node)
+
 
 class Invalid(Node):
     """
@@ -1583,6 +2407,7 @@ class TextNode(Node):
             text = Unsafe(text)
 
         self._text = text
+        self.invalidate()
 
     def text(self):
         """
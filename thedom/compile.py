@@ -22,17 +22,44 @@
     Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 '''
 
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+
+import thedom
+
 from .All import Factory
+from .Base import Node, TextNode
+from .Display import CacheElement, KeyedCacheElement
 from .MultiplePythonSupport import *
+from .Resources import ScriptContainer
 from .Types import StyleDict
+from .UITemplate import internTemplate
 
 INDENT = "    "
+CACHE_DIRECTORY = os.environ.get('THEDOM_TEMPLATE_CACHE', None) # set to enable the on disk cache of compiled templates
+CACHE_EXTENSION = ".marshal"
+
+_factorySignatures = {}
+_classSignatures = {}
+
+# Subtrees made up only of element types that leave these methods as Node defines them are pre-rendered at
+# compile time, as long as they are added to a parent that also leaves the rendering methods alone
+STATIC_METHODS = ('insertVariables', 'exportVariables', 'clearFromRequest', '_render', 'add')
+TRANSPARENT_METHODS = STATIC_METHODS + ('toHTML', '_iterHTML', 'content', '_iterContent')
+DYNAMIC_TYPES = (CacheElement, KeyedCacheElement, ScriptContainer)
+DYNAMIC_ACTIONS = ('javascriptEvent', 'send')
+PROBE_PREFIX = "thedomProbe-"
+
 SCRIPT_TEMPLATE = """# WARNING: DON'T EDIT AUTO-GENERATED
 
 from thedom.Base import Node, TextNode
-from thedom.Display import CacheElement, StraightHTML
+from thedom.Display import CacheElement, PreRendered, RenderCache, StraightHTML
 
 elementsExpanded = False
+staticSubtrees = %(staticSubtrees)s
 %(cacheElements)s
 %(staticElements)s
 
@@ -53,6 +80,42 @@ def build(factory):
     
     return template"""
 
+RENDER_TEMPLATE = """# WARNING: DON'T EDIT AUTO-GENERATED
+
+from thedom.All import Factory as factory
+from thedom.Base import Node, TextNode
+from thedom.Display import CacheElement, PreRendered, RenderCache, StraightHTML
+
+elementsExpanded = False
+staticSubtrees = %(staticSubtrees)s
+%(cacheElements)s
+%(staticElements)s
+
+
+class Template(Node):
+    __slots__ = %(accessors)s
+%(liveElements)s
+
+def render(**variables):
+    global elementsExpanded
+    if not elementsExpanded:
+        products = factory.products
+        %(defineElements)s
+        elementsExpanded = True
+
+    return u"".join((%(fragments)s))"""
+
+LIVE_TEMPLATE = """
+
+def live%(instance)s(variables):
+    template = Template()
+    parent = template
+    %(buildTemplate)s
+    if variables:
+        template.insertVariables(variables)
+    return template.toHTML()
+"""
+
 
 class CompiledTemplate(object):
     """
@@ -61,6 +124,8 @@ class CompiledTemplate(object):
         templates that have been compiled and saved into python modules.
     """
     __slots__ = ('execNamespace', 'factory')
+    foldsStatic = False # set on targets that always pre-render static subtrees
+
     def __init__(self, execNamespace, factory):
         self.execNamespace = execNamespace
         self.factory = factory
@@ -71,27 +136,484 @@ class CompiledTemplate(object):
         """
         factory = factory or self.factory
         return self.execNamespace['build'](factory)
+
+    @staticmethod
+    def toPython(template, factory=Factory, foldStatic=False):
+        """
+            Returns the python code the template is compiled from.
+        """
+        return toPython(template, factory, foldStatic)
+
+    @property
+    def staticSubtrees(self):
+        """
+            Returns the paths (such as 'box > layout-horizontal') of the subtrees that were pre-rendered at compile
+            time.
+        """
+        return self.execNamespace.get('staticSubtrees', ())
         
     @classmethod
-    def create(self, template, factory=Factory):
+    def create(self, template, factory=Factory, cacheDirectory=None, foldStatic=False):
         """
             Compiles a template in the current python runtime into optimized python bytecode using compile and exec
             returns a CompiledTemplate instance.
+
+            If foldStatic is True subtrees that can never change are pre-rendered to html at compile time (see
+            staticSubtrees) - the elements within them are then not part of the built tree, so they can not be
+            looked up (by class, selector, ...) or changed after the template is built.
+
+            If a cacheDirectory is given (or CACHE_DIRECTORY is set) the compiled bytecode is stored there, keyed
+            by the template structure, the factory products and the thedom version, so later processes can skip
+            code generation and compilation entirely. Folded code embeds the html of the products it pre-rendered,
+            so its key covers the implementation of every product as well (see implementationSignature) - changing
+            a product's methods or class attributes compiles the template again.
         """
-        code = compile(toPython(template, Factory), '<string>', 'exec')
+        cacheDirectory = cacheDirectory or CACHE_DIRECTORY
+        code = None
+        if cacheDirectory:
+            folds = foldStatic or self.foldsStatic
+            target = foldStatic and self.__name__ + "(foldStatic)" or self.__name__
+            cacheFile = os.path.join(cacheDirectory, cacheKey(template, factory, target, folds) + CACHE_EXTENSION)
+            code = loadCode(cacheFile)
+
+        if code is None:
+            code = compile(self.toPython(template, factory, foldStatic), '<string>', 'exec')
+            if cacheDirectory:
+                saveCode(cacheFile, code)
+
         nameSpace = {}
         exec(code, nameSpace)
-        return CompiledTemplate(nameSpace, Factory)
+        return self(nameSpace, factory)
+
+
+class CompiledRenderer(CompiledTemplate):
+    """
+        Represents a template compiled straight to html producing code: calling 'render(**variables)' returns the
+        same html as building the template, inserting the variables and calling toHTML - but only the parts of the
+        template that need live elements are ever built.
+    """
+    __slots__ = ()
+    foldsStatic = True
+
+    def __init__(self, execNamespace, factory):
+        CompiledTemplate.__init__(self, execNamespace, factory)
+        execNamespace['factory'] = factory
+
+    def render(self, **variables):
+        """
+            Returns the html of the template, with the given (id/name/key):value variables inserted.
+        """
+        return self.execNamespace['render'](**variables)
+
+    @staticmethod
+    def toPython(template, factory=Factory, foldStatic=False):
+        """
+            Returns the python code the template is compiled from (static subtrees are always folded, as no tree
+            is returned that they could be looked up in).
+        """
+        return toRenderer(template, factory)
+
+
+def templateSignature(template):
+    """
+        Returns a hashable tuple that uniquely represents the structure of a UITemplate.Template().
+    """
+    if isinstance(template, basestring):
+        return template
+
+    childElements = template.childElements and tuple(templateSignature(child) for child in template.childElements)
+    return (template.create, template.accessor, template.id, template.name, tuple(template.properties),
+            childElements)
+
+def factorySignature(factory, implementation=False):
+    """
+        Returns a digest that changes whenever the set of products (or the properties they accept) changes:
+            implementation - if True the digest changes with the implementation of any product as well
+    """
+    (products, signature) = _factorySignatures.get((id(factory), implementation), (None, None))
+    if products == factory.products:
+        return signature
+
+    products = []
+    for name, product in sorted(iteritems(factory.products)):
+        properties = sorted((propertyName, sorted(iteritems(propertyDict))) for propertyName, propertyDict in
+                            iteritems(getattr(product, 'properties', None) or {}))
+        products.append((name, product.__module__, product.__name__, properties) +
+                        (implementation and (implementationSignature(product), ) or ()))
+    signature = hashlib.sha1(repr(products).encode('utf8')).hexdigest()
+    _factorySignatures[(id(factory), implementation)] = (factory.products.copy(), signature)
+    return signature
+
+def implementationSignature(product):
+    """
+        Returns a digest of everything the classes making up product define: the bytecode of their methods and the
+        value of their plain class attributes (such as tagName or tagAttributes).
+    """
+    return hashlib.sha1("".join([classSignature(baseClass) for baseClass in product.__mro__
+                                 if baseClass is not object]).encode('utf8')).hexdigest()
+
+def classSignature(cls):
+    """
+        Returns a digest of the methods and plain class attributes a single class defines, computed once per class.
+    """
+    signature = _classSignatures.get(cls, None)
+    if signature is not None:
+        return signature
+
+    digest = hashlib.sha1(("%s.%s" % (cls.__module__, cls.__name__)).encode('utf8'))
+    for name, value in sorted(iteritems(vars(cls)), key=lambda item: item[0]):
+        if isinstance(value, (staticmethod, classmethod)):
+            value = value.__func__
+        if isinstance(value, property):
+            values = (value.fget, value.fset, value.fdel)
+        else:
+            values = (value, )
+
+        digest.update(name.encode('utf8'))
+        for value in values:
+            code = getattr(value, '__code__', None)
+            if code is None:
+                digest.update(valueSignature(value))
+                continue
+
+            digest.update(marshal.dumps(code))
+            for cell in value.__closure__ or ():
+                digest.update(valueSignature(cell.cell_contents))
+            for default in value.__defaults__ or ():
+                digest.update(valueSignature(default))
+    signature = _classSignatures[cls] = digest.hexdigest()
+    return signature
+
+def valueSignature(value):
+    """
+        Returns a stable representation of a plain value (strings, numbers, and containers of them),
+        anything else is represented by its type alone.
+    """
+    if isinstance(value, (set, frozenset)):
+        representation = repr(sorted(repr(item) for item in value))
+    elif isinstance(value, (basestring, bytes, int, float, bool, tuple, list, dict, type(None))):
+        representation = repr(value)
+    else:
+        representation = type(value).__name__
+    return representation.encode('utf8')
 
-def toPython(template, factory=Factory):
+def cacheKey(template, factory=Factory, target="CompiledTemplate", implementation=False):
+    """
+        Returns the key compiled bytecode for the template / factory pair is stored under:
+            implementation - if True (as needed for code with pre-rendered html) the key changes with the
+                             implementation of the products as well (see implementationSignature)
+    """
+    key = hashlib.sha1()
+    for part in (sys.version, thedom.__version__, target, factorySignature(factory, implementation),
+                 repr(templateSignature(template))):
+        key.update(part.encode('utf8'))
+    return key.hexdigest()
+
+def loadCode(cacheFile):
+    """
+        Returns the code object marshalled into cacheFile, or None if it is missing or can not be read.
+    """
+    try:
+        with open(cacheFile, 'rb') as openFile:
+            return marshal.load(openFile)
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        return None
+
+def saveCode(cacheFile, code):
+    """
+        Atomically marshals code into cacheFile: the code is written to a temporary file in the same directory
+        and then renamed into place, so concurrent processes never see a partially written cache entry.
+    """
+    directory = os.path.dirname(cacheFile)
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        (handle, temporaryFile) = tempfile.mkstemp(suffix=CACHE_EXTENSION, dir=directory)
+    except OSError:
+        return False
+
+    try:
+        with os.fdopen(handle, 'wb') as openFile:
+            marshal.dump(code, openFile)
+        os.rename(temporaryFile, cacheFile)
+    except (IOError, OSError):
+        if os.path.exists(temporaryFile):
+            os.remove(temporaryFile)
+        return False
+    return True
+
+def toPython(template, factory=Factory, foldStatic=False):
     """
         Takes a UITemplate.Template() and a factory, and returns python code that will generate the expected
         Node structure.
+            foldStatic - if True subtrees that can never change are detected and pre-rendered to html, leaving
+                         the elements within them out of the built tree
+    """
+    template = internTemplate(template)
+    static = foldStatic and StaticSubtrees(template, factory) or None
+    return __createPythonFromTemplate(template, factory, static=static)
+
+def definesOnNode(product, methods):
+    """
+        Returns True if the product class uses Node's implementation of every one of the given methods.
+    """
+    for method in methods:
+        for baseClass in product.__mro__:
+            if method in baseClass.__dict__:
+                if baseClass is not Node:
+                    return False
+                break
+    return True
+
+def isStaticElement(node, factory=Factory):
+    """
+        Returns True if the template node (ignoring its children) can never change once built: it has no accessor,
+        id, name or dynamic properties and its element type does not receive variables or render itself.
+    """
+    product = factory.products.get(node.create, None)
+    if (not product or node.accessor or node.id or node.name or issubclass(product, DYNAMIC_TYPES) or
+        not definesOnNode(product, STATIC_METHODS)):
+        return False
+
+    for name, value in node.properties:
+        if value is not None and name in product.properties:
+            if product.properties[name]['action'].split('.')[-1] in DYNAMIC_ACTIONS:
+                return False
+    return True
+
+def findStatic(template, factory=Factory):
     """
-    return __createPythonFromTemplate(template, factory)
+        Returns a dictionary of node:isStatic for every element node in the template, where a node is only static if
+        all of its children are as well. Structurally identical subtrees are only analyzed once.
+    """
+    isStatic = {}
+    def analyze(node):
+        if isinstance(node, basestring):
+            return True
+
+        static = isStatic.get(node)
+        if static is None:
+            static = isStaticElement(node, factory)
+            for child in node.childElements or ():
+                static = analyze(child) and static
+            isStatic[node] = static
+        return static
+
+    analyze(template)
+    return isStatic
+
+def staticSubtrees(template, factory=Factory):
+    """
+        Returns the path of every maximal subtree of the template that can be pre-rendered: one without accessors,
+        ids, names, dynamic properties or element types that receive variables, render themselves, or are otherwise
+        dynamic - added to a parent that renders its children as they are, and whose html stays the same whatever
+        prefix or editable state the element it ends up in has.
+    """
+    if isinstance(template, basestring):
+        return []
+
+    static = StaticSubtrees(internTemplate(template), factory)
+    paths = []
+    def collect(node, path):
+        for child in node.childElements or ():
+            if isinstance(child, basestring):
+                continue
+
+            childPath = path + " > " + child.create
+            if static.canFold(node, child):
+                paths.append(childPath)
+            else:
+                collect(child, childPath)
+
+    collect(template, template.create)
+    return paths
+
+def preRender(template, factory=Factory):
+    """
+        Builds the template without folding any of it, returning the resulting Node tree.
+    """
+    nameSpace = {}
+    exec(compile(toPython(template, factory, foldStatic=False), '<string>', 'exec'), nameSpace)
+    return nameSpace['build'](factory)
+
+
+def rendersAnywhere(element, render):
+    """
+        Returns True if the html render(element) produces can not depend on where the built element is placed:
+        none of the elements it contains has an id or name (which get prefixed), and placing it within an element
+        that has a prefix and is not editable leaves the html unchanged.
+    """
+    elements = [element]
+    while elements:
+        contained = elements.pop()
+        if contained.id or contained.name:
+            return False
+        if contained._childElements:
+            elements.extend(contained._childElements)
+
+    html = render(element)
+    probe = Node()
+    probe.setPrefix(PROBE_PREFIX)
+    probe.setEditable(False)
+    probe.add(element)
+    return render(element) == html
+
+
+class StaticSubtrees(object):
+    """
+        Keeps track of the static subtrees of an (interned) template while it is compiled - memoizing the analysis
+        and the pre-rendered html of each distinct subtree so repeated ones are only built once, and recording the
+        path of every subtree that ends up folded into html.
+    """
+    __slots__ = ('factory', 'isStatic', 'transparent', 'rendered', 'anywhere', 'folded')
+
+    def __init__(self, template, factory=Factory):
+        self.factory = factory
+        self.isStatic = findStatic(template, factory)
+        self.transparent = {}
+        self.rendered = {}
+        self.anywhere = {}
+        self.folded = []
+
+    def foldable(self, node):
+        """
+            Returns True if the node is static and its pre-rendered html does not depend on the prefix or editable
+            state of the element it ends up in (see rendersAnywhere).
+        """
+        if not self.isStatic.get(node, False):
+            return False
+        self.render(node)
+        return self.anywhere[node]
+
+    def canFold(self, parent, child):
+        """
+            Returns True if child can be pre-rendered when added to parent.
+        """
+        transparent = self.transparent.get(parent.create)
+        if transparent is None:
+            product = self.factory.products.get(parent.create, None)
+            transparent = self.transparent[parent.create] = (product is not None and
+                                                            definesOnNode(product, TRANSPARENT_METHODS))
+        return transparent and self.foldable(child)
+
+    def render(self, node):
+        """
+            Returns the (html, formattedHTML, hasScripts) pre-rendered representation of a static node.
+        """
+        rendered = self.rendered.get(node)
+        if rendered is None:
+            element = preRender(node, self.factory)
+            rendered = self.rendered[node] = (element.toHTML(), element.toHTML(formatted=True),
+                                              bool(element.__scriptTemp__))
+            self.anywhere[node] = rendersAnywhere(element, lambda element: element.toHTML())
+        return rendered
+
+
+def toRenderer(template, factory=Factory):
+    """
+        Takes a UITemplate.Template() and a factory, and returns python code defining a 'render(**variables)'
+        function that produces the templates html directly: static subtrees become string constants, the start and
+        end tags of plain containers are written around their children, and only the parts of the template that are
+        accessor bound or variable driven are built (and have the variables inserted into them) on each call.
+    """
+    if isinstance(template, basestring):
+        return RENDER_TEMPLATE % {'accessors':(), 'liveElements':"", 'defineElements':"", 'cacheElements':"",
+                                  'staticElements':"", 'staticSubtrees':(), 'fragments':repr(template) + ", "}
+
+    template = internTemplate(template)
+    static = StaticSubtrees(template, factory)
+    (elementsUsed, accessorsUsed, cacheElements, staticElements) = (set(), set(), set(), set())
+    fragments = []
+    liveElements = []
+
+    def addHTML(html):
+        if fragments and not isinstance(fragments[-1], int):
+            fragments[-1] += html
+        else:
+            fragments.append(unicode(html))
+
+    def shellTags(node):
+        if not isStaticElement(node, factory) or not definesOnNode(factory.products[node.create], TRANSPARENT_METHODS):
+            return None
+
+        element = factory.build(node.create, '', '')
+        element.setProperties(node.properties)
+        if (element.__scriptTemp__ or element._childElements or element.addsTo is not element or
+            element._prefix is not None or element._editable is not None or
+            not rendersAnywhere(element, lambda element: element.startTag() + element.endTag())):
+            return None
+        return (element.startTag(), element.endTag())
+
+    def addLive(nodes, instance):
+        if not nodes:
+            return instance
+
+        fragments.append(instance)
+        python = ""
+        nextInstance = instance
+        for node, path in nodes:
+            (nodePython, nextInstance) = __createPythonFromTemplate(node, factory, "parent", nextInstance,
+                                                                    elementsUsed, accessorsUsed, cacheElements,
+                                                                    staticElements, static=static, path=path)
+            python += nodePython
+        liveElements.append(LIVE_TEMPLATE % {'instance':instance, 'buildTemplate':python})
+        return nextInstance
+
+    def addNodes(nodes, path, instance):
+        live = []
+        for node in nodes:
+            if isinstance(node, basestring):
+                if node:
+                    instance = addLive(live, instance)
+                    live = []
+                    addHTML(TextNode(node).toHTML())
+                continue
+
+            nodePath = path and path + " > " + node.create or node.create
+            if static.foldable(node):
+                instance = addLive(live, instance)
+                live = []
+                static.folded.append(nodePath)
+                addHTML(static.render(node)[0])
+                continue
+
+            tags = shellTags(node)
+            if tags is None:
+                live.append((node, nodePath))
+                continue
+
+            instance = addLive(live, instance)
+            live = []
+            addHTML(tags[0])
+            instance = addNodes(node.childElements or (), nodePath, instance)
+            addHTML(tags[1])
+        return addLive(live, instance)
+
+    addNodes((template, ), "", 0)
+    fragments = [isinstance(fragment, int) and "live%d(variables)" % fragment or repr(fragment)
+                 for fragment in fragments]
+    return RENDER_TEMPLATE % {'accessors':tuple(accessorsUsed), 'liveElements':"".join(liveElements),
+                              'defineElements':defineElements(elementsUsed),
+                              'cacheElements':"".join("%s = CacheElement()\n" % name for name in cacheElements),
+                              'staticElements':"\n".join(staticElements),
+                              'staticSubtrees':repr(tuple(static.folded)),
+                              'fragments':"".join(fragment + ", " for fragment in fragments)}
+
+def defineElements(elementsUsed):
+    """
+        Returns the code that makes each used product available as a global variable of the compiled template.
+    """
+    defineElements = ""
+    for elementName in elementsUsed:
+        variableName = elementName.replace("-", "_")
+        if variableName in ("and", "or", "with", "if", "del", "template"):
+            variableName = "_" + variableName
+        defineElements += "globals()['%s'] = products['%s']\n%s" % (variableName, elementName, INDENT * 2)
+    return defineElements
 
 def __createPythonFromTemplate(template, factory=None, parentNode=None, instance=0, elementsUsed=None,
-                               accessorsUsed=None, cacheElements=None, staticElements=None, indent=1):
+                               accessorsUsed=None, cacheElements=None, staticElements=None, indent=1, static=None,
+                               path=None, fold=False):
     python = ""
     if elementsUsed is None:
         elementsUsed = set()
@@ -115,7 +637,18 @@ def __createPythonFromTemplate(template, factory=None, parentNode=None, instance
         python += 'TextNode("' + template + '"), ensureUnique=False)'
         return (python, instance)
 
-    (accessor, id, name, create, properties, children) = (template.accessor, template.id, template.name,
+    if path is None:
+        path = template.create
+    if fold:
+        (html, formattedHTML, hasScripts) = static.render(template)
+        if not hasScripts:
+            static.folded.append(path)
+            staticElements.add('%s = PreRendered(html=%s, formattedHTML=%s)' %
+                               (newNode, repr(html), repr(formattedHTML)))
+            python += "\n%s%s.add(%s, ensureUnique=False)" % (indented, parentNode, newNode)
+            return (python, instance)
+
+    (accessor, elementId, name, create, properties, children) = (template.accessor, template.id, template.name,
                                                           template.create, template.properties, template.childElements)
     elementsUsed.add(create)
     element = factory.products[create]
@@ -123,12 +656,12 @@ def __createPythonFromTemplate(template, factory=None, parentNode=None, instance
     if create in ("and", "or", "with", "if", "del", "template"):
         create = "_" + create
         
-    accessor = accessor or id
+    accessor = accessor or elementId
     if accessor:
         accessor = accessor.replace("-", "_")
 
     isCached = False
-    if create.endswith("cacheelement"):
+    if create.endswith("cacheelement") and not create.endswith("keyedcacheelement"):
         cacheElements.add(newNode)
         isCached = True
         python += "\n%s%s = globals()['%s']" % (indented, newNode, newNode)
@@ -141,8 +674,11 @@ def __createPythonFromTemplate(template, factory=None, parentNode=None, instance
         python += "\n%s%s.add(%s, ensureUnique=False)" % (indented, parentNode, newNode)
         return (python, instance)
     else:
-        python += '\n%s%s = %s(id=%s, name=%s, parent=%s)' % (indented, newNode, create.lower(), repr(id),
+        python += '\n%s%s = %s(id=%s, name=%s, parent=%s)' % (indented, newNode, create.lower(), repr(elementId),
                                                               repr(name), parentNode)
+        if issubclass(element, KeyedCacheElement):
+            staticElements.add("%sCache = RenderCache()" % newNode)
+            python += "\n%s%s.cache = %sCache" % (indented, newNode, newNode)
     for name, value in properties:
         if value is not None and name in element.properties:
             propertyDict = element.properties[name]
@@ -189,8 +725,13 @@ def __createPythonFromTemplate(template, factory=None, parentNode=None, instance
             childAccessors = accessorsUsed
             childIndent = indent
         for node in children:
+            (childPath, childFold) = (None, False)
+            if not isinstance(node, basestring):
+                childPath = path + " > " + node.create
+                childFold = static is not None and static.canFold(template, node)
             (childPython, instance) = __createPythonFromTemplate(node, factory, newNode, instance, elementsUsed,
-                                                            childAccessors, cacheElements, staticElements, childIndent)
+                                                            childAccessors, cacheElements, staticElements, childIndent,
+                                                            static, childPath, childFold)
             python += childPython
         if isCached:
             if childAccessors:
@@ -202,20 +743,14 @@ def __createPythonFromTemplate(template, factory=None, parentNode=None, instance
             
     python += "\n%s%s.add(%s, ensureUnique=False)" % (indented, parentNode, newNode)
     if parentNode == "template":
-        defineElements = ""
-        for elementName in elementsUsed:
-            variableName = elementName.replace("-", "_")
-            if variableName in ("and", "or", "with", "if", "del", "template"):
-                variableName = "_" + variableName
-            defineElements += "globals()['%s'] = products['%s']\n%s" % (variableName, elementName, INDENT * 2)
-            
         cacheDefinitions = ""
         for elementName in cacheElements:
             cacheDefinitions += "%s = CacheElement()\n" % elementName
         
         return SCRIPT_TEMPLATE % {'accessors':tuple(accessorsUsed), 'buildTemplate':python,
-                                  'defineElements':defineElements, 'cacheElements':cacheDefinitions,
-                                  'staticElements':"\n".join(staticElements)}
+                                  'defineElements':defineElements(elementsUsed), 'cacheElements':cacheDefinitions,
+                                  'staticElements':"\n".join(staticElements),
+                                  'staticSubtrees':repr(tuple(static.folded if static else ()))}
         
         
     return (python, instance)
@@ -21,14 +21,256 @@
     Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 '''
 
+import weakref
+
 from . import MethodUtils
 from .MultiplePythonSupport import *
 
 
+UNBOUND = object()
+emitCounts = {}
+
+
+class Connection(object):
+    """
+        A connection between a signal and the slot method of a receiver, with the slot method (and the number of
+        arguments it accepts) resolved once when connected, as opposed to on every emit.
+    """
+    __slots__ = ('receiver', 'condition', 'value', 'slot', 'method', 'arity')
+
+    def __init__(self, receiver, condition, value, slot):
+        self.receiver = receiver
+        self.condition = condition
+        self.value = value
+        self.slot = slot
+        self.method = UNBOUND
+        self.arity = None
+
+    def __getstate__(self):
+        return (self.receiver, self.condition, self.value, self.slot)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def key(self):
+        return (self.receiver, self.condition, self.value, self.slot)
+
+    def bind(self):
+        """
+            Resolves the slot method on the receiver, returning it (or None if the receiver has no such slot)
+        """
+        self.method = method = getattr(self.receiver, self.slot, None)
+        if method is not None:
+            try:
+                self.arity = self.acceptedArguments(method)
+            except (AttributeError, TypeError):
+                self.arity = None
+        return method
+
+    @staticmethod
+    def acceptedArguments(method):
+        if MethodUtils.acceptsArguments(method, 1):
+            return 1
+        elif MethodUtils.acceptsArguments(method, 0):
+            return 0
+        return -1
+
+
+class Dispatch(list):
+    """
+        The connections made to a single signal, in the order they were made
+    """
+    __slots__ = ('keys', )
+
+    def __init__(self, connections=()):
+        list.__init__(self, connections)
+        self.keys = set(connection.key() for connection in self)
+
+    def __reduce__(self):
+        return (self.__class__, (list(self), ))
+
+
+class Subscription(object):
+    """
+        A group of receivers subscribed to the same signal of an emitter, all using the same slot, condition, and
+        value override. Receivers are referenced weakly, and forgotten once garbage collected.
+    """
+    __slots__ = ('slot', 'condition', 'value', 'references', 'receivers', 'arities')
+
+    def __init__(self, slot, condition, value):
+        self.slot = slot
+        self.condition = condition
+        self.value = value
+        self.references = []
+        self.receivers = {}
+        self.arities = {}
+
+    def add(self, receivers):
+        for receiver in receivers:
+            reference = self.receivers.get(id(receiver), None)
+            if reference is None or reference() is not receiver:
+                reference = self.receivers[id(receiver)] = weakref.ref(receiver)
+                self.references.append(reference)
+
+    def remove(self, receivers=None):
+        """
+            Removes the given receivers (or all of them if not given), along with any that have been garbage collected
+        """
+        if receivers is None:
+            self.receivers.clear()
+        else:
+            for receiver in receivers:
+                reference = self.receivers.get(id(receiver), None)
+                if reference is not None and reference() is receiver:
+                    del self.receivers[id(receiver)]
+        for receiverId, reference in list(iteritems(self.receivers)):
+            if reference() is None:
+                del self.receivers[receiverId]
+        self.references = [reference for reference in self.references
+                           if reference() is not None and self.receivers.get(id(reference()), None) is reference]
+
+    def arity(self, method):
+        methodType = method.__class__, getattr(method, '__func__', method)
+        arity = self.arities.get(methodType, None)
+        if arity is None:
+            arity = self.arities[methodType] = Connection.acceptedArguments(method)
+        return arity
+
+
+class SignalBus(object):
+    """
+        A registry of subscriptions keyed by emitter and then signal, that can be shared by any number of Connectable
+        objects. As opposed to connections (which the emitter holds on to, one per receiver), receivers are
+        subscribed in bulk and referenced weakly, and all subscriptions of an emitter are dropped as soon as it is
+        garbage collected.
+    """
+    __slots__ = ('subscriptions', 'emitters')
+
+    def __init__(self):
+        self.subscriptions = {}
+        self.emitters = {}
+
+    def __contains__(self, emitter):
+        return id(emitter) in self.emitters
+
+    def _forget(self, emitterId):
+        self.emitters.pop(emitterId, None)
+        self.subscriptions.pop(emitterId, None)
+
+    def subscribe(self, emitter, signal, receivers, slot, condition=None, value=None):
+        """
+            Subscribes many receivers at once to the signal of emitter:
+                receivers - the objects containing the slot method to call (referenced weakly)
+                slot - the name of the slot method to call on each receiver
+                condition - only call the slot method if the value emitted matches this condition
+                value - an optional value override to pass into the slot method
+        """
+        emitterId = id(emitter)
+        if emitterId not in self.emitters:
+            self.emitters[emitterId] = weakref.ref(emitter, lambda reference: self._forget(emitterId))
+
+        subscriptions = self.subscriptions.setdefault(emitterId, {}).setdefault(signal, [])
+        for subscription in subscriptions:
+            if (subscription.slot, subscription.condition, subscription.value) == (slot, condition, value):
+                break
+        else:
+            subscription = Subscription(slot, condition, value)
+            subscriptions.append(subscription)
+        subscription.add(receivers)
+
+    def unsubscribe(self, emitter, signal=None, receivers=None, slot=None):
+        """
+            Removes subscriptions to the signals of emitter: of the given receivers (all if not given),
+            to the given signal and slot (all if not given)
+        """
+        emitterId = id(emitter)
+        signals = self.subscriptions.get(emitterId, None)
+        if signals is None:
+            return
+
+        for key in ([signal] if signal is not None else list(signals)):
+            subscriptions = signals.get(key, None)
+            if subscriptions is None:
+                continue
+            for subscription in list(subscriptions):
+                if slot not in (None, subscription.slot):
+                    continue
+                subscription.remove(receivers)
+                if not subscription.references:
+                    subscriptions.remove(subscription)
+            if not subscriptions:
+                del signals[key]
+        if not signals:
+            self._forget(emitterId)
+
+    def emit(self, emitter, signal, value=None):
+        """
+            Calls the slot method of every receiver subscribed to the signal of emitter, returning their results
+            (or False if a receiver does not define the slot)
+        """
+        results = []
+        signals = self.subscriptions.get(id(emitter), None)
+        if not signals:
+            return results
+
+        for subscription in signals.get(signal, ()):
+            condition = subscription.condition
+            if condition is not None and not condition == value:
+                continue
+
+            usedValue = subscription.value
+            if usedValue is None:
+                usedValue = value
+            elif type(usedValue) in (str, unicode):
+                usedValue = usedValue.replace('${value}', str(value))
+
+            dead = False
+            for reference in subscription.references:
+                receiver = reference()
+                if receiver is None:
+                    dead = True
+                    continue
+
+                slotMethod = getattr(receiver, subscription.slot, None)
+                if slotMethod is None:
+                    print(receiver.__class__.__name__ + " slot not defined: " + subscription.slot)
+                    return False
+
+                if usedValue is None:
+                    results.append(slotMethod())
+                    continue
+                arity = subscription.arity(slotMethod)
+                if arity == 1:
+                    results.append(slotMethod(usedValue))
+                elif arity == 0:
+                    results.append(slotMethod())
+                else:
+                    results.append('')
+
+            if dead:
+                subscription.remove(())
+        return results
+
+    def count(self, emitter=None):
+        """
+            Returns the number of (live) receivers subscribed to the signals of emitter, or of all emitters
+        """
+        if emitter is None:
+            emitters = itervalues(self.subscriptions)
+        else:
+            emitters = (self.subscriptions.get(id(emitter), {}), )
+        return sum(len([reference for reference in subscription.references if reference() is not None])
+                   for signals in emitters for subscriptions in itervalues(signals)
+                   for subscription in subscriptions)
+
+bus = SignalBus()
+
+
 class Connectable(object):
-    __slots__ = ("connections")
+    __slots__ = ("connections", "__weakref__")
 
     signals = []
+    signalBus = bus
 
     def __init__(self):
         self.connections = None
@@ -41,37 +283,50 @@ class Connectable(object):
             signal - the name of the signal to emit, must be defined in the classes 'signals' list.
             value - the value to pass to all connected slot methods.
         """
+        emitCounts[signal] = emitCounts.get(signal, 0) + 1
+        connections = self.connections
+        dispatch = connections and connections.get(signal, None)
+        if not dispatch:
+            if id(self) in self.signalBus.emitters:
+                return self.signalBus.emit(self, signal, value)
+            return []
+
         results = []
-        if self.connections and signal in self.connections:
-            for obj, conditions in iteritems(self.connections[signal]):
-                for condition, values in iteritems(conditions):
-                    if condition is None or condition == value:
-                        for overrideValue, slots in iteritems(values):
-                            if overrideValue is not None:
-                                usedValue = overrideValue
-                                if type(overrideValue) in (str, unicode):
-                                    usedValue = usedValue.replace('${value}', str(value))
-                            else:
-                                usedValue = value
-
-                            for slot in slots:
-                                if not hasattr(obj, slot):
-                                    print(obj.__class__.__name__ +
-                                            " slot not defined: " + slot)
-                                    return False
-
-                                slotMethod = getattr(obj, slot)
-                                if usedValue is not None:
-                                    if(MethodUtils.acceptsArguments(slotMethod, 1)):
-                                        results.append(slotMethod(usedValue))
-                                    elif(MethodUtils.acceptsArguments(slotMethod, 0)):
-                                        results.append(slotMethod())
-                                    else:
-                                        results.append('')
-
-                                else:
-                                    results.append(slotMethod())
+        for connection in dispatch:
+            condition = connection.condition
+            if condition is None or condition == value:
+                usedValue = connection.value
+                if usedValue is None:
+                    usedValue = value
+                elif type(usedValue) in (str, unicode):
+                    usedValue = usedValue.replace('${value}', str(value))
+
+                slotMethod = connection.method
+                if slotMethod is UNBOUND:
+                    slotMethod = connection.bind()
+                if slotMethod is None:
+                    print(connection.receiver.__class__.__name__ + " slot not defined: " + connection.slot)
+                    return False
+
+                if usedValue is None:
+                    results.append(slotMethod())
+                    continue
+
+                arity = connection.arity
+                if arity is None:
+                    arity = connection.acceptedArguments(slotMethod)
+                if arity == 1:
+                    results.append(slotMethod(usedValue))
+                elif arity == 0:
+                    results.append(slotMethod())
+                else:
+                    results.append('')
 
+        if id(self) in self.signalBus.emitters:
+            subscribed = self.signalBus.emit(self, signal, value)
+            if subscribed is False:
+                return False
+            results.extend(subscribed)
         return results
 
     def connect(self, signal, condition, receiver, slot, value=None):
@@ -92,12 +347,15 @@ class Connectable(object):
 
         if self.connections is None:
             self.connections = {}
-        connections = self.connections.setdefault(signal, {})
-        connection = connections.setdefault(receiver, {})
-        connection = connection.setdefault(condition, {})
-        connection = connection.setdefault(value, [])
-        if not slot in connection:
-            connection.append(slot)
+        dispatch = self.connections.get(signal, None)
+        if dispatch is None:
+            dispatch = self.connections[signal] = Dispatch()
+
+        connection = Connection(receiver, condition, value, slot)
+        if connection.key() not in dispatch.keys:
+            connection.bind()
+            dispatch.keys.add(connection.key())
+            dispatch.append(connection)
 
     def disconnect(self, signal=None, condition=None,
                    obj=None, slot=None, value=None):
@@ -112,11 +370,48 @@ class Connectable(object):
             value - an optional value override to pass into the slot method as the first variable.
         """
         if slot:
-            connection = self.connections[signal][obj][condition][value]
-            connection.remove(slot)
+            key = (obj, condition, value, slot)
+            self._keepConnections(signal, lambda connection: connection.key() != key)
         elif obj:
-            self.connections[signal].pop(obj)
+            self._keepConnections(signal, lambda connection: not connection.receiver == obj)
         elif signal:
             self.connections.pop(signal, None)
         else:
             self.connections = None
+
+    def subscribe(self, signal, receivers, slot, condition=None, value=None):
+        """
+            Subscribes many receivers at once to one of this objects signals, through the signal bus
+            (where receivers are referenced weakly, as opposed to being held on to by this object):
+
+            signal - the signal this class will emit, to cause the slot method to be called.
+            receivers - the objects containing the slot method to be called.
+            slot - the name of the slot method to call.
+            condition - only call the slot method if the value emitted matches this condition.
+            value - an optional value override to pass into the slot method as the first variable.
+        """
+        if not signal in self.signals:
+            print("%(name)s is trying to subscribe to an undefined signal: %(signal)s" %
+                      {'name':self.__class__.__name__, 'signal':unicode(signal)})
+            return
+
+        self.signalBus.subscribe(self, signal, receivers, slot, condition, value)
+
+    def unsubscribe(self, signal=None, receivers=None, slot=None):
+        """
+            Removes receivers subscribed to this objects signals through the signal bus:
+
+            signal - only remove subscriptions to this signal (all signals if not given).
+            receivers - the receivers to remove (all receivers if not given).
+            slot - only remove subscriptions to this slot method (all slots if not given).
+        """
+        self.signalBus.unsubscribe(self, signal, receivers, slot)
+
+    def _keepConnections(self, signal, keep):
+        """
+            Replaces (as opposed to modifying, so emits in progress are not affected) the connections made to
+            signal with only those that should be kept
+        """
+        dispatch = self.connections and self.connections.get(signal, None)
+        if dispatch:
+            self.connections[signal] = Dispatch(connection for connection in dispatch if keep(connection))
@@ -488,8 +488,12 @@ class FormContainer(DOM.Form):
         if self.editable() and validator:
             validatorDict['chained_validators'] = validator
 
-        for child in self.childElements:
-            validatorDict.update(child.validators(useFullId))
+        previous = Base.enterChildren(self)
+        try:
+            for child in self.childElements:
+                validatorDict.update(child.validators(useFullId))
+        finally:
+            Base.leaveChildren(previous)
 
         return validatorDict
 
@@ -44,6 +44,8 @@ class DynamicForm(RequestHandler):
     """
     elementFactory = Factory
     formatted = False
+    streamed = False # if True full page responses are returned as an iterable of html chunks
+    chunkSize = None # the size of each streamed chunk (defaults to Base.Settings.CHUNK_SIZE)
     resourceFiles = ('js/WebBot.js', 'stylesheets/Site.css')
     if csrf:
         sharedFields = ('csrfmiddlewaretoken', )
@@ -70,6 +72,9 @@ class DynamicForm(RequestHandler):
 
         self.modifyDocument(document, request)
 
+        if self.streamed and not request.cacheKey:
+            return document.iterHTML(formatted=self.formatted, chunkSize=self.chunkSize, request=request)
+
         return document.toHTML(formatted=self.formatted, request=request)
 
     def modifyDocument(self, document, request):
@@ -30,6 +30,11 @@ try:
 except ImportError as e:
     djangoResponse = None
 
+try:
+    from django.http import StreamingHttpResponse as djangoStreamingResponse
+except ImportError as e:
+    djangoStreamingResponse = djangoResponse
+
 try:
     from google.appengine.api import users as appEngineUsers
 except ImportError as e:
@@ -243,6 +248,7 @@ class Response(object):
         JAVASCRIPT = "text/javascript"
         VCARD = "text/vcard"
         XML = "text/xml"
+        PATCH = "application/x-thedom-patch+json"
 
     def __init__(self, content='', contentType=None, status=None, charset="UTF-8", isDynamic=True):
         self.content = content
@@ -293,17 +299,58 @@ class Response(object):
         """
         return self._headers[header]
 
+    def isStreamed(self):
+        """
+            Returns True if the content of the response is an iterable of chunks as opposed to a single string
+        """
+        return not isinstance(self.content, basestring)
+
     def serialize(self):
         """
             Returns a plain dictionary of the response for serialization purposes.
         """
-        return {'responseText':self.content, 'status':self.status, 'contentType':self.contentType}
+        content = self.content
+        if self.isStreamed():
+            content = "".join(content)
+
+        return {'responseText':content, 'status':self.status, 'contentType':self.contentType}
+
+    def headers(self):
+        """
+            Returns a list of all (header, value) pairs that should be sent with the response including cookies
+        """
+        headers = [('Content-Type', self.contentType + ";charset=" + self.charset)]
+        headers.extend(iteritems(self._headers))
+        headers.extend(('Set-Cookie', cookie.toHeader()) for cookie in itervalues(self.cookies))
+        return headers
+
+    def toWSGIResponse(self, startResponse):
+        """
+            Starts the given WSGI response, returning an iterable of the encoded content -
+            allowing streamed content to be sent to the client as it is rendered
+        """
+        statusName = "OK"
+        for name, value in iteritems(vars(self.Status)):
+            if value == self.status and not name.startswith("_"):
+                statusName = name.replace("_", " ").title()
+                break
+
+        startResponse("%d %s" % (self.status, statusName), self.headers())
+        content = self.content
+        if not self.isStreamed():
+            content = (content, )
+
+        return (chunk.encode(self.charset) for chunk in content)
 
     def toAppEngineResponse(self, response):
         """
             Passes the contents of this response into the given app engine response object
         """
-        response.out.write(self.content)
+        if self.isStreamed():
+            for chunk in self.content:
+                response.out.write(chunk)
+        else:
+            response.out.write(self.content)
         response.set_status(self.status)
         response.headers.add('Content-Type', self.contentType + ";charset=" + self.charset)
 
@@ -324,14 +371,16 @@ class Response(object):
             Converts the given response to the Django HTTPResponse object
             cls - the django HTTPResponse class or compatible object type
         """
-        djangoResponse = cls(self.content, self.contentType + ";charset=" + self.charset, self.status)
+        if self.isStreamed() and cls is djangoResponse:
+            cls = djangoStreamingResponse
+        response = cls(self.content, self.contentType + ";charset=" + self.charset, self.status)
         for header, value in iteritems(self._headers):
-            djangoResponse[header] = value
+            response[header] = value
 
         for cookie in itervalues(self.cookies):
-            djangoResponse.set_cookie(*cookie)
+            response.set_cookie(*cookie)
 
-        return djangoResponse
+        return response
 
 
 class Request(object):
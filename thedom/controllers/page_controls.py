@@ -23,12 +23,15 @@
 import threading
 import re
 import copy
+import hashlib
+import json
+from collections import OrderedDict
 
 from . import HTTP
 from .RequestHandler import RequestHandler
 from thedom import UITemplate
 from thedom.All import Factory
-from thedom import Base
+from thedom import Base, Diff
 from thedom.Base import Node
 from thedom.Layout import Center, Horizontal, Flow, Box
 from thedom.Display import Image, Label, FormError
@@ -37,6 +40,11 @@ from thedom.StringUtils import scriptURL
 from thedom.Containers import PageControlPlacement
 from thedom.Compile import CompiledTemplate
 from thedom import ClientSide, UITemplate
+from thedom.MultiplePythonSupport import *
+
+SNAPSHOTS = OrderedDict()
+SNAPSHOT_HISTORY = 256
+snapshotsLock = threading.Lock()
 
 
 class PageControl(RequestHandler, Node):
@@ -49,6 +57,8 @@ class PageControl(RequestHandler, Node):
     autoLoad = True
     autoReload = False
     silentReload = True
+    diffed = False # if True AJAX requests are responded to with the changes since the html the client last received
+    diffKey = None # an attribute that (along with the id) identifies elements when diffing
     elementFactory = Factory
 
     class ClientSide(Node.ClientSide):
@@ -163,6 +173,47 @@ class PageControl(RequestHandler, Node):
             instance.silentReload = silentReload
         return instance
 
+    def handleRequest(self, request, handlers=None):
+        """
+            Overrides handleRequest to respond with patch operations, as opposed to the full html, when the control
+            is diffed and the html the client currently has is known
+        """
+        requested = handlers
+        if requested is None:
+            requested = request.fields.get('requestHandler', '')
+            requested = isinstance(requested, basestring) and requested.split("-") or ()
+        requestedDirectly = len(requested) == 1
+        response = RequestHandler.handleRequest(self, request, handlers)
+
+        if (requestedDirectly and self.diffed and request.isAjax() and response.status == HTTP.Response.Status.OK
+            and response.contentType == HTTP.Response.ContentType.HTML and not response.isStreamed()):
+            response.content = json.dumps(self.renderPatch(request, response.content))
+            response.contentType = HTTP.Response.ContentType.PATCH
+
+        return response
+
+    def renderPatch(self, request, html):
+        """
+            Returns a dictionary containing a hash identifying the given html and either the patch operations that
+            turn the html the client last received into it (see Diff.diff) or, if that html is no longer known,
+            the html itself
+        """
+        rendered = hashlib.sha1(isinstance(html, unicode) and html.encode('utf8') or html).hexdigest()
+        snapshot = Diff.snapshot(html)
+        renderedBefore = request.fields.get('rendered', None)
+        with snapshotsLock:
+            previous = isinstance(renderedBefore, basestring) and SNAPSHOTS.pop(renderedBefore, None) or None
+            if previous is not None:
+                SNAPSHOTS[renderedBefore] = previous
+            SNAPSHOTS[rendered] = snapshot
+            while len(SNAPSHOTS) > SNAPSHOT_HISTORY:
+                SNAPSHOTS.popitem(last=False)
+
+        if previous is None:
+            return {'rendered':rendered, 'html':html}
+
+        return {'rendered':rendered, 'patch':Diff.diff(previous, snapshot, self.diffKey)}
+
     def instanceID(self, salt="", element=""):
         """
             Returns what the instance ID would be for this controller or sub element given the provided salt value
@@ -182,6 +233,19 @@ class PageControl(RequestHandler, Node):
         """
         return "".join([self._loading, Node.toHTML(self, formatted, *args, **kwargs)])
 
+    def _iterHTML(self, formatted=False, indent=None, *args, **kwargs):
+        """
+            Override _iterHTML to stream the loading section in addition to controller placement
+        """
+        fragments = Node._iterHTML(self, formatted, indent, *args, **kwargs)
+        leadingIndent = formatted and indent or ''
+        startTag = next(fragments, leadingIndent)[len(leadingIndent):]
+        for fragment in Base.htmlFragments(self._loading + startTag, formatted, indent):
+            yield fragment
+
+        for fragment in fragments:
+            yield fragment
+
     def buildElement(self, className, id=None, name=None, parent=None, scriptContainer=None, **kwargs):
         """
             Builds a Node using the factory attached to this controller
@@ -204,7 +268,7 @@ class PageControl(RequestHandler, Node):
         """
             Overrides the Node content to include an initial response if autoLoad is set to true
         """
-        request = request or HTTP.Request()
+        request = request or self.renderedRequest()
         if self.autoLoad == "AJAX":
             request.response.scripts.addScript("DynamicForm.get('%s');" % self.fullId())
         elif self.autoLoad == "silent":
@@ -220,6 +284,33 @@ class PageControl(RequestHandler, Node):
 
         return ""
 
+    def renderedRequest(self):
+        """
+            Returns the request the control is being rendered for (as held by the current render context),
+            or a new empty request if there is none
+        """
+        context = Base.renderContext()
+        if context is not None and context.request is not None:
+            return context.request
+
+        return HTTP.Request()
+
+    def _iterContent(self, formatted=False, indent=None, request=None, *args, **kwargs):
+        """
+            Overrides the Node content streaming to stream the initial response as it is rendered, when possible.
+            NOTE: errors raised after streaming has begun can not be replaced by renderInternalError
+        """
+        request = request or self.renderedRequest()
+        if formatted or self.autoLoad is not True or self.cacheKey(request) or not self._canView(request) or \
+           (request.method != "GET" and not self._canEdit(request)):
+            for fragment in Base.htmlFragments(self.content(formatted, request, *args, **kwargs), formatted, indent):
+                yield fragment
+            return
+
+        request.cacheKey = False
+        for fragment in self._iterResponse(request):
+            yield fragment
+
     def __str__(self):
         """
             Use the RequestHandler str implementation
@@ -227,14 +318,38 @@ class PageControl(RequestHandler, Node):
         return RequestHandler.__str__(self)
     
     def renderResponse(self, request, isCached=False):
+        return "".join(self._iterResponse(request))
+
+    def _iterResponse(self, request):
+        """
+            Yields the html fragments of the response as they are rendered.
+            Responses for a requestID (rendered with the control's id temporarily changed, under its lock) are
+            rendered as a whole before the first fragment is yielded, so the lock is never held while streaming.
+        """
         request = self.request or request
-        
+
         requestID = request.fields.get('requestID')
-        if requestID:
+        if not requestID:
+            for fragment in self._iterUI(request):
+                yield fragment
+            return
+
+        if self.lock:
+            self.lock.acquire()
+        self.id = requestID
+        try:
+            fragments = list(self._iterUI(request))
+        finally:
+            self.id = self.accessor
             if self.lock:
-                self.lock.acquire()
-            self.id = requestID
+                self.lock.release()
+        for fragment in fragments:
+            yield fragment
 
+    def _iterUI(self, request):
+        """
+            Builds the ui for the request, yielding its html fragments as they are rendered
+        """
         ui = self.buildUI(request)
         self.initUI(ui, request)
         self._modifyUI(ui, request)
@@ -261,24 +376,20 @@ class PageControl(RequestHandler, Node):
             oldScriptContainer = request.response.scripts
             request.response.scripts = scriptContainer
             ui.setScriptContainer(scriptContainer)
-            to_return = ui.toHTML(request=request) + request.response.scripts.toHTML(request=request)
+            for fragment in Base.iterRendered((ui, request.response.scripts), request=request):
+                yield fragment
             request.cacheKey = False
             request.response.scripts = oldScriptContainer
         elif not request.response.scripts:
             scriptContainer = ScriptContainer()
             request.response.scripts = scriptContainer
             ui.setScriptContainer(scriptContainer)
-            to_return = ui.toHTML(request=request) + scriptContainer.toHTML(request=request)
+            for fragment in Base.iterRendered((ui, scriptContainer), request=request):
+                yield fragment
         else:
             ui.setScriptContainer(request.response.scripts)
-            to_return = ui.toHTML(request=request)
-            
-        if requestID:
-            self.id = self.accessor
-            if self.lock:
-                self.lock.release()
-            
-        return to_return
+            for fragment in Base.iterRendered((ui, ), request=request):
+                yield fragment
 
     def _modifyUI(self, ui, request):
         pass
@@ -23,10 +23,12 @@
 
 import os
 
-from . import Base, Buttons, Display, HiddenInputs, Inputs, Layout
+from . import Base, Buttons, Display, HiddenInputs, Inputs, Layout, NodeStore
 from .Factory import Composite, Factory
+from .IteratorUtils import Queryable
 from .MethodUtils import CallBack
 from .MultiplePythonSupport import *
+from .Types import Safe
 
 Factory = Factory("DataViews")
 
@@ -200,7 +202,6 @@ class Table(Base.Node):
         else:
             row.addClass('rowdark')
 
-        self.connect('columnAdded', None, row, 'add', self.Column)
         self.rows.append(row)
 
         for column in self._columns:
@@ -224,6 +225,8 @@ class Table(Base.Node):
             self._columns.append(columnName)
 
             self.emit('columnAdded', column)
+            for row in self.rows:
+                row.add(self.Column)
             self.columnMap[columnName] = column
             return column
         else:
@@ -272,6 +275,18 @@ class Table(Base.Node):
                 for col, value in iteritems(row):
                     newRow.cell(col).setText(value)
 
+    def addSummaryRow(self, rows, *args, **aggregates):
+        """
+            Adds a row summarizing the given rows (dictionaries or objects, such as those passed to addRows),
+            where each cell is set to an aggregate of the rows computed in a single pass over them, for example:
+                table.addSummaryRow(rows, price=Sum('price'), items=Count('price'))
+        """
+        row = self.addRow()
+        row.addClass('WSummary')
+        for column, value in iteritems(Queryable(rows).aggregate(*args, **aggregates)):
+            row.cell(column).setText(value is not None and unicode(value) or "")
+        return row
+
     def joinRows(self, columnName, rows):
         """
             Will join a column across the given rows
@@ -288,6 +303,114 @@ Row = Table.Row
 Header = Table.Header
 
 
+class CompactTable(NodeStore.NodeStore):
+    """
+        Defines a table that renders the same html as Table, but stores its header, rows and cells in a NodeStore
+        as opposed to creating Node instances for each of them - making it suitable for tables with many
+        thousands of rows. Cells only hold text, and columns are referred to by name.
+    """
+    __slots__ = ('alignHeaders', 'header', 'rows', '_columns', 'uniformStyle', '_cellAttributes')
+    tagName = "table"
+    properties = Base.Node.properties.copy()
+    properties['columns'] = {'action':'addColumns'}
+    properties['rows'] = {'action':'addRows'}
+    properties['border'] = {'action':'attribute'}
+    properties['rules'] = {'action':'attribute'}
+    properties['alignHeaders'] = {'action':'classAttribute'}
+    properties['uniformStyle'] = {'action':'classAttribute'}
+
+    def _create(self, id=None, name=None, parent=None, **kwargs):
+        NodeStore.NodeStore._create(self, id, name, parent, **kwargs)
+        self.alignHeaders = ""
+        self.header = self.addNode('tr', id='WTableHeader')
+        self.rows = []
+        self._columns = []
+        self.uniformStyle = ""
+        self._cellAttributes = {}
+        self.addClass('GlobalTable')
+
+    @property
+    def columns(self):
+        """
+            Returns the columns set on the table
+        """
+        return self._columns
+
+    def _addCell(self, row, columnName, text=""):
+        key = (columnName, self.uniformStyle)
+        attributeSet = self._cellAttributes.get(key, None)
+        if attributeSet is None:
+            attributeSet = self._cellAttributes[key] = self.attributeSet((columnName.replace(" ", "") + "Column",
+                                                                          "WColumn"), self.uniformStyle or None)
+        self.addText(text, self.addNode('td', row, columnName, attributeSet=attributeSet))
+
+    def addColumn(self, columnName, showName=True):
+        """
+            Adds a column to table (and therefore every row within it)
+        """
+        if columnName in self._columns:
+            return
+
+        classes = None
+        if self.fullId():
+            classes = (self.fullId()[0].upper() + self.fullId()[1:] + columnName.replace(" ", "") + "Header", )
+        header = self.addNode('th', self.header, columnName, classes=classes,
+                              attributes=self.alignHeaders and {'align':self.alignHeaders} or None)
+        self.addText(Safe((showName and (columnName or '')) or ''), header)
+        self._columns.append(columnName)
+        for row in self.rows:
+            self._addCell(row, columnName)
+
+    def addColumns(self, columns):
+        """
+            Adds a list of columns to the table
+        """
+        for column in columns:
+            self.addColumn(column)
+
+    def addRow(self, values=()):
+        """
+            Adds a new row, returning its index, optionally setting the text of its cells from a dictionary
+            or list of (column, value) pairs
+        """
+        values = isinstance(values, dict) and list(iteritems(values)) or values
+        for column, value in values:
+            self.addColumn(column)
+        values = dict(values)
+
+        row = self.addNode('tr', classes=(len(self.rows) % 2 and 'rowlight' or 'rowdark', ))
+        self.rows.append(row)
+        for column in self._columns:
+            self._addCell(row, column, values.get(column, ""))
+        return row
+
+    def addRows(self, rows):
+        """
+            adds multiple rows, where the column data is defined in nested tuples or dictionaries
+        """
+        for row in rows:
+            self.addRow(row)
+
+    def cell(self, row, column):
+        """
+            Returns the cell at row/column as a StoredNode
+        """
+        if column not in self._columns:
+            self.addColumn(column)
+        if len(self.rows) > row:
+            return self.node(self.childIndexes(self.rows[row])[self._columns.index(column)])
+
+    def setCellText(self, row, column, text):
+        """
+            Sets the text shown in the cell at row/column
+        """
+        cell = self.cell(row, column)
+        if cell:
+            self.setText(self.firstChildren[cell.index], text)
+
+Factory.addProduct(CompactTable)
+
+
 class StoredValue(Layout.Box):
     """
         Defines a label:value pair that will be passed into the request
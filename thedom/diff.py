@@ -0,0 +1,304 @@
+'''
+    Diff.py
+
+    Compares rendered Node trees producing a compact list of patch operations that can be applied client side
+    (by thedom.applyPatch) to turn the previously sent html into the current html, without resending all of it.
+
+    Copyright (C) 2015  Timothy Edmund Crosley
+
+    This program is free software; you can redistribute it and/or
+    modify it under the terms of the GNU General Public License
+    as published by the Free Software Foundation; either version 2
+    of the License, or (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program; if not, write to the Free Software
+    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+'''
+
+from bisect import bisect_left
+
+from .MultiplePythonSupport import *
+
+try:
+    from html.parser import HTMLParser
+except ImportError:
+    from HTMLParser import HTMLParser
+
+VOID_TAGS = ('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'meta', 'param',
+             'source', 'track', 'wbr')
+TABLE_SECTIONS = ('thead', 'tbody', 'tfoot', 'caption', 'colgroup')
+
+
+class Snapshot(object):
+    """
+        A light-weight record of a rendered html element: its tag, attributes, and child elements - along with
+        where it is located within the html it was parsed from.
+    """
+    __slots__ = ('tagName', 'attributes', 'childElements', 'html', 'start', 'contentStart', 'contentEnd', 'end',
+                 'implicit')
+
+    def __init__(self, tagName, attributes, html, start, contentStart, implicit=False):
+        self.tagName = tagName
+        self.attributes = attributes
+        self.childElements = []
+        self.html = html
+        self.start = start
+        self.contentStart = contentStart
+        self.contentEnd = contentStart
+        self.end = contentStart
+        self.implicit = implicit
+
+    def outerHTML(self):
+        """
+            Returns the html of the element, including its start and end tag
+        """
+        if self.implicit:
+            return "<" + self.tagName + ">" + self.innerHTML() + "</" + self.tagName + ">"
+
+        return self.html[self.start:self.end]
+
+    def innerHTML(self):
+        """
+            Returns the html between the element's start and end tag
+        """
+        return self.html[self.contentStart:self.contentEnd]
+
+    def text(self):
+        """
+            Returns the (position, text) pairs of all non-whitespace text directly within the element,
+            where position is the number of child elements placed before the text
+        """
+        text = []
+        position = self.contentStart
+        for index, childElement in enumerate(self.childElements):
+            if self.html[position:childElement.start].strip():
+                text.append((index, self.html[position:childElement.start]))
+            position = childElement.end
+        if self.html[position:self.contentEnd].strip():
+            text.append((len(self.childElements), self.html[position:self.contentEnd]))
+
+        return text
+
+    def key(self, keyAttribute=None):
+        """
+            Returns the key used to match this element against the element it replaces:
+            its id, or the value of keyAttribute if one is provided - None if it has neither
+        """
+        elementId = self.attributes.get('id', None)
+        if elementId:
+            return ('id', elementId)
+        if keyAttribute and self.attributes.get(keyAttribute, None) is not None:
+            return (keyAttribute, self.attributes[keyAttribute])
+
+        return None
+
+
+class SnapshotParser(HTMLParser):
+    """
+        Parses html into a tree of Snapshot elements, mirroring the element structure a browser would build
+    """
+
+    def __init__(self, html):
+        HTMLParser.__init__(self)
+        self.html = html
+        self.root = Snapshot(None, {}, html, 0, 0)
+        self.root.contentEnd = self.root.end = len(html)
+        self.openElements = [self.root]
+        self.lineStarts = [0]
+        position = html.find("\n")
+        while position != -1:
+            self.lineStarts.append(position + 1)
+            position = html.find("\n", position + 1)
+
+    def position(self):
+        line, offset = self.getpos()
+        return self.lineStarts[line - 1] + offset
+
+    def _close(self, element, contentEnd, end):
+        element.contentEnd = contentEnd
+        element.end = end
+        if element.implicit and element.childElements:
+            element.start = element.contentStart = element.childElements[0].start
+
+    def _open(self, tag, attrs, selfCloses=False):
+        start = self.position()
+        parent = self.openElements[-1]
+        if parent.implicit and tag in TABLE_SECTIONS:
+            self.openElements.pop()
+            self._close(parent, start, start)
+            parent = self.openElements[-1]
+        elif parent.tagName == 'table' and tag == 'tr':
+            tableBody = Snapshot('tbody', {}, self.html, start, start, implicit=True)
+            parent.childElements.append(tableBody)
+            self.openElements.append(tableBody)
+            parent = tableBody
+
+        contentStart = start + len(self.get_starttag_text())
+        element = Snapshot(tag, dict((name, value is None and '' or value) for name, value in attrs), self.html,
+                           start, contentStart)
+        parent.childElements.append(element)
+        if not selfCloses and tag not in VOID_TAGS:
+            self.openElements.append(element)
+
+    def handle_starttag(self, tag, attrs):
+        self._open(tag, attrs)
+
+    def handle_startendtag(self, tag, attrs):
+        self._open(tag, attrs, selfCloses=True)
+
+    def handle_endtag(self, tag):
+        for index in range(len(self.openElements) - 1, 0, -1):
+            if self.openElements[index].tagName == tag:
+                break
+        else:
+            return
+
+        contentEnd = self.position()
+        end = self.html.find(">", contentEnd) + 1
+        while len(self.openElements) > index + 1:
+            self._close(self.openElements.pop(), contentEnd, contentEnd)
+        self._close(self.openElements.pop(), contentEnd, end)
+
+    def close(self):
+        HTMLParser.close(self)
+        while len(self.openElements) > 1:
+            self._close(self.openElements.pop(), len(self.html), len(self.html))
+
+
+def snapshot(element):
+    """
+        Returns a Snapshot of the given Node (once rendered) or html, that can later be compared against
+    """
+    if isinstance(element, Snapshot):
+        return element
+    if not isinstance(element, basestring):
+        element = element.toHTML()
+
+    parser = SnapshotParser(element)
+    parser.feed(element)
+    parser.close()
+    return parser.root
+
+
+def diff(old, new, keyAttribute=None):
+    """
+        Returns the list of patch operations that turn the html of old into the html of new, where old and new can
+        each be a Node, its rendered html, or a previously taken Snapshot:
+            keyAttribute - an attribute whose value identifies child elements (in addition to their id), allowing
+                           elements to be matched even when they change position
+
+        Each operation is a list starting with its type and the path to the element it applies to.
+        Paths are made up of child element indexes, starting from the root the html is placed in or from an element
+        id. The operation types are:
+            ['replace', path, html], ['content', path, html], ['attribute', path, name, value],
+            ['removeAttribute', path, name], ['insert', path, index, html], ['remove', path],
+            ['move', path, fromIndex, toIndex]
+    """
+    patch = []
+    _diffElement(snapshot(old), snapshot(new), [], patch, keyAttribute)
+    return patch
+
+def _diffElement(old, new, path, patch, keyAttribute):
+    if old.tagName != new.tagName:
+        patch.append(['replace', path, new.outerHTML()])
+        return
+
+    if old.attributes != new.attributes:
+        for name, value in iteritems(new.attributes):
+            if old.attributes.get(name, None) != value:
+                patch.append(['attribute', path, name, value])
+        for name in old.attributes:
+            if name not in new.attributes:
+                patch.append(['removeAttribute', path, name])
+
+    if old.innerHTML() == new.innerHTML():
+        return
+
+    if old.text() != new.text() or not new.childElements:
+        patch.append(['content', path, new.innerHTML()])
+        return
+
+    _diffChildElements(old, new, path, patch, keyAttribute)
+
+def _increasingIndexes(sequence):
+    """
+        Returns the set of indexes, within sequence, of its longest increasing subsequence
+    """
+    tails = []
+    tailIndexes = []
+    previous = [None] * len(sequence)
+    for index, value in enumerate(sequence):
+        position = bisect_left(tails, value)
+        if position == len(tails):
+            tails.append(value)
+            tailIndexes.append(index)
+        else:
+            tails[position] = value
+            tailIndexes[position] = index
+        previous[index] = tailIndexes[position - 1] if position else None
+
+    increasing = set()
+    index = tailIndexes[-1] if tailIndexes else None
+    while index is not None:
+        increasing.add(index)
+        index = previous[index]
+    return increasing
+
+def _diffChildElements(old, new, path, patch, keyAttribute):
+    oldChildren = old.childElements
+    newChildren = new.childElements
+
+    keyed = {}
+    unkeyed = []
+    for index, childElement in enumerate(oldChildren):
+        key = childElement.key(keyAttribute)
+        if key is None or key in keyed:
+            unkeyed.append(index)
+        else:
+            keyed[key] = index
+
+    matches = []
+    unkeyed.reverse()
+    for childElement in newChildren:
+        key = childElement.key(keyAttribute)
+        if key is None:
+            matches.append(unkeyed.pop() if unkeyed else None)
+        else:
+            matches.append(keyed.pop(key, None))
+
+    matched = [match for match in matches if match is not None]
+    keptIndexes = set(matched)
+    current = list(range(len(oldChildren)))
+    for index in range(len(oldChildren) - 1, -1, -1):
+        if index not in keptIndexes:
+            patch.append(['remove', path + [index]])
+            del current[index]
+
+    staying = set(matched[index] for index in _increasingIndexes(matched))
+    for position, match in enumerate(matches):
+        if match is None:
+            patch.append(['insert', path, position, newChildren[position].outerHTML()])
+            current.insert(position, None)
+            continue
+
+        if match in staying:
+            while current[position] != match:
+                patch.append(['move', path, position, len(current) - 1])
+                current.append(current.pop(position))
+        elif current[position] != match:
+            fromPosition = current.index(match)
+            patch.append(['move', path, fromPosition, position])
+            current.insert(position, current.pop(fromPosition))
+
+    for position, match in enumerate(matches):
+        if match is not None:
+            childElement = newChildren[position]
+            childId = childElement.attributes.get('id', None)
+            _diffElement(oldChildren[match], childElement, childId and [childId] or path + [position], patch,
+                         keyAttribute)
@@ -21,6 +21,9 @@
 '''
 
 import datetime
+import threading
+import time
+from collections import OrderedDict
 
 from . import DOM, Base, ClientSide, DictUtils, Factory
 from .Inputs import ValueElement
@@ -551,6 +554,27 @@ class StraightHTML(Base.Node):
 Factory.addProduct(StraightHTML)
 
 
+class PreRendered(StraightHTML):
+    """
+        Displays html rendered ahead of time (for instance by the template compiler) in both its plain and formatted
+        forms, so formatted output matches that of the elements it was rendered from.
+    """
+    __slots__ = ('formattedHTML', )
+
+    def _create(self, name=None, id=None, parent=None, html="", formattedHTML=""):
+        StraightHTML._create(self, parent=parent, html=html)
+
+        self.formattedHTML = formattedHTML
+
+    def toHTML(self, formatted=False, *args, **kwargs):
+        """
+            Overrides toHTML to return the pre-rendered html.
+        """
+        if formatted:
+            return self.formattedHTML
+        return self.html
+
+
 class StatusIndicator(DOM.Div):
     """
         Shows a visual indication of status from incomplete to complete
@@ -609,7 +633,8 @@ class CacheElement(Base.Node):
         return self._cachedHTML
     
     def __getattribute__(self, name):
-        if name not in ("toHTML", "rendered", "_cachedHTML", "__iter__", "__repr__") and self.rendered():
+        if name not in ("toHTML", "iterHTML", "_iterHTML", "rendered", "_cachedHTML", "__iter__", "__repr__") and \
+           self.rendered():
             return self
         
         return Base.Node.__getattribute__(self, name)
@@ -629,6 +654,190 @@ class CacheElement(Base.Node):
 Factory.addProduct(CacheElement)
 
 
+class RenderCache(object):
+    """
+        A thread safe, bounded store of rendered html: entries are evicted least recently used first once there are
+        more than maxEntries of them or they take up more than maxBytes, and expire ttl seconds after being stored.
+        Concurrent renders of the same missing key are collapsed into one, with the other threads waiting on it.
+    """
+    __slots__ = ('maxEntries', 'maxBytes', 'ttl', 'entries', 'size', 'stats', 'lock', 'pending')
+    sharedCaches = {}
+    sharedLock = threading.Lock()
+
+    def __init__(self, maxEntries=1024, maxBytes=None, ttl=None):
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.size = 0
+        self.stats = {'hits':0, 'misses':0, 'evictions':0, 'expirations':0, 'waits':0}
+        self.lock = threading.Lock()
+        self.pending = {}
+
+    @classmethod
+    def shared(cls, name, maxEntries=1024, maxBytes=None, ttl=None):
+        """
+            Returns the cache shared under name, creating it with the given limits if it does not yet exist.
+        """
+        with cls.sharedLock:
+            cache = cls.sharedCaches.get(name, None)
+            if cache is None:
+                cache = cls.sharedCaches[name] = cls(maxEntries, maxBytes, ttl)
+            return cache
+
+    def __getstate__(self):
+        return (self.maxEntries, self.maxBytes, self.ttl)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        with self.lock:
+            return self._lookup(key) is not None
+
+    def _lookup(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+
+        (html, expires, size) = entry
+        if expires is not None and expires <= time.time():
+            self.size -= size
+            self.stats['expirations'] += 1
+            return None
+
+        self.entries[key] = entry
+        return html
+
+    def _store(self, key, html, ttl):
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.size -= previous[2]
+
+        ttl = self.ttl if ttl is None else ttl
+        size = len(html.encode('utf8') if isinstance(html, unicode) else html)
+        self.entries[key] = (html, ttl is not None and time.time() + ttl or None, size)
+        self.size += size
+        while self.entries and (len(self.entries) > self.maxEntries or
+                                (self.maxBytes is not None and self.size > self.maxBytes)):
+            self.size -= self.entries.popitem(last=False)[1][2]
+            self.stats['evictions'] += 1
+
+    def set(self, key, html, ttl=None):
+        """
+            Stores the html under key, expiring after ttl seconds (or the caches ttl if not given).
+        """
+        with self.lock:
+            self._store(key, html, ttl)
+
+    def fetch(self, key, render, ttl=None):
+        """
+            Returns the html stored under key, calling render to produce (and store) it if there is none. If another
+            thread is already rendering the key, waits for and returns its result instead.
+        """
+        with self.lock:
+            html = self._lookup(key)
+            if html is not None:
+                self.stats['hits'] += 1
+                return html
+
+            self.stats['misses'] += 1
+            (owner, rendering) = self.pending.get(key, (None, None))
+            if rendering is None:
+                self.pending[key] = (threading.current_thread(), threading.Event())
+            elif owner is not threading.current_thread():
+                self.stats['waits'] += 1
+
+        if rendering is not None:
+            if owner is not threading.current_thread():
+                rendering.wait()
+                with self.lock:
+                    html = self._lookup(key)
+                if html is not None:
+                    return html
+            return render()
+
+        try:
+            html = render()
+            with self.lock:
+                self._store(key, html, ttl)
+            return html
+        finally:
+            with self.lock:
+                (owner, rendering) = self.pending.pop(key)
+            rendering.set()
+
+    def clear(self):
+        """
+            Removes every stored entry.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+class KeyedCacheElement(Base.Node):
+    """
+        Caches the html its child elements render to in a RenderCache, once per distinct key - where the key is either
+        computed by a key function from the request being rendered, or made up of the given (varyBy) request fields.
+        Unlike CacheElement the child elements are still built (so the scripts they add reach the page as usual),
+        but they are only rendered on a cache miss. The html is also cached separately per prefix and editable state,
+        as elements built from the same compiled template share a cache.
+    """
+    __slots__ = ('cache', 'key', 'varyBy', 'ttl')
+    properties = Base.Node.properties.copy()
+    properties['cache'] = {'action':'useCache'}
+    properties['varyBy'] = {'action':'setVaryBy'}
+    properties['ttl'] = {'action':'classAttribute', 'type':'int'}
+
+    def _create(self, id=None, name=None, parent=None, key=None, varyBy=(), ttl=None, cache=None, **kwargs):
+        Base.Node._create(self, id, name, parent, **kwargs)
+        self.cache = cache or RenderCache()
+        self.key = key
+        self.varyBy = tuple(varyBy)
+        self.ttl = ttl
+
+    def useCache(self, name):
+        """
+            Shares the RenderCache registered under name with every other element using it.
+        """
+        self.cache = RenderCache.shared(name)
+
+    def setVaryBy(self, fields):
+        """
+            Sets the request fields (a list or a space separated string) the cached html varies by.
+        """
+        if isinstance(fields, basestring):
+            fields = fields.split()
+        self.varyBy = tuple(fields)
+
+    def cacheKey(self, request):
+        """
+            Returns the key the html rendered for the given request is cached under.
+        """
+        if self.key is not None:
+            return self.key(request)
+
+        fields = getattr(request, 'fields', request) or {}
+        return tuple(fields.get(field, None) for field in self.varyBy)
+
+    def toHTML(self, formatted=False, *args, **kwargs):
+        """
+            Overrides toHTML to return the html cached for the current request, rendering it on a miss.
+        """
+        request = kwargs.get('request', None)
+        if request is None:
+            context = Base.renderContext()
+            request = context and context.request
+        key = (self.id, self.name, self.prefix(), self.editable(), self.cacheKey(request), bool(formatted))
+        return self.cache.fetch(key, lambda: Base.Node.toHTML(self, formatted, *args, **kwargs), self.ttl)
+
+Factory.addProduct(KeyedCacheElement)
+
+
 class Static(Base.Node):
     """
         A signifier that the elements below will not be modified, allowing template optimizations and pre-rendering.
@@ -190,6 +190,21 @@ class Document(Base.Node):
         """
         return self.doctype + "\n" + Base.Node.toHTML(self, formatted, *args, **kwargs)
 
+    def _iterHTML(self, formatted=False, indent=None, *args, **kwargs):
+        """
+            Overrides _iterHTML to stream the doctype definition before the open tag.
+        """
+        if not formatted:
+            yield self.doctype + "\n"
+        elif indent is None:
+            yield self.doctype
+        else:
+            for fragment in Base.htmlFragments(self.doctype, formatted, indent):
+                yield fragment
+
+        for fragment in Base.Node._iterHTML(self, formatted, indent, *args, **kwargs):
+            yield fragment
+
     def add(self, childElement, ensureUnique=True):
         """
             Overrides add to place header elements and resources in the head
@@ -158,6 +158,7 @@ class ValueElement(DOM.Input):
         """
         if value != self._value:
             self._value = value
+            self.invalidate()
             self.emit('valueChanged', value)
 
     def value(self):
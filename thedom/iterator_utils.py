@@ -21,10 +21,10 @@
     Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 '''
 
+import numbers
 import types
 from types import GeneratorType
 
-from .DictUtils import OrderedDict
 from .MultiplePythonSupport import *
 
 ITERATOR_TYPES = (GeneratorType, list, tuple, set, range)
@@ -313,30 +313,103 @@ class SortedSet(set):
         return self.items.remove(item)
 
 
-class Queryable(list):
+FILTER_TYPES = ('icontains', 'gte', 'gt', 'lte', 'lt', 'contains', 'iexact', 'exact', 'istartswith', 'startswith',
+                'className')
+COMPARISONS = {'in': lambda matchAgainst, value: matchAgainst in value,
+               'contains': lambda matchAgainst, value: value in matchAgainst,
+               'gte': lambda matchAgainst, value: matchAgainst >= value,
+               'lte': lambda matchAgainst, value: matchAgainst <= value,
+               'gt': lambda matchAgainst, value: matchAgainst > value,
+               'lt': lambda matchAgainst, value: matchAgainst < value,
+               'exact': lambda matchAgainst, value: value == matchAgainst,
+               'startswith': lambda matchAgainst, value: matchAgainst.startswith(value),
+               'className': lambda matchAgainst, value: matchAgainst.__class__.__name__.lower() == value}
+
+
+def fieldValue(model, fieldNames):
     """
-        Lets you interact with a list as you would a django queryset - very useful for tests
+        Returns the value found by following fieldNames (a list of attribute or dictionary key names) from model,
+        calling it if it is a function or method
     """
-    def __init__(self, *kargs):
-        list.__init__(self, *kargs)
-        self.objects = self
+    for fieldName in fieldNames:
+        if isinstance(model, dict):
+            model = model.get(fieldName, None)
+        else:
+            model = getattr(model, fieldName, None)
 
-    def __or__(self, other):
-        inThisOnly = Queryable(other)
-        for model in self:
-            if model not in other:
-                inThisOnly.append(model)
+    if type(model) in (types.FunctionType, types.MethodType):
+        model = model()
+    return model
 
-        return inThisOnly
+def orderingKey(value):
+    """
+        Returns the key a field value is sorted on by order_by: None first, then numbers, then strings (ignoring
+        case), then any other values - so fields mixing them can be ordered on Python 3 as well
+    """
+    if value is None:
+        return (0, 0)
+    elif isinstance(value, numbers.Number):
+        return (1, value)
+    elif isinstance(value, basestring):
+        return (2, value.lower())
+    return (3, value)
+
+def compileFilter(key, value):
+    """
+        Compiles a single django style filter (such as name__icontains='tim') into a function that returns True if
+        a model matches it
+    """
+    keys = key.split("__")
+    filterType = "exact"
+    caseInsensitive = False
+    if keys[-1] in FILTER_TYPES:
+        filterType = keys.pop(-1)
+        if filterType.startswith('i'):
+            caseInsensitive = True
+            filterType = filterType[1:]
+
+    if keys and keys[-1] == "in":
+        keys.pop(-1)
+        filterType = "in"
+    if caseInsensitive:
+        value = value.lower()
+    if filterType == "className":
+        value = value.lower()
+    compare = COMPARISONS[filterType]
+
+    def matches(model):
+        matchAgainst = fieldValue(model, keys)
+        if not matchAgainst:
+            matchAgainst = ""
+        if caseInsensitive:
+            matchAgainst = matchAgainst.lower()
+        return compare(matchAgainst, value)
+    return matches
+
+def compileQuery(queryDict):
+    """
+        Compiles a dictionary of django style filters into a single function that returns True if a model matches
+        all of them
+    """
+    filters = [compileFilter(key, value) for key, value in iteritems(queryDict)]
+    if len(filters) == 1:
+        return filters[0]
 
-    def __and__(self, other):
-        inBoth = Queryable()
-        for model in self:
-            if model in other:
-                inBoth.append(model)
+    def matches(model):
+        for matchesFilter in filters:
+            if not matchesFilter(model):
+                return False
+        return True
+    return matches
 
-        return inBoth
 
+class Query(object):
+    """
+        Defines the django queryset like api shared by Queryable lists and the lazy QuerySets created from them
+    """
+    __slots__ = ()
+
+    @property
     def objects(self):
         """
             Returns itself (for django api compatibility)
@@ -349,26 +422,40 @@ class Queryable(list):
         """
         return self
 
+    def __or__(self, other):
+        inThisOnly = Queryable(other)
+        inOther = set(id(model) for model in inThisOnly)
+        for model in self:
+            if id(model) not in inOther:
+                inThisOnly.append(model)
+
+        return inThisOnly
+
+    def __and__(self, other):
+        inOther = set(id(model) for model in other)
+        return Queryable(model for model in self if id(model) in inOther)
+
     def get(self, **args):
         """
-            Gets the object that matches the specified args.
+            Gets the first object that matches the specified args, only evaluating items until it is found.
         """
-        results = self.filter(**args)
-        if results:
-            return results[0]
+        for model in self.filter(**args):
+            return model
         return None
 
     def filter(self, **args):
         """
-            Returns a queryable of items that match the specified args.
+            Returns a lazy queryset of items that match the specified args. Unlike a list, the queryset reflects
+            the source as it is when first evaluated - use results() to get a Queryable list right away.
         """
-        return self.getMatches(args)[0]
+        return QuerySet(self, (compileQuery(args), ))
 
     def exclude(self, **args):
         """
-            Returns a queryable of items that don't match the specified args.
+            Returns a lazy queryset of items that don't match the specified args.
         """
-        return self.getMatches(args)[1]
+        matches = compileQuery(args)
+        return QuerySet(self, (lambda model: not matches(model), ))
 
     @staticmethod
     def __lowerStrings__(value):
@@ -379,28 +466,10 @@ class Queryable(list):
 
     def order_by(self, *fieldNames):
         """
-            Returns a queryable that is ordered by the specified fieldNames.
+            Returns a lazy queryset that is ordered by the specified fieldNames
+            (prefixed by - to order by the field in descending order).
         """
-        order = OrderedDict()
-        reverseSort = False
-        for index, fieldName in enumerate(fieldNames):
-            if fieldName.startswith("-"):
-                reverseSort = True
-                fieldNames[index] = fieldName[1:]
-        for model in self:
-            key = []
-            for fieldName in fieldNames:
-                value = str(model.__getattribute__(fieldName))
-                if value.isdigit():
-                    value = "%04d" % int(value)
-                key.append(value)
-            key += str(model.id)
-            order["_".join(key)] = model
-        order.orderedKeys.sort(key=self.__lowerStrings__)
-        if reverseSort:
-            order.orderedKeys.reverse()
-
-        return Queryable(order.values())
+        return QuerySet(self, ordering=fieldNames)
 
     def values_list(self, columns, flat=False):
         """
@@ -420,100 +489,281 @@ class Queryable(list):
                 appendTo.append(getattr(item, column, ''))
         return resultList
 
-    def aggregate(self, **kwargs):
+    def aggregate(self, *args, **kwargs):
+        """
+            Returns a dictionary of django style aggregates (Count, Sum, Avg, Min, Max) computed over all items
+            in a single pass, for example:
+                queryable.aggregate(Sum('price'), cheapest=Min('price')) == {'price__sum': 10, 'cheapest': 1}
+        """
+        aggregates = namedAggregates(args, kwargs)
+        values = dict((aggregate.field, []) for aggregate in itervalues(aggregates))
+        collectValues(self, fieldColumns(values))
+        return reduceValues(aggregates, values)
+
+    def group_by(self, *columns):
         """
-            This is a dummy implementation of a django method so that tests will run when it is used
-            a full implementation should be created later when it is deemed necessary.
+            Returns the items grouped by the values of the given columns, allowing aggregates to be computed per group:
+                queryable.group_by('city').aggregate(total=Sum('price')) == [{'city': 'Tampa', 'total': 10}, ...]
         """
-        resultDict = {}
-        for key, method in iteritems(kwargs):
-            resultDict[key] = 0
-        return resultDict
+        return GroupBy(self, columns)
 
     def getMatches(self, queryDict):
         """
-            Returns all matches of the specified query dict.
+            Returns all matches, and all non matches, of the specified query dict.
         """
         matches = Queryable()
         nonMatches = Queryable()
-        for key, value in iteritems(queryDict):
-            keys = key.split("__")
-            filterType = "exact"
-            caseInsensitive = False
-            if keys[-1] in ['icontains', 'gte', 'gt', 'lte', 'lt', 'contains',
-                            'iexact', 'exact', 'istartswith', 'startswith',
-                            'className']:
-                filterType = keys.pop(-1)
-                if filterType.startswith('i'):
-                    caseInsensitive = True
-                    filterType = filterType[1:]
-
-            key = None
-            if keys:
-                key = keys.pop(-1)
-
-            for model in self:
-                currentModel = model
-                for modelName in keys:
-                    if isinstance(currentModel, dict):
-                        currentModel = currentModel.get(modelName, None)
-                    else:
-                        currentModel = currentModel.__getattribute__(modelName)
-
-                if key == "in":
-                    filterType = "in"
-                    matchAgainst = currentModel
-                elif key:
-                    if isinstance(currentModel, dict):
-                        matchAgainst = currentModel.get(key, None)
-                    else:
-                        matchAgainst = getattr(currentModel, key, None)
-                else:
-                    matchAgainst = currentModel
-
-                if type(matchAgainst) in (types.FunctionType, types.MethodType):
-                    matchAgainst = matchAgainst()
-
-                if not matchAgainst:
-                        matchAgainst = ""
-
-                if caseInsensitive:
-                    value = value.lower()
-                    matchAgainst = matchAgainst.lower()
-
-                matched = False
-                if filterType == "in":
-                    matched = matchAgainst in value
-                elif filterType == "contains":
-                    matched = value in matchAgainst
-                elif filterType == "gte":
-                    matched = matchAgainst >= value
-                elif filterType == "lte":
-                    matched = matchAgainst <= value
-                elif filterType == "gt":
-                    matched = matchAgainst > value
-                elif filterType == "lt":
-                    matched = matchAgainst < value
-                elif filterType == "exact":
-                    matched = value == matchAgainst
-                elif filterType == "startswith":
-                    matched = matchAgainst.startswith(value)
-                elif filterType == "className":
-                    matched = matchAgainst.__class__.__name__.lower() == value.lower()
-
-                if matched == True:
-                    if not model in nonMatches and not model in matches:
-                        matches.append(model)
-                else:
-                    if not model in nonMatches:
-                        nonMatches.append(model)
-                    if model in matches:
-                        matches.remove(model)
+        matchesQuery = compileQuery(queryDict)
+        seen = set()
+        for model in self:
+            if id(model) in seen:
+                continue
+            seen.add(id(model))
+            if matchesQuery(model):
+                matches.append(model)
+            else:
+                nonMatches.append(model)
 
         return (matches, nonMatches)
 
+
+class Aggregate(object):
+    """
+        Defines a django style aggregate of a field across all items of a Queryable, such as Sum('price').
+        Used directly, it collects the field's values.
+    """
+    __slots__ = ('field', 'fieldNames')
+    name = 'values'
+    empty = None
+
+    def __init__(self, field=None):
+        self.field = field
+        self.fieldNames = field and field.split("__") or ()
+
+    def key(self):
+        """
+            Returns the name the result is given when the aggregate is passed in without one
+        """
+        return (self.field or '') + "__" + self.name
+
+    def result(self, values):
+        """
+            Returns the aggregate of the given (non None) values
+        """
+        if not values:
+            return self.empty
+        return self.reduce(values)
+
+    def reduce(self, values):
+        """
+            Returns the aggregate of a list of values - by default the list of values itself, collecting them
+        """
+        return values
+
+
+class Count(Aggregate):
+    """
+        Counts the items with a value for field (or all items if no field is given)
+    """
+    __slots__ = ()
+    name = 'count'
+    empty = 0
+
+    def result(self, values):
+        return len(values)
+
+
+class Sum(Aggregate):
+    __slots__ = ()
+    name = 'sum'
+
+    def reduce(self, values):
+        return sum(values)
+
+
+class Avg(Aggregate):
+    __slots__ = ()
+    name = 'avg'
+
+    def reduce(self, values):
+        return float(sum(values)) / len(values)
+
+
+class Min(Aggregate):
+    __slots__ = ()
+    name = 'min'
+
+    def reduce(self, values):
+        return min(values)
+
+
+class Max(Aggregate):
+    __slots__ = ()
+    name = 'max'
+
+    def reduce(self, values):
+        return max(values)
+
+
+def namedAggregates(args, kwargs):
+    aggregates = dict((aggregate.key(), aggregate) for aggregate in args)
+    aggregates.update(kwargs)
+    return aggregates
+
+def fieldColumns(values):
+    """
+        Returns a (fieldNames, values) pair for each field of a dictionary of field to collected values
+    """
+    return [(field and field.split("__") or None, fieldValues) for field, fieldValues in iteritems(values)]
+
+def collectValues(items, columns):
+    """
+        Collects the (non None) value of each field in columns from every item, in a single pass
+    """
+    for item in items:
+        for fieldNames, fieldValues in columns:
+            value = item if fieldNames is None else fieldValue(item, fieldNames)
+            if value is not None:
+                fieldValues.append(value)
+
+def reduceValues(aggregates, values):
+    return dict((name, aggregate.result(values[aggregate.field])) for name, aggregate in iteritems(aggregates))
+
+
+class GroupBy(object):
+    """
+        The items of a Queryable grouped by the values of one or more columns
+    """
+    __slots__ = ('source', 'columns')
+
+    def __init__(self, source, columns):
+        self.source = source
+        self.columns = columns
+
+    def aggregate(self, *args, **kwargs):
+        """
+            Returns a Queryable with a dictionary per group (in the order they are first found) containing the
+            group's column values and its aggregates, all computed in a single pass over the items
+        """
+        aggregates = namedAggregates(args, kwargs)
+        fields = set(aggregate.field for aggregate in itervalues(aggregates))
+        columns = [column.split("__") for column in self.columns]
+        groups = {}
+        order = []
+        for item in self.source:
+            key = tuple(fieldValue(item, column) for column in columns)
+            group = groups.get(key, None)
+            if group is None:
+                values = dict((field, []) for field in fields)
+                group = groups[key] = (values, fieldColumns(values))
+                order.append(key)
+            collectValues((item, ), group[1])
+
+        results = Queryable()
+        for key in order:
+            result = dict(zip(self.columns, key))
+            result.update(reduceValues(aggregates, groups[key][0]))
+            results.append(result)
+        return results
+
+
+class Queryable(Query, list):
+    """
+        Lets you interact with a list as you would a django queryset - very useful for tests
+    """
+    __slots__ = ()
+
     def count(self):
         """
             Returns the number of items in the Queryable.
         """
         return len(self)
+
+
+class QuerySet(Query):
+    """
+        A lazily evaluated queryset created by filtering, excluding, or ordering a Queryable. Nothing is evaluated
+        until the results are needed: iterating over it streams the matching items from the source, while accessing
+        them in any other way evaluates (and keeps) all results.
+    """
+    __slots__ = ('source', 'predicates', 'ordering', '_results')
+
+    def __init__(self, source, predicates=(), ordering=()):
+        if type(source) == QuerySet and source._results is None:
+            predicates = source.predicates + tuple(predicates)
+            ordering = ordering or source.ordering
+            source = source.source
+        self.source = source
+        self.predicates = tuple(predicates)
+        self.ordering = tuple(ordering)
+        self._results = None
+
+    def _iterate(self):
+        predicates = self.predicates
+        seen = set()
+        for model in self.source:
+            if id(model) in seen:
+                continue
+            seen.add(id(model))
+            for predicate in predicates:
+                if not predicate(model):
+                    break
+            else:
+                yield model
+
+    def _ordered(self, models):
+        for fieldName in reversed(self.ordering):
+            descending = fieldName.startswith("-")
+            fieldNames = fieldName.lstrip("-").split("__")
+            models.sort(key=lambda model: orderingKey(fieldValue(model, fieldNames)), reverse=descending)
+        return models
+
+    def results(self):
+        """
+            Evaluates the queryset (only once) returning a Queryable list of its results
+        """
+        if self._results is None:
+            self._results = Queryable(self._ordered(list(self._iterate())))
+        return self._results
+
+    def __iter__(self):
+        if self._results is not None or self.ordering:
+            return iter(self.results())
+        return self._iterate()
+
+    def count(self):
+        """
+            Returns the number of items in the queryset.
+        """
+        return len(self.results())
+
+    def __len__(self):
+        return len(self.results())
+
+    def __getitem__(self, index):
+        return self.results()[index]
+
+    def __contains__(self, model):
+        return model in self.results()
+
+    def __nonzero__(self):
+        if self._results is not None:
+            return bool(self._results)
+        for model in self:
+            return True
+        return False
+
+    __bool__ = __nonzero__
+
+    def __eq__(self, other):
+        if isinstance(other, QuerySet):
+            other = other.results()
+        return self.results() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.results())
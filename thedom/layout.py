@@ -79,6 +79,14 @@ class Stack(Base.Node):
             return self.visibleElement().toHTML(formatted=formatted, *args, **kwargs) or ""
         return ""
 
+    def _iterHTML(self, formatted=False, indent=None, *args, **kwargs):
+        """
+            Changes _iterHTML behavior to only stream the html for the visible element
+        """
+        if self.stackElements:
+            return Base.iterRendered((self.visibleElement(), ), formatted, indent, True, args, kwargs)
+        return ()
+
     def add(self, childElement, ensureUnique=True):
         """
             Overrides add to check if the added element is the first and therefore the default
@@ -153,6 +161,16 @@ class ClientStack(DOM.Div):
             self.visibleElement().addClass("WVisible")
         return Base.Node.toHTML(self, formatted=formatted, *args, **kwargs)
 
+    def _iterHTML(self, formatted=False, indent=None, *args, **kwargs):
+        """
+            Changes _iterHTML behavior to mark the visible element before streaming
+        """
+        if self.childElements:
+            for child in self:
+                child.removeClass("WVisible")
+            self.visibleElement().addClass("WVisible")
+        return Base.Node._iterHTML(self, formatted, indent, *args, **kwargs)
+
     def add(self, childElement, ensureUnique=True):
         """
             Overrides add to check if the added element is the first and therefore the default
@@ -223,6 +241,20 @@ class Horizontal(Box):
         self._childElements = oldChildElements
         return returnValue
 
+    def _iterHTML(self, formatted=False, indent=None, *args, **kwargs):
+        """
+            Overrides _iterHTML to modify each child and force it into a horizontal layout while streaming.
+        """
+        oldChildElements = self.childElements
+        self.reset()
+        for childElement in oldChildElements:
+            self.__modifyChild__(childElement)
+        try:
+            for fragment in Box._iterHTML(self, formatted, indent, *args, **kwargs):
+                yield fragment
+        finally:
+            self._childElements = oldChildElements
+
 Factory.addProduct(Horizontal)
 
 
@@ -262,6 +294,20 @@ class Vertical(Box):
         self._childElements = oldChildElements
         return returnValue
 
+    def _iterHTML(self, formatted=False, indent=None, *args, **kwargs):
+        """
+            Overrides _iterHTML to modify each child and force it into a vertical layout while streaming.
+        """
+        oldChildElements = self.childElements
+        self.reset()
+        for childElement in oldChildElements:
+            self.__modifyChild__(childElement)
+        try:
+            for fragment in Box._iterHTML(self, formatted, indent, *args, **kwargs):
+                yield fragment
+        finally:
+            self._childElements = oldChildElements
+
 Factory.addProduct(Vertical)
 
 
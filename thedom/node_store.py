@@ -0,0 +1,499 @@
+'''
+    NodeStore.py
+
+    Defines a compact, columnar alternative to building very large trees out of Node instances: nodes are stored
+    as rows across a handful of parallel integer arrays, and rendered directly from them.
+
+    Copyright (C) 2015  Timothy Edmund Crosley
+
+    This program is free software; you can redistribute it and/or
+    modify it under the terms of the GNU General Public License
+    as published by the Free Software Foundation; either version 2
+    of the License, or (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program; if not, write to the Free Software
+    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+'''
+
+from array import array
+
+from . import Base
+from .MultiplePythonSupport import *
+from .Types import Safe, Set, StyleDict, Unsafe, WebDataType
+
+TEXT = -1 # the tag of stored text nodes
+NONE = -1 # signifies the lack of a parent, child, sibling, or string
+
+
+class NodeStore(Base.Node):
+    """
+        Holds a tree of nodes as rows across parallel arrays (tag, parent, first child, last child, next sibling,
+        id, name, attribute set, and text) as opposed to full Node instances - using a small fraction of the memory
+        for data heavy trees. Tag names, ids, names and text are interned in a shared string table, and every
+        distinct set of attributes is serialized once and shared by all the nodes that use it.
+
+        Nodes are referred to by their index (0 being the store itself) and are rendered as the content of the store.
+        StoredNode provides Node-like read access to them.
+    """
+    __slots__ = ('tags', 'parents', 'firstChildren', 'lastChildren', 'nextSiblings', 'ids', 'names',
+                 'attributeSets', 'texts', '_tagTable', '_tagIndexes', '_strings', '_stringIndexes',
+                 '_attributeTable', '_attributeIndexes')
+    allowsChildren = False
+
+    def _create(self, id=None, name=None, parent=None, **kwargs):
+        Base.Node._create(self, id, name, parent, **kwargs)
+        self.tags = array('i', (TEXT, ))
+        self.parents = array('i', (NONE, ))
+        self.firstChildren = array('i', (NONE, ))
+        self.lastChildren = array('i', (NONE, ))
+        self.nextSiblings = array('i', (NONE, ))
+        self.ids = array('i', (NONE, ))
+        self.names = array('i', (NONE, ))
+        self.attributeSets = array('i', (0, ))
+        self.texts = array('i', (NONE, ))
+
+        self._tagTable = []
+        self._tagIndexes = {}
+        self._strings = []
+        self._stringIndexes = {}
+        self._attributeTable = [((), '')]
+        self._attributeIndexes = {'': 0}
+
+    def _intern(self, string):
+        index = self._stringIndexes.get(string, None)
+        if index is None:
+            index = self._stringIndexes[string] = len(self._strings)
+            self._strings.append(string)
+        return index
+
+    def _internAttributes(self, attributes):
+        html = "".join([Base.attributeHTML(name, value) for name, value in attributes])
+        index = self._attributeIndexes.get(html, None)
+        if index is None:
+            index = self._attributeIndexes[html] = len(self._attributeTable)
+            self._attributeTable.append((tuple(attributes), html))
+        return index
+
+    def _append(self, parent, tag, text=NONE, id=NONE, name=NONE, attributeSet=0):
+        if parent is None:
+            parent = 0
+        elif isinstance(parent, StoredNode):
+            parent = parent.index
+        if self.tags[parent] == TEXT and parent != 0:
+            raise ValueError("Text nodes can not contain other nodes")
+
+        index = len(self.tags)
+        self.tags.append(tag)
+        self.parents.append(parent)
+        self.firstChildren.append(NONE)
+        self.lastChildren.append(NONE)
+        self.nextSiblings.append(NONE)
+        self.ids.append(id)
+        self.names.append(name)
+        self.attributeSets.append(attributeSet)
+        self.texts.append(text)
+
+        lastChild = self.lastChildren[parent]
+        if lastChild == NONE:
+            self.firstChildren[parent] = index
+        else:
+            self.nextSiblings[lastChild] = index
+        self.lastChildren[parent] = index
+
+        self.invalidate()
+        return index
+
+    def attributeSet(self, classes=None, style=None, attributes=None):
+        """
+            Returns the index of the interned set of attributes (see addNode), which can be passed on to addNode
+            to avoid serializing the same attributes over and over
+        """
+        attributeList = []
+        if classes:
+            attributeList.append(('class', Set(isinstance(classes, basestring) and classes.split() or classes)))
+        if style:
+            attributeList.append(('style', isinstance(style, StyleDict) and StyleDict(style) or
+                                           StyleDict.fromString(style)))
+        if attributes:
+            attributeList.extend(isinstance(attributes, dict) and iteritems(attributes) or attributes)
+
+        return self._internAttributes(attributeList) if attributeList else 0
+
+    def addNode(self, tagName, parent=None, id=None, name=None, classes=None, style=None, attributes=None,
+                selfCloses=False, attributeSet=None):
+        """
+            Adds an element, returning its index:
+                tagName - the html tag of the element ('' to only render its child nodes)
+                parent - the index (or StoredNode) of the node to add it to, if not set it is added to the store
+                id / name - the elements id and name (the prefix of the store is placed before them on render)
+                classes - a list of class names, or a string of space separated class names
+                style - a StyleDict or html style string
+                attributes - a dictionary or list of (name, value) pairs of any other attributes
+                selfCloses - if True the element is rendered as a single self closing tag
+                attributeSet - an index returned by attributeSet, used in place of classes, style and attributes
+        """
+        tagKey = (tagName, selfCloses)
+        tag = self._tagIndexes.get(tagKey, None)
+        if tag is None:
+            tag = self._tagIndexes[tagKey] = len(self._tagTable)
+            self._tagTable.append(tagKey)
+
+        if attributeSet is None:
+            attributeSet = self.attributeSet(classes, style, attributes)
+
+        return self._append(parent, tag, NONE, self._intern(id) if id else NONE, self._intern(name) if name else NONE,
+                            attributeSet)
+
+    def addText(self, text, parent=None):
+        """
+            Adds a text node, returning its index. Like TextNode.setText the text is escaped unless it is marked Safe.
+        """
+        if not text:
+            text = ""
+        elif not isinstance(text, WebDataType):
+            text = Unsafe(text)
+
+        return self._append(parent, TEXT, self._intern(unicode(text)))
+
+    def addTree(self, element, parent=None):
+        """
+            Adds a copy of the given Node (including child elements), returning its index.
+            Elements that render themselves (overriding toHTML, content, ...) are rendered once and stored as html.
+            Ids and names are copied along with the prefix they have within the element's own tree.
+        """
+        elementClass = type(element)
+        plan = Base.renderPlan(elementClass)
+        if plan[0] is Base.RENDERS_TEXT:
+            return self._append(parent, TEXT, self._intern(unicode(element._text)))
+        elif plan != (None, None, False, False):
+            return self._append(parent, TEXT, self._intern(unicode(element.toHTML())))
+
+        attributes = element._attributes or {}
+        attributeList = [(name, value) for name, value in elementClass.tagAttributes if name not in attributes]
+        attributeList.extend(iteritems(attributes))
+        index = self.addNode(element._tagName, parent, element.fullId(), element.fullName(), element._classes,
+                             element._style, attributeList, element._tagSelfCloses)
+        previous = Base.enterChildren(element)
+        try:
+            for childElement in element._childElements or ():
+                self.addTree(childElement, index)
+        finally:
+            Base.leaveChildren(previous)
+
+        return index
+
+    def setText(self, index, text):
+        """
+            Changes the text of the text node at index
+        """
+        if self.tags[index] != TEXT or not index:
+            raise ValueError("Only the text of text nodes can be set")
+        if not text:
+            text = ""
+        elif not isinstance(text, WebDataType):
+            text = Unsafe(text)
+
+        self.texts[index] = self._intern(unicode(text))
+        self.invalidate()
+
+    def setAttributes(self, index, attributes):
+        """
+            Replaces the attributes (other than id and name) of the element at index with the given dictionary
+            or list of (name, value) pairs
+        """
+        self.attributeSets[index] = self._internAttributes(isinstance(attributes, dict) and
+                                                           list(iteritems(attributes)) or attributes)
+        self.invalidate()
+
+    def node(self, index):
+        """
+            Returns a StoredNode giving Node-like access to the node at index
+        """
+        if index < 1 or index >= len(self.tags):
+            raise IndexError("No stored node at index %d" % index)
+        return StoredNode(self, index)
+
+    def childIndexes(self, index=0):
+        """
+            Returns the indexes of the child nodes of the node at index (by default the top level nodes)
+        """
+        indexes = []
+        child = self.firstChildren[index]
+        while child != NONE:
+            indexes.append(child)
+            child = self.nextSiblings[child]
+        return indexes
+
+    def storedNodes(self):
+        """
+            Returns StoredNodes for the top level nodes in the store
+        """
+        return [StoredNode(self, index) for index in self.childIndexes()]
+
+    def startTagHTML(self, index, prefix=''):
+        """
+            Returns the start tag of the element at index
+        """
+        tagName, selfCloses = self._tagTable[self.tags[index]]
+        if not tagName:
+            return ''
+
+        startTag = ["<", tagName]
+        if self.names[index] != NONE:
+            startTag.append(Base.attributeHTML('name', prefix + self._strings[self.names[index]]))
+        if self.ids[index] != NONE:
+            startTag.append(Base.attributeHTML('id', prefix + self._strings[self.ids[index]]))
+        startTag.append(self._attributeTable[self.attributeSets[index]][1])
+        startTag.append(selfCloses and ' />' or '>')
+        return "".join(startTag)
+
+    def renderStored(self, output, index=0, formatted=False, indent=None, flushAt=None, prefix=None):
+        """
+            Renders the child nodes of the node at index into the output list of html fragments, directly from the
+            arrays (see Base.renderNodes for the meaning of formatted, indent and flushAt)
+        """
+        if prefix is None:
+            prefix = self.prefix()
+        write = output.append
+        extend = output.extend
+        htmlFragments = Base.htmlFragments
+        indentation = Base.Settings.INDENTATION
+        tags = self.tags
+        firstChildren = self.firstChildren
+        nextSiblings = self.nextSiblings
+        ids = self.ids
+        names = self.names
+        attributeSets = self.attributeSets
+        texts = self.texts
+        tagTable = self._tagTable
+        strings = self._strings
+        attributeTable = self._attributeTable
+
+        idHTML = {}
+        nameHTML = {}
+        stack = []
+        current = firstChildren[index]
+        while current != NONE:
+            tag = tags[current]
+            if tag == TEXT:
+                if formatted:
+                    extend(htmlFragments(strings[texts[current]], formatted, indent))
+                else:
+                    write(strings[texts[current]])
+                hasChildren = False
+            else:
+                tagName, selfCloses = tagTable[tag]
+                hasChildren = firstChildren[current] != NONE
+                if tagName:
+                    startTag = ["<", tagName]
+                    if names[current] != NONE:
+                        html = nameHTML.get(names[current], None)
+                        if html is None:
+                            html = nameHTML[names[current]] = Base.attributeHTML('name',
+                                                                                 prefix + strings[names[current]])
+                        startTag.append(html)
+                    if ids[current] != NONE:
+                        html = idHTML.get(ids[current], None)
+                        if html is None:
+                            html = idHTML[ids[current]] = Base.attributeHTML('id', prefix + strings[ids[current]])
+                        startTag.append(html)
+                    startTag.append(attributeTable[attributeSets[current]][1])
+                    startTag.append(selfCloses and ' />' or '>')
+                    if formatted:
+                        extend(htmlFragments("".join(startTag), formatted, indent))
+                    else:
+                        write("".join(startTag))
+
+                if hasChildren:
+                    stack.append((current, indent))
+                    if formatted:
+                        indent = (indent or '') + (tagName and indentation or '')
+                    current = firstChildren[current]
+                    continue
+                elif tagName and not selfCloses:
+                    write("</" + tagName + ">")
+                    if formatted and indent:
+                        output[-1] = indent + output[-1]
+
+            current = nextSiblings[current]
+            while current == NONE and stack:
+                current, indent = stack.pop()
+                tagName, selfCloses = tagTable[tags[current]]
+                if tagName and not selfCloses:
+                    write("</" + tagName + ">")
+                    if formatted and indent:
+                        output[-1] = indent + output[-1]
+                current = nextSiblings[current]
+
+            if flushAt and len(output) >= flushAt:
+                yield
+
+    def content(self, formatted=False, *args, **kwargs):
+        """
+            Returns the html of the stored nodes
+        """
+        output = []
+        indent = (self._tagName and Base.Settings.INDENTATION or '') if formatted else None
+        for flush in self.renderStored(output, 0, formatted, indent):
+            pass
+        return formatted and "\n".join(output) or "".join(output)
+
+    def _iterContent(self, formatted=False, indent=None, *args, **kwargs):
+        """
+            Yields the html fragments of the stored nodes as they are rendered
+        """
+        if formatted:
+            indent = (indent or '') + (self._tagName and Base.Settings.INDENTATION or '')
+
+        output = []
+        for flush in self.renderStored(output, 0, formatted, indent, 64):
+            for fragment in output:
+                yield fragment
+            del output[:]
+
+        for fragment in output:
+            yield fragment
+
+
+class StoredNode(object):
+    """
+        Provides a read only, Node-like view of a single node held within a NodeStore.
+        StoredNodes are created on request and hold nothing but the store and the index of the node.
+    """
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, StoredNode) and other.store is self.store and other.index == self.index
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((id(self.store), self.index))
+
+    def __repr__(self):
+        return "StoredNode(%d, %s)" % (self.index, self.tagName or 'text')
+
+    def isText(self):
+        """
+            Returns True if the node is a text node
+        """
+        return self.store.tags[self.index] == TEXT
+
+    @property
+    def tagName(self):
+        if self.isText():
+            return ''
+        return self.store._tagTable[self.store.tags[self.index]][0]
+
+    @property
+    def id(self):
+        stringIndex = self.store.ids[self.index]
+        return stringIndex != NONE and self.store._strings[stringIndex] or None
+
+    @property
+    def name(self):
+        stringIndex = self.store.names[self.index]
+        return stringIndex != NONE and self.store._strings[stringIndex] or None
+
+    def prefix(self):
+        return self.store.prefix()
+
+    def fullId(self):
+        return self.id and self.prefix() + self.id or ''
+
+    def fullName(self):
+        return self.name and self.prefix() + self.name or ''
+
+    def _attributes(self):
+        return self.store._attributeTable[self.store.attributeSets[self.index]][0]
+
+    @property
+    def attributes(self):
+        return dict((name, value) for name, value in self._attributes() if name not in ('class', 'style'))
+
+    @property
+    def classes(self):
+        for name, value in self._attributes():
+            if name == 'class':
+                return Set(value)
+        return Set()
+
+    @property
+    def style(self):
+        for name, value in self._attributes():
+            if name == 'style':
+                return StyleDict(value)
+        return StyleDict()
+
+    def hasClass(self, className):
+        return className in self.classes
+
+    @property
+    def parent(self):
+        parent = self.store.parents[self.index]
+        return parent and StoredNode(self.store, parent) or self.store
+
+    @property
+    def childElements(self):
+        return [StoredNode(self.store, index) for index in self.store.childIndexes(self.index)]
+
+    def __iter__(self):
+        return iter(self.childElements)
+
+    def count(self):
+        return len(self.store.childIndexes(self.index))
+
+    def text(self):
+        """
+            Returns the html of a text node, or the combined html of the text nodes directly within an element
+        """
+        store = self.store
+        if self.isText():
+            return Safe(store._strings[store.texts[self.index]])
+        return Safe("".join(store._strings[store.texts[index]] for index in store.childIndexes(self.index)
+                            if store.tags[index] == TEXT))
+
+    def startTag(self):
+        if self.isText():
+            return ''
+        return self.store.startTagHTML(self.index, self.prefix())
+
+    def endTag(self):
+        if self.isText():
+            return ''
+        tagName, selfCloses = self.store._tagTable[self.store.tags[self.index]]
+        if not tagName or selfCloses:
+            return ''
+        return "</" + tagName + ">"
+
+    def content(self, formatted=False):
+        output = []
+        indent = (self.tagName and Base.Settings.INDENTATION or '') if formatted else None
+        for flush in self.store.renderStored(output, self.index, formatted, indent):
+            pass
+        return formatted and "\n".join(output) or "".join(output)
+
+    def toHTML(self, formatted=False):
+        """
+            Returns the node(including child nodes) as html
+        """
+        if self.isText():
+            return self.text()
+
+        startTag = self.startTag()
+        content = self.content(formatted)
+        endTag = self.endTag()
+        if formatted:
+            return "\n".join([html for html in (startTag, content, endTag) if html])
+        return startTag + content + endTag
@@ -20,11 +20,31 @@
     Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 '''
 
+import re
+
 from . import Base
 from .Base import Node, TextNode
 from .MultiplePythonSupport import *
 
 
+class Cursor(object):
+    """
+        The html being parsed, and the position within it - shared by every NodeTree created while parsing it
+    """
+    __slots__ = ('html', 'length', 'index')
+
+    def __init__(self, html):
+        self.html = html
+        self.length = len(html)
+        self.index = 0
+
+    def __getstate__(self):
+        return (self.html, self.length, self.index)
+
+    def __setstate__(self, state):
+        (self.html, self.length, self.index) = state
+
+
 class NodeTree(Node):
     """
         Creates a tree of webelement children from plain html
@@ -45,18 +65,18 @@ class NodeTree(Node):
                           "at character %(startChar)i must be ended before  " +
                           "'<%(forcedTag)s>' at character %(endChar)i line %(startLine)i " +
                           "resolving by closing '</%(tag)s>' tag.")
+    matchers = {} # a compiled regex per distinct set of strings passed to textTillString
 
     def __init__(self, html="", tag="", parent=None):
         Node.__init__(self, parent=parent)
         self._tagName = tag
         if not parent:
-            self._html = html
-            self._length = len(html)
-            self._index = 0
+            self._cursor = Cursor(html)
             self.startChar = 0
 
             self.parse()
         else:
+            self._cursor = parent._cursor
             self.startChar = self.index() - len(self.startTag())
 
     def __representSelf__(self):
@@ -66,37 +86,25 @@ class NodeTree(Node):
         """
             Returns the supplied html
         """
-        if self.parent:
-            return self.parent.html()
-
-        return self._html
+        return self._cursor.html
 
     def length(self):
         """
             Returns a length of the html
         """
-        if self.parent:
-            return self.parent.length()
-
-        return self._length
+        return self._cursor.length
 
     def index(self):
         """
             Returns the index within the html it is parsing
         """
-        if self.parent:
-            return self.parent.index()
-
-        return self._index
+        return self._cursor.index
 
     def setIndex(self, index):
         """
             Sets the parser index
         """
-        if self.parent:
-            return self.parent.setIndex(index)
-        else:
-            self._index = index
+        self._cursor.index = index
 
     def parse(self):
         """
@@ -127,7 +135,8 @@ class NodeTree(Node):
                         continue
                 elif endedBy == "<" or not tagName:
                     self.add(TextNode("&lt;" + tagName))
-                    self.prev()
+                    if endedBy:
+                        self.prev()
                     continue
 
                 if((tagName in self.forceTagEndBefore and not self._tagName in ["html", '']) or
@@ -135,7 +144,7 @@ class NodeTree(Node):
 
                     print(self.incorrectPlacement % {'tag':self._tagName,
                                                      'startChar':self.startChar,
-                                                     'startLine':len(self.html()[:self.startChar].split("\n")),
+                                                     'startLine':self.html().count("\n", 0, self.startChar) + 1,
                                                      'forcedTag':tagName,
                                                      'endChar':self.index()})
                     if not tagName in self.closeIfNested:
@@ -173,7 +182,7 @@ class NodeTree(Node):
                     print(self.missedEndTag % {'startTag':self._tagName,
                                                'endTag':endTag.strip(),
                                                'startChar':self.startChar,
-                                               'startLine':len(self.html()[:self.startChar].split("\n")),
+                                               'startLine':self.html().count("\n", 0, self.startChar) + 1,
                                                'endChar':self.index()})
                     self.setIndex(prevChar)
                     break
@@ -230,62 +239,64 @@ class NodeTree(Node):
         """
             Returns true if there is more html to parse
         """
-        return self.index() < self.length()
+        return self._cursor.index < self._cursor.length
 
     def next(self, numberOfCharacters=1):
         """
             Increments the index by number of characters
         """
-        self.setIndex(self.index() + numberOfCharacters)
-        return self.index()
+        self._cursor.index += numberOfCharacters
+        return self._cursor.index
 
     def prev(self, numberOfCharacters=1):
         """
             Deincrements the index by number of characters
         """
-        self.setIndex(self.index() - numberOfCharacters)
-        return self.index()
+        self._cursor.index -= numberOfCharacters
+        return self._cursor.index
 
     def character(self):
         """
             Returns the character in character at the current index
         """
-        return self.html()[self.index()]
+        return self._cursor.html[self._cursor.index]
 
     def popCharacter(self):
         """
             removes the current character then moves to the next one, returning the current character
         """
-        char = self.html()[self.index()]
-        self.next()
+        cursor = self._cursor
+        char = cursor.html[cursor.index]
+        cursor.index += 1
         return char
 
     def characters(self, numberOfCharacters):
         """
             Returns characters at index + number of characters
         """
-        return self.html()[self.index():self.index() + numberOfCharacters]
+        cursor = self._cursor
+        return cursor.html[cursor.index:cursor.index + numberOfCharacters]
 
     def textTillString(self, strings):
         """
-            Returns all text till it encounters the given string (or one of the given strings)
+            Returns all text till it encounters the given string (or one of the given strings), where the first
+            position any of them occur at wins - and of the strings occurring there, the one given first
         """
-        if type(strings) in (str, unicode):
-            strings = [strings]
-
-        text = ""
-        matchedString = ""
-
-        while self.more():
-            for string in strings:
-                if self.characters(len(string)) == string:
-                    matchedString = string
-                    break
-
-            if matchedString:
-                break
-
-            text += self.popCharacter()
-
-        self.next(len(matchedString))
-        return (text, matchedString)
+        key = strings if isinstance(strings, basestring) else tuple(strings)
+        matcher = self.matchers.get(key)
+        if matcher is None:
+            if isinstance(strings, basestring):
+                strings = (strings, )
+            matcher = self.matchers[key] = re.compile("|".join(re.escape(string) for string in strings if string) or
+                                                      "(?!)")
+
+        cursor = self._cursor
+        match = matcher.search(cursor.html, cursor.index)
+        if match is None:
+            text = cursor.html[cursor.index:]
+            cursor.index = cursor.length
+            return (text, "")
+
+        text = cursor.html[cursor.index:match.start()]
+        cursor.index = match.end()
+        return (text, match.group())
@@ -0,0 +1,235 @@
+'''
+    Precompile.py
+
+    Walks a directory of shpaml and xml templates, compiling each into a python module (see Compile.toPython) in
+    parallel - skipping templates that have not changed since they were last compiled - and writes an import map
+    from template paths to the generated modules.
+
+        python -m thedom.Precompile templates/ --output compiled/
+
+    Copyright (C) 2015  Timothy Edmund Crosley
+
+    This program is free software; you can redistribute it and/or
+    modify it under the terms of the GNU General Public License
+    as published by the Free Software Foundation; either version 2
+    of the License, or (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program; if not, write to the Free Software
+    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+'''
+
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import sys
+import tempfile
+
+import thedom
+
+from . import Compile, UITemplate
+from .MultiplePythonSupport import *
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    ProcessPoolExecutor = None
+
+TEMPLATE_TYPES = {'.shpaml':UITemplate.SHPAML, '.xml':UITemplate.XML}
+DEFAULT_FACTORY = "thedom.All.Factory"
+MANIFEST = ".precompiled.json" # records the source hash / mtime of every compiled template
+IMPORT_MAP = "templates.json" # maps every template path to the module compiled from it
+PACKAGE_INIT = "# WARNING: DON'T EDIT AUTO-GENERATED\n"
+
+
+def loadFactory(factory):
+    """
+        Returns the factory found at the given dotted path (such as 'thedom.All.Factory').
+    """
+    (moduleName, attribute) = factory.rsplit(".", 1)
+    return getattr(importlib.import_module(moduleName), attribute)
+
+def sourceHash(path):
+    """
+        Returns a hash of the contents of the file at path.
+    """
+    with open(path, 'rb') as openFile:
+        return hashlib.sha1(openFile.read()).hexdigest()
+
+def findTemplates(directory):
+    """
+        Returns the path (relative to directory, '/' separated) of every template file below it in sorted order.
+    """
+    templates = []
+    for path, directories, files in os.walk(directory):
+        directories.sort()
+        for fileName in sorted(files):
+            if os.path.splitext(fileName)[1] in TEMPLATE_TYPES:
+                templates.append(os.path.relpath(os.path.join(path, fileName), directory).replace(os.sep, "/"))
+    return templates
+
+def moduleName(templatePath):
+    """
+        Returns the dotted module name (relative to the output package) the template is compiled to.
+    """
+    parts = os.path.splitext(templatePath)[0].split("/")
+    return ".".join(part.replace("-", "_").replace(".", "_") for part in parts)
+
+def currentUmask():
+    """
+        Returns the umask of the process (which can only be read by setting it)
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+def writeFile(path, text):
+    """
+        Atomically writes text to path, creating any missing package directories along the way.
+    """
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    (handle, temporaryFile) = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(handle, 'wb') as openFile:
+            openFile.write(text.encode('utf8'))
+        os.chmod(temporaryFile, 0o666 & ~currentUmask()) # mkstemp creates files only their owner can read
+        if os.path.exists(path) and sys.platform.startswith('win'):
+            os.remove(path)
+        os.rename(temporaryFile, path)
+    except:
+        if os.path.exists(temporaryFile):
+            os.remove(temporaryFile)
+        raise
+
+def compileTemplate(job):
+    """
+        Compiles a single (sourcePath, outputPath, factory) job, returning (sourcePath, error) where error is None
+        if the template compiled successfully. Runs inside of the worker processes.
+    """
+    (sourcePath, outputPath, factory) = job
+    try:
+        formatType = TEMPLATE_TYPES[os.path.splitext(sourcePath)[1]]
+        python = Compile.toPython(UITemplate.fromFile(sourcePath, formatType), loadFactory(factory))
+        writeFile(outputPath, python)
+    except Exception as error:
+        return (sourcePath, "%s: %s" % (type(error).__name__, error))
+    return (sourcePath, None)
+
+def precompile(directory, outputDirectory, factory=DEFAULT_FACTORY, jobs=None, force=False):
+    """
+        Compiles every template below directory into a python module below outputDirectory:
+            factory - the dotted path of the factory to compile the templates against
+            jobs - the number of processes to compile with (defaults to the number of cpus)
+            force - if True every template is recompiled, even if it has not changed
+        Returns a dictionary of the 'compiled', 'skipped' and 'removed' template paths, and the 'failed' ones
+        mapped to their error.
+    """
+    manifestPath = os.path.join(outputDirectory, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifestPath) and not force:
+        with open(manifestPath) as openFile:
+            manifest = json.load(openFile)
+
+    signature = "%s %s %s" % (thedom.__version__, factory, Compile.factorySignature(loadFactory(factory)))
+    templates = manifest.get('templates', {}) if manifest.get('signature') == signature else {}
+
+    results = {'compiled':[], 'skipped':[], 'removed':[], 'failed':{}}
+    modules = {}
+    pending = {}
+    for templatePath in findTemplates(directory):
+        module = moduleName(templatePath)
+        if module in modules:
+            results['failed'][templatePath] = "Compiles to the same module as %s" % modules[module]
+            continue
+        modules[module] = templatePath
+
+        sourcePath = os.path.join(directory, templatePath)
+        outputPath = os.path.join(outputDirectory, *module.split(".")) + ".py"
+        mtime = os.stat(sourcePath).st_mtime
+        previous = templates.get(templatePath)
+        if previous and os.path.exists(outputPath):
+            if previous['mtime'] == mtime:
+                results['skipped'].append(templatePath)
+                continue
+
+            digest = sourceHash(sourcePath)
+            if previous['hash'] == digest:
+                previous['mtime'] = mtime
+                results['skipped'].append(templatePath)
+                continue
+        else:
+            digest = sourceHash(sourcePath)
+        templates[templatePath] = {'mtime':mtime, 'hash':digest, 'module':module}
+        pending[sourcePath] = (templatePath, outputPath)
+
+    work = [(sourcePath, outputPath, factory) for sourcePath, (templatePath, outputPath) in sorted(iteritems(pending))]
+    if ProcessPoolExecutor and len(work) > 1 and jobs != 1:
+        with ProcessPoolExecutor(jobs) as executor:
+            compiled = list(executor.map(compileTemplate, work))
+    else:
+        compiled = [compileTemplate(job) for job in work]
+
+    for sourcePath, error in compiled:
+        templatePath = pending[sourcePath][0]
+        if error:
+            results['failed'][templatePath] = error
+            del templates[templatePath]
+        else:
+            results['compiled'].append(templatePath)
+
+    for templatePath in sorted(templates):
+        module = templates[templatePath]['module']
+        if modules.get(module) != templatePath:
+            del templates[templatePath]
+            outputPath = os.path.join(outputDirectory, *module.split(".")) + ".py"
+            if module not in modules and os.path.exists(outputPath):
+                os.remove(outputPath)
+            results['removed'].append(templatePath)
+
+    packages = set([outputDirectory])
+    for template in itervalues(templates):
+        packages.update(os.path.join(outputDirectory, *template['module'].split(".")[:index])
+                        for index in range(1, template['module'].count(".") + 1))
+    for package in packages:
+        if not os.path.exists(os.path.join(package, "__init__.py")):
+            writeFile(os.path.join(package, "__init__.py"), PACKAGE_INIT)
+
+    importMap = dict((templatePath, template['module']) for templatePath, template in iteritems(templates))
+    writeFile(os.path.join(outputDirectory, IMPORT_MAP), json.dumps(importMap, indent=4, sort_keys=True))
+    writeFile(manifestPath, json.dumps({'signature':signature, 'templates':templates}, indent=4, sort_keys=True))
+    return results
+
+def main(argv=None):
+    """
+        Runs the precompiler from the command line, returning the exit code.
+    """
+    parser = argparse.ArgumentParser(description="Precompiles shpaml and xml templates into python modules")
+    parser.add_argument('directory', help="the directory to search for templates")
+    parser.add_argument('-o', '--output', help="the package directory to write compiled templates to "
+                                               "(defaults to a 'compiled' directory inside of the template directory)")
+    parser.add_argument('-f', '--factory', default=DEFAULT_FACTORY,
+                        help="the dotted path of the factory to compile against (defaults to %s)" % DEFAULT_FACTORY)
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="the number of processes to compile with (defaults to the number of cpus)")
+    parser.add_argument('--force', action='store_true', help="recompile every template, even if unchanged")
+    arguments = parser.parse_args(argv)
+
+    results = precompile(arguments.directory, arguments.output or os.path.join(arguments.directory, "compiled"),
+                         arguments.factory, arguments.jobs, arguments.force)
+    for templatePath, error in sorted(iteritems(results['failed'])):
+        sys.stderr.write("Failed to compile %s - %s\n" % (templatePath, error))
+    print("Compiled %d, skipped %d, removed %d and failed %d templates" %
+          (len(results['compiled']), len(results['skipped']), len(results['removed']), len(results['failed'])))
+    return results['failed'] and 1 or 0
+
+if __name__ == "__main__":
+    sys.exit(main())
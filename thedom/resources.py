@@ -88,17 +88,17 @@ Factory.addProduct(ResourceFile)
 
 class ScriptContainer(DOM.Script):
     """
-        All scripts should be stored in a Script Box object
+        All scripts should be stored in a Script Box object. The language and type attributes are declared as
+        tagAttributes, so attributes only holds them once they are overridden.
     """
     __slots__ = ('_scripts', 'usedObjects')
     displayable = False
+    tagAttributes = (('language', 'javascript'), ('type', 'text/javascript'))
     properties = DOM.Script.properties.copy()
     properties['script'] = {'action':'addScript'}
 
     def _create(self, id=None, name=None, parent=None, **kwargs):
         Base.Node._create(self)
-        self.attributes['language'] = 'javascript'
-        self.attributes['type']  = 'text/javascript'
         self._scripts = []
 
     def content(self, formatted=False, *args, **kwargs):
@@ -115,6 +115,7 @@ class ScriptContainer(DOM.Script):
         """
         if not script in self._scripts:
             self._scripts.append(script)
+            self.invalidate()
 
     def removeScript(self, script):
         """
@@ -122,6 +123,7 @@ class ScriptContainer(DOM.Script):
         """
         if script in self._scripts:
             self._scripts.remove(script)
+            self.invalidate()
 
     def shown(self):
         """
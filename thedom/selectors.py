@@ -0,0 +1,532 @@
+'''
+    Selectors.py
+
+    Finds elements within a Node tree using css selectors (for example: "form#main .WError > input[name=foo]").
+    Selectors are compiled once into matching functions, and candidate elements are looked up from id, name, class,
+    and tag name indexes kept up to date on the root of each tree as elements are added, removed, and changed.
+
+    Copyright (C) 2015  Timothy Edmund Crosley
+
+    This program is free software; you can redistribute it and/or
+    modify it under the terms of the GNU General Public License
+    as published by the Free Software Foundation; either version 2
+    of the License, or (at your option) any later version.
+
+    This program is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with this program; if not, write to the Free Software
+    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+'''
+
+import re
+import weakref
+
+from .MultiplePythonSupport import *
+
+ID = 'id'
+NAME = 'name'
+CLASS = 'class'
+TAG = 'tag'
+
+COMPILED_CACHE_SIZE = 256
+_compiled = {}
+indexing = False # set while any tree is indexed, until then elements don't need to report changes
+_indexed = {} # id(root) -> weak reference to the root of every indexed tree
+REPORTED_ATTRIBUTES = ('id', 'name', '_tagName')
+
+_TOKEN = re.compile(r'''\s*(?P<combinator>[>+~,])\s*|(?P<descendant>\s+)|(?P<universal>\*)|(?P<tag>[\w-]+)|
+                        \#(?P<id>[\w-]+)|\.(?P<className>[\w-]+)|
+                        \[\s*(?P<attribute>[\w-]+)\s*(?:(?P<operator>[~^$*|]?=)\s*
+                        (?:"(?P<doubleQuoted>[^"]*)"|'(?P<singleQuoted>[^']*)'|(?P<value>[^\]\s]+))\s*)?\]''',
+                    re.VERBOSE)
+_OPERATORS = {'=': lambda actual, value: actual == value,
+              '~=': lambda actual, value: value in actual.split(),
+              '^=': lambda actual, value: bool(value) and actual.startswith(value),
+              '$=': lambda actual, value: bool(value) and actual.endswith(value),
+              '*=': lambda actual, value: bool(value) and value in actual,
+              '|=': lambda actual, value: actual == value or actual.startswith(value + '-')}
+
+
+def attribute(element, name):
+    """
+        Returns the value of the named attribute as it will be rendered for the element, or None if it is not set
+    """
+    if name == 'id':
+        return element.id
+    elif name == 'name':
+        return element.name
+    elif name == 'class':
+        return element._classes and " ".join(element._classes) or None
+
+    if element._attributes:
+        value = element._attributes.get(name, None)
+        if value is not None:
+            return value
+    for attributeName, value in element.tagAttributes:
+        if attributeName == name:
+            return value
+    return None
+
+
+class NodeIndex(object):
+    """
+        Indexes every element within a tree by its id, name, classes, and tag name, allowing elements to be looked up
+        without walking the tree. Elements that change report it (through Node.invalidate, when their id, name, or
+        tag name is assigned - see reportAssignments, or when they are placed within another element) and are
+        re-indexed on the next lookup, every element found is checked against its current values as well.
+    """
+    __slots__ = ('root', 'keys', 'elements', 'changed', 'stale')
+
+    def __init__(self, root):
+        indexed(root)
+        self.root = root
+        self.keys = {}
+        self.elements = {}
+        self.changed = {}
+        self.stale = True
+
+    def __getstate__(self):
+        return {'root': self.root}
+
+    def __setstate__(self, state):
+        self.__init__(state['root'])
+
+    @staticmethod
+    def elementKeys(element):
+        keys = []
+        if element.id:
+            keys.append((ID, element.id))
+        if element.name:
+            keys.append((NAME, element.name))
+        if element._tagName:
+            keys.append((TAG, element._tagName))
+        if element._classes:
+            keys.extend((CLASS, className) for className in element._classes)
+        return tuple(keys)
+
+    @staticmethod
+    def hasKey(element, key):
+        """
+            Returns True if the element currently has the given id, name, tag name, or class
+        """
+        kind, value = key
+        if kind == ID:
+            return element.id == value
+        elif kind == NAME:
+            return element.name == value
+        elif kind == TAG:
+            return element._tagName == value
+        return bool(element._classes) and value in element._classes
+
+    def _add(self, element):
+        if id(element) in self.keys:
+            self._remove(element)
+        keys = self.elementKeys(element)
+        self.keys[id(element)] = (element, keys)
+        for key in keys:
+            self.elements.setdefault(key, {})[id(element)] = element
+
+    def _remove(self, element):
+        element, keys = self.keys.pop(id(element), (element, ()))
+        for key in keys:
+            elements = self.elements.get(key, None)
+            if elements is not None:
+                elements.pop(id(element), None)
+                if not elements:
+                    del self.elements[key]
+
+    def add(self, element):
+        """
+            Indexes the element along with all elements it contains
+        """
+        elements = [element]
+        while elements:
+            element = elements.pop()
+            if element._index is not None:
+                element._index = None # no longer the root of a tree of its own
+                unindexed(element)
+            self._add(element)
+            element.watchChanges()
+            if element._childElements:
+                elements.extend(element._childElements)
+
+    def remove(self, element):
+        """
+            Removes the element along with all elements it contains from the index
+        """
+        elements = [element]
+        while elements:
+            element = elements.pop()
+            self._remove(element)
+            self.changed.pop(id(element), None)
+            if element._childElements:
+                elements.extend(element._childElements)
+
+    def update(self):
+        """
+            Brings the index up to date, re-indexing changed elements (or the whole tree if it is stale)
+        """
+        if self.stale:
+            self.keys.clear()
+            self.elements.clear()
+            self.changed.clear()
+            self.stale = False
+            if self.root._childElements:
+                for childElement in self.root._childElements:
+                    self.add(childElement)
+        elif self.changed:
+            changed = self.changed
+            self.changed = {}
+            for element in itervalues(changed):
+                if element is self.root:
+                    continue
+                elif root(element) is not self.root:
+                    self.remove(element)
+                elif id(element) not in self.keys:
+                    self.add(element)
+                elif self.keys[id(element)][1] != self.elementKeys(element):
+                    self._add(element)
+
+    def find(self, key, scope=None):
+        """
+            Returns the elements within scope (the whole tree if not provided) indexed under key
+            in the order they appear in the tree
+        """
+        self.update()
+        if scope is None:
+            scope = self.root
+        candidates = self.elements.get(key, None)
+        if not candidates:
+            return []
+        hasKey = self.hasKey
+        return inOrder([element for element in itervalues(candidates) if hasKey(element, key)], scope)
+
+    def count(self, key):
+        self.update()
+        return len(self.elements.get(key, ()))
+
+
+def root(element):
+    """
+        Returns the top-most element of the tree that element is a part of
+        (elements that are still being created or unpickled may not have a parent assigned yet)
+    """
+    parent = getattr(element, 'parent', None)
+    while parent is not None and parent is not element:
+        element = parent
+        parent = getattr(element, 'parent', None)
+    return element
+
+def reportingSetter(slot):
+    assign = slot.__set__
+    def report(element, value):
+        assign(element, value)
+        if indexing and (getattr(element, 'parent', None) is not None or
+                         getattr(element, '_index', None) is not None):
+            changed(element)
+    return report
+
+def reportAssignments(elementClass):
+    """
+        Makes assigning the id, name, or tag name of any element mark it as changed, by wrapping the slots the class
+        defines for them in properties (reading them stays as fast as reading the slot). Node applies this to
+        itself when it is defined.
+    """
+    for name in REPORTED_ATTRIBUTES:
+        slot = vars(elementClass).get(name, None)
+        if slot is not None and not isinstance(slot, property):
+            setattr(elementClass, name, property(slot.__get__, reportingSetter(slot)))
+
+def indexed(treeRoot):
+    """
+        Records that the tree under treeRoot is indexed, so elements report changes until its index is dropped
+    """
+    global indexing
+    key = id(treeRoot)
+    _indexed[key] = weakref.ref(treeRoot, lambda reference: _dropped(key, reference))
+    indexing = True
+
+def unindexed(treeRoot):
+    """
+        Records that the index of the tree under treeRoot was dropped, once no tree is indexed elements stop
+        reporting changes
+    """
+    _dropped(id(treeRoot))
+
+def _dropped(key, reference=None):
+    global indexing
+    if reference is None or _indexed.get(key, None) is reference:
+        _indexed.pop(key, None)
+    indexing = bool(_indexed)
+
+def index(element):
+    """
+        Returns the (up to date) index of the tree that element is a part of, building it if needed
+    """
+    treeRoot = root(element)
+    if treeRoot._index is None:
+        treeRoot._index = NodeIndex(treeRoot)
+    treeRoot._index.update()
+    return treeRoot._index
+
+def _treeIndex(element):
+    treeRoot = root(element)
+    return getattr(treeRoot, '_index', None)
+
+def detached(element):
+    """
+        Updates the index of the tree the element is about to be removed from
+    """
+    treeIndex = _treeIndex(element)
+    if treeIndex is not None and not treeIndex.stale:
+        treeIndex.remove(element)
+
+def changed(element, childElements=False):
+    """
+        Marks the element as changed (or newly placed within the tree) so it will be re-indexed on the next lookup,
+        or the whole tree when the element's child elements where replaced
+    """
+    treeIndex = _treeIndex(element)
+    if treeIndex is not None:
+        if childElements:
+            treeIndex.stale = True
+        elif not treeIndex.stale:
+            treeIndex.changed[id(element)] = element
+
+def placed(element):
+    """
+        Marks the element as newly placed within another element, dropping its own index right away as it is no
+        longer the root of a tree (changes made while it is placed are only reported to the tree it is placed in)
+    """
+    if getattr(element, '_index', None) is not None:
+        element._index = None
+        unindexed(element)
+    changed(element)
+
+def position(element, scope):
+    """
+        Returns the path of child indexes leading from scope to element,
+        or None if the element is not (or no longer) placed within scope
+    """
+    path = []
+    while element is not scope:
+        parent = element.parent
+        if parent is None or parent is element or not parent._childElements:
+            return None
+        try:
+            path.append(parent._childElements.index(element))
+        except ValueError:
+            return None
+        element = parent
+    path.reverse()
+    return path
+
+def inOrder(elements, scope):
+    """
+        Returns the given elements that are placed within scope, in the order they appear
+    """
+    positioned = []
+    for element in elements:
+        if element is scope:
+            continue
+        path = position(element, scope)
+        if path is not None:
+            positioned.append((path, id(element), element))
+    positioned.sort()
+    return [element for path, elementId, element in positioned]
+
+def walk(scope):
+    """
+        Yields every element placed within scope, in the order they appear
+    """
+    elements = list(reversed(scope._childElements or ()))
+    while elements:
+        element = elements.pop()
+        yield element
+        if element._childElements:
+            elements.extend(reversed(element._childElements))
+
+
+def _parse(selector):
+    groups = []
+    compounds = []
+    compound = None
+    combinator = None
+    offset = 0
+    selector = selector.strip()
+    while offset < len(selector):
+        token = _TOKEN.match(selector, offset)
+        if not token:
+            raise ValueError("Invalid css selector %r at position %d" % (selector, offset))
+        offset = token.end()
+        kind = token.lastgroup
+        if kind in ('combinator', 'descendant'):
+            if compound is None:
+                raise ValueError("Invalid css selector %r at position %d" % (selector, offset))
+            if kind == 'descendant':
+                combinator = ' '
+            elif token.group('combinator') == ',':
+                groups.append(compounds)
+                compounds = []
+                combinator = None
+            else:
+                combinator = token.group('combinator')
+            compound = None
+            continue
+
+        if compound is None:
+            compound = {'tag': None, 'id': None, 'classes': [], 'attributes': []}
+            compounds.append((combinator, compound))
+        if kind == 'tag':
+            compound['tag'] = token.group('tag')
+        elif kind == 'id':
+            compound['id'] = token.group('id')
+        elif kind == 'className':
+            compound['classes'].append(token.group('className'))
+        elif token.group('attribute'):
+            value = token.group('value')
+            if value is None:
+                value = token.group('doubleQuoted')
+            if value is None:
+                value = token.group('singleQuoted')
+            compound['attributes'].append((token.group('attribute'), token.group('operator'), value))
+
+    if compound is None:
+        raise ValueError("Invalid css selector %r" % selector)
+    groups.append(compounds)
+    return groups
+
+def _compileCompound(compound):
+    tests = []
+    tag = compound['tag']
+    if tag:
+        tests.append(lambda element: element._tagName == tag)
+    elementId = compound['id']
+    if elementId:
+        tests.append(lambda element: element.id == elementId)
+    for className in compound['classes']:
+        tests.append(lambda element, className=className: element._classes is not None and
+                                                          className in element._classes)
+    for name, operator, value in compound['attributes']:
+        if operator is None:
+            tests.append(lambda element, name=name: attribute(element, name) is not None)
+        else:
+            tests.append(lambda element, name=name, compare=_OPERATORS[operator], value=value:
+                         _compareAttribute(element, name, compare, value))
+
+    if not tests:
+        return lambda element: True
+    if len(tests) == 1:
+        return tests[0]
+
+    def matches(element):
+        for test in tests:
+            if not test(element):
+                return False
+        return True
+    return matches
+
+def _compareAttribute(element, name, compare, value):
+    actual = attribute(element, name)
+    if actual is None:
+        return False
+    return compare(unicode(actual), value)
+
+def _previousSiblings(element):
+    parent = element.parent
+    if parent is None or parent is element or not parent._childElements:
+        return ()
+    siblings = parent._childElements
+    try:
+        return reversed(siblings[:siblings.index(element)])
+    except ValueError:
+        return ()
+
+def _compileSelector(compounds):
+    matchers = [_compileCompound(compound) for combinator, compound in compounds]
+    combinators = [combinator for combinator, compound in compounds]
+
+    def matches(element, position):
+        if not matchers[position](element):
+            return False
+        if position == 0:
+            return True
+
+        combinator = combinators[position]
+        if combinator in (' ', '>'):
+            parent = element.parent
+            while parent is not None and parent is not element:
+                if matches(parent, position - 1):
+                    return True
+                if combinator == '>':
+                    return False
+                element, parent = parent, parent.parent
+            return False
+
+        for sibling in _previousSiblings(element):
+            if matches(sibling, position - 1):
+                return True
+            if combinator == '+':
+                return False
+        return False
+
+    last = len(matchers) - 1
+    return lambda element: matches(element, last)
+
+def _indexKey(compound):
+    if compound['id']:
+        return (ID, compound['id'])
+    for name, operator, value in compound['attributes']:
+        if name in ('id', 'name') and operator == '=' and value:
+            return (name == 'id' and ID or NAME, value)
+    if compound['classes']:
+        return [(CLASS, className) for className in compound['classes']]
+    if compound['tag']:
+        return (TAG, compound['tag'])
+    return None
+
+def compileSelector(selector):
+    """
+        Returns a compiled version of the css selector: a tuple containing a (matches, indexKey) pair per
+        comma separated selector, where matches is a function that returns True if an element matches it.
+        Compiled selectors are cached, so compiling a selector again is free.
+    """
+    compiled = _compiled.get(selector, None)
+    if compiled is None:
+        compiled = tuple((_compileSelector(compounds), _indexKey(compounds[-1][1])) for compounds in _parse(selector))
+        if len(_compiled) >= COMPILED_CACHE_SIZE:
+            _compiled.clear()
+        _compiled[selector] = compiled
+    return compiled
+
+def select(scope, selector):
+    """
+        Returns all elements within scope that match the css selector, in the order they appear
+    """
+    compiled = compileSelector(selector)
+    if not scope._childElements:
+        return []
+
+    if [indexKey for matches, indexKey in compiled if indexKey is None]:
+        matchers = [matches for matches, indexKey in compiled]
+        return [element for element in walk(scope) if any(matches(element) for matches in matchers)]
+
+    treeIndex = index(scope)
+    candidates = {}
+    for matches, indexKey in compiled:
+        if type(indexKey) == list:
+            indexKey = min(indexKey, key=treeIndex.count)
+        for element in itervalues(treeIndex.elements.get(indexKey, {})):
+            if id(element) not in candidates and matches(element):
+                candidates[id(element)] = element
+    return inOrder(itervalues(candidates), scope)
+
+def find(scope, key):
+    """
+        Returns all elements within scope indexed under key (for example ('class', 'WError')), in the order they appear
+    """
+    return index(scope).find(key, scope)
@@ -109,6 +109,11 @@ LINE_METHODS = [
         RAW_TEXT,
         ]
 
+# a single regex that tries every line method in order, the named group that matched tells which one applies
+LINE_DISPATCH = re.compile('|'.join('(?P<%s>%s)' % (method.__name__, method.regex.pattern)
+                                    for method in LINE_METHODS))
+LINE_METHOD_NAMES = dict((method.__name__, method) for method in LINE_METHODS)
+
 
 def convert_shpaml_tree(in_body):
     """Returns HTML as a basestring.
@@ -165,10 +170,8 @@ def stream(append, prefix_lines):
 
 def convert_line(line):
     prefix, line = find_indentation(line.strip())
-    for method in LINE_METHODS:
-        m = method.regex.match(line)
-        if m:
-            return prefix + method(m)
+    method = LINE_METHOD_NAMES[LINE_DISPATCH.match(line).lastgroup]
+    return prefix + method(method.regex.match(line))
 
 def apply_jquery_sugar(markup):
     if DIV_SHORTCUT.match(markup):
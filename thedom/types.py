@@ -21,23 +21,52 @@
     Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 '''
 
+from .MultiplePythonSupport import *
 
-import cgi
+ESCAPE_CACHE_SIZE = 4096
+ESCAPE_CACHE_MAX_LENGTH = 128
+_escapedText = {}
+_escapedAttributes = {}
 
-from .MultiplePythonSupport import *
+
+def escape(text, quote=False):
+    """
+        Returns text with the characters that have special meaning in html (&, <, >, and " when quote is True)
+        replaced by their entities, marked as Safe so it will not be escaped again.
+        Short values, that tend to be repeated often (class names, styles, labels, ...), are remembered in a bounded
+        cache so they only need to be escaped once.
+    """
+    if isinstance(text, WebDataType) and text.escaped:
+        return text
+    cache = _escapedAttributes if quote else _escapedText
+    html = cache.get(text, None)
+    if html is not None:
+        return html
+
+    html = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    if quote:
+        html = html.replace('"', '&quot;')
+    html = Safe(html)
+    if len(text) <= ESCAPE_CACHE_MAX_LENGTH:
+        if len(cache) >= ESCAPE_CACHE_SIZE:
+            cache.clear()
+        cache[text] = html
+    return html
 
 
 class WebDataType(object):
     __slots__ = ()
+    escaped = False
 
     def __unicode__(self):
-        return cgi.escape(unicode(self))
+        return escape(unicode(self))
 
     def __str__(self):
         return self.__unicode__()
 
 class SafeDataType(WebDataType):
     __slots__ = ()
+    escaped = True
 
     def __unicode__(self):
         return unicode(self)
@@ -47,17 +76,17 @@ class SafeDataType(WebDataType):
 
 class Unsafe(unicode, WebDataType):
     """
-        Explicitly marks a string as being unsafe so it will be cgi escaped
+        Explicitly marks a string as being unsafe so it will be html escaped
     """
     def __unicode__(self):
-        return cgi.escape(self)
+        return escape(self)
 
     def __str__(self):
         return self.__unicode__()
 
 class Safe(unicode, SafeDataType):
     """
-        Explicitly marks a string as safe so it will not be cgi escaped
+        Explicitly marks a string as safe so it will not be html escaped
     """
     def __unicode__(self):
         return self
@@ -69,7 +98,7 @@ class Set(set, WebDataType):
     __slots__ = ()
 
     def __unicode__(self):
-        return cgi.escape(" ".join(self))
+        return escape(" ".join(self))
 
     def __str__(self):
         return self.__unicode__()
@@ -79,11 +108,17 @@ class StyleDict(dict, WebDataType):
     __slots__ = ()
 
     def __unicode__(self):
-        return cgi.escape(";".join([unicode(dictKey) + ':' + unicode(dictValue) for dictKey, dictValue in iteritems(self)]))
+        return escape(self.toString())
 
     def __str__(self):
         return self.__unicode__()
-    
+
+    def toString(self):
+        """
+            Returns the style definitions as they would appear in a style attribute, before being escaped
+        """
+        return ";".join([unicode(dictKey) + ':' + unicode(dictValue) for dictKey, dictValue in iteritems(self)])
+
     @classmethod
     def fromString(cls, styleString):
         styleDict = cls()
@@ -117,7 +152,7 @@ class Bool(SafeDataType):
         return self.boolean
 
     def __unicode__(self):
-        return cgi.escape(unicode(self.boolean).lower())
+        return escape(unicode(self.boolean).lower())
 
     def __str__(self):
         return self.__unicode__()
@@ -20,7 +20,10 @@
     Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 '''
 
-from xml.dom import minidom
+import numbers
+import re
+from collections import OrderedDict
+from xml.parsers import expat
 
 from . import shpaml
 from .Base import Node
@@ -31,11 +34,43 @@ from .StringUtils import interpretFromString
 XML = 0
 SHPAML = 1
 
+# Anything that would need the xml parser to interpret it stops shpaml templates from being built directly
+NOT_SHPAML_TEXT = re.compile(u'[<&\r\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]|]]>')
+XML_NAME = re.compile(r'[A-Za-z_:][-A-Za-z0-9_.:]*$')
+XML_ATTRIBUTE = re.compile(r'[ \t]+([A-Za-z_:][-A-Za-z0-9_.:]*)=(?:"([^"]*)"|\'([^\']*)\')')
+
+# Binary bundle format (see toBundle)
+BINARY_MAGIC = b"TDTB\x01"
+(VALUE_STRING, VALUE_TRUE, VALUE_FALSE, VALUE_NONE, VALUE_INTEGER, VALUE_FLOAT) = range(6)
+VALUE_KINDS = {True:VALUE_TRUE, False:VALUE_FALSE, None:VALUE_NONE}
+CONSTANT_VALUES = {VALUE_TRUE:True, VALUE_FALSE:False, VALUE_NONE:None}
+
+def valueKey(value):
+    """
+        Returns a hashable stand in for a property value: the value itself, or its repr if it can not be hashed
+        (such as a list or dict built in code)
+    """
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+def propertiesKey(properties):
+    """
+        Returns a type aware key for a property tuple, so True, 1 and 1.0 are never treated as the same value
+    """
+    return tuple((name, type(value), valueKey(value)) for name, value in properties)
+
+
 class Template(object):
     """
-        A very memory efficient representation of a user interface template
+        A very memory efficient representation of a user interface template. Templates are treated as immutable
+        (child elements and properties given as lists are stored as tuples): their structural hash is computed once
+        and cached, so structurally identical subtrees can be shared (see internTemplate) and compared in constant
+        time.
     """
-    __slots__ = ('create', 'accessor', 'id', 'name', 'childElements', 'properties')
+    __slots__ = ('create', 'accessor', 'id', 'name', 'childElements', 'properties', '_hash')
 
     class Rendered(Node):
         pass
@@ -45,31 +80,48 @@ class Template(object):
         self.accessor = accessor
         self.id = id
         self.name = name
-        self.childElements = childElements
-        self.properties = properties
+        self.childElements = None if childElements is None else tuple(childElements)
+        self.properties = tuple(properties)
+        self._hash = None
 
     def __getstate__(self):
         return (self.create, self.accessor, self.id, self.name, self.childElements, self.properties)
 
     def __setstate__(self, state):
-        (self.create, self.accessor, self.id, self.name, self.childElements, self.properties) = state
+        self.__init__(*state)
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash((self.create, self.accessor, self.id, self.name, self.childElements or (),
+                               propertiesKey(self.properties)))
+        return self._hash
 
     def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Template):
+            return False
+        if self._hash is not None and other._hash is not None and self._hash != other._hash:
+            return False
+
         if (self.create != other.create or self.accessor != other.accessor or self.id != other.id or
-            self.name != other.name or self.properties != other.properties):
+            self.name != other.name or propertiesKey(self.properties) != propertiesKey(other.properties)):
             return False
 
         if self.childElements:
-            if len(self.childElements) != len(other.childElements):
+            if not other.childElements or len(self.childElements) != len(other.childElements):
                 return False
             for child, otherChild in zip(self.childElements, other.childElements):
-                if not child.__eq__(otherChild):
+                if child is not otherChild and not child == otherChild:
                     return False
         elif other.childElements:
             return False
 
         return True
-    
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
     def build(self, factory):
         templateElement = self.Rendered()
 
@@ -87,13 +139,319 @@ class Template(object):
         return templateElement
 
 
+class TemplateBuilder(object):
+    """
+        Builds a Template tree straight from the events of an expat parser, without creating an intermediate DOM.
+        The resulting tree is identical to one created by walking the minidom representation of the same xml.
+    """
+    __slots__ = ('elements', 'root', 'text', 'inCData', 'values')
+
+    def __init__(self):
+        self.elements = []
+        self.root = None
+        self.text = []
+        self.inCData = False
+        self.values = {}
+
+    def createParser(self):
+        """
+            Returns an expat parser that reports its events to the builder.
+        """
+        parser = expat.ParserCreate()
+        parser.ordered_attributes = True
+        parser.buffer_text = True
+        parser.StartElementHandler = self.startElement
+        parser.EndElementHandler = self.endElement
+        parser.CharacterDataHandler = self.characters
+        parser.CommentHandler = self.separator
+        parser.ProcessingInstructionHandler = self.separator
+        parser.StartCdataSectionHandler = self.startCData
+        parser.EndCdataSectionHandler = self.endCData
+        return parser
+
+    def parse(self, xml):
+        """
+            Parses an xml string, returning the Template representing its root element.
+        """
+        self.createParser().Parse(xml, True)
+        return self.root
+
+    def parseFile(self, openFile):
+        """
+            Parses an open xml file, returning the Template representing its root element.
+        """
+        self.createParser().ParseFile(openFile)
+        return self.root
+
+    def flushText(self):
+        """
+            Adds the text collected since the last element boundary to the current element (if it isn't whitespace).
+        """
+        if self.text:
+            text = "".join(self.text).strip()
+            self.text = []
+            if text and self.elements:
+                self.elements[-1][5].append(text)
+
+    def startElement(self, create, attributes):
+        self.flushText()
+        if self.elements:
+            self.elements[-1][6] = True
+
+        accessor = id = name = ""
+        properties = []
+        values = self.values
+        for index in range(0, len(attributes), 2):
+            (attribute, value) = (attributes[index], attributes[index + 1])
+            if attribute == 'accessor':
+                accessor = value
+            elif attribute == 'id':
+                id = value
+            elif attribute == 'name':
+                name = value
+            else:
+                interpreted = values.get(value, values)
+                if interpreted is values:
+                    interpreted = values[value] = interpretFromString(value)
+                properties.append((attribute, interpreted))
+
+        self.elements.append([create, accessor, id, name, tuple(properties), [], False])
+
+    def endElement(self, create):
+        self.flushText()
+        (create, accessor, id, name, properties, childElements, hasChildNodes) = self.elements.pop()
+        template = Template(create, accessor, id, name, tuple(childElements) if hasChildNodes else None, properties)
+        if self.elements:
+            self.elements[-1][5].append(template)
+        elif self.root is None:
+            self.root = template
+
+    def characters(self, text):
+        if self.elements:
+            self.elements[-1][6] = True
+            if not self.inCData:
+                self.text.append(text)
+
+    def separator(self, *args):
+        self.flushText()
+        if self.elements:
+            self.elements[-1][6] = True
+
+    def startCData(self):
+        self.separator()
+        self.inCData = True
+
+    def endCData(self):
+        self.inCData = False
+
+
+class SHPAMLBuilder(TemplateBuilder):
+    """
+        Builds a Template tree straight from the indentation structure of a shpaml template - producing the same
+        tree as converting it to xml (see shpaml.convert_text) and parsing that, without the intermediate markup.
+        Templates only xml can give meaning to (raw markup, entities, malformed tags) raise Unsupported.
+    """
+    __slots__ = ('lines', 'tags')
+
+    class Unsupported(Exception):
+        pass
+
+    def __init__(self):
+        TemplateBuilder.__init__(self)
+        self.lines = 0
+        self.tags = {}
+
+    def parse(self, shpamlTemplate):
+        """
+            Parses a shpaml string, returning the Template representing its root element.
+        """
+        if not isinstance(shpamlTemplate, unicode):
+            try:
+                shpamlTemplate = shpamlTemplate.decode('utf8')
+            except UnicodeDecodeError:
+                raise self.Unsupported()
+        if NOT_SHPAML_TEXT.search(shpamlTemplate):
+            raise self.Unsupported()
+
+        lines = []
+        for line in shpamlTemplate.rstrip().split('\n'):
+            line = line.rstrip()
+            content = line.lstrip(' \t')
+            lines.append((line[:len(line) - len(content)] if content else '', content))
+        self.addLines(lines, 0, len(lines))
+        self.addText('\n')
+        if self.root is None:
+            raise self.Unsupported()
+        return self.root
+
+    def addLines(self, lines, index, end):
+        """
+            Adds lines[index:end] following the same block structure as shpaml.indent_lines.
+        """
+        while index < end:
+            (prefix, line) = lines[index]
+            if not line:
+                self.newLine()
+                index += 1
+                continue
+
+            blockEnd = index + 1
+            while blockEnd < end and (not lines[blockEnd][1] or len(lines[blockEnd][0]) > len(prefix)):
+                blockEnd += 1
+            while blockEnd - 1 > index and not lines[blockEnd - 1][1]:
+                blockEnd -= 1
+
+            if blockEnd == index + 1:
+                if line == shpaml.PASS_SYNTAX:
+                    pass
+                elif line.startswith(shpaml.FLUSH_LEFT_SYNTAX):
+                    self.newLine()
+                    self.addText(line[len(shpaml.FLUSH_LEFT_SYNTAX):])
+                elif line.startswith(shpaml.FLUSH_LEFT_EMPTY_LINE):
+                    self.newLine()
+                else:
+                    self.newLine()
+                    self.addText(prefix)
+                    self.addLine(line)
+            elif shpaml.RAW_HTML.regex.match(line):
+                self.newLine()
+                self.addText(prefix + line)
+                self.addLines(lines, index + 1, blockEnd)
+            elif shpaml.COMMENT_SYNTAX.match(line):
+                pass
+            else:
+                verbatim = shpaml.VERBATIM_SYNTAX.match(line)
+                self.newLine()
+                self.addText(prefix)
+                self.startTag(verbatim.group(1).rstrip() if verbatim else line, True)
+                if verbatim:
+                    for childPrefix, childLine in lines[index + 1:blockEnd]:
+                        self.newLine()
+                        self.addText(childLine and childPrefix + childLine)
+                else:
+                    self.addLines(lines, index + 1, blockEnd)
+                self.newLine()
+                self.addText(prefix)
+                self.endElement(None)
+            index = blockEnd
+
+    def addLine(self, line):
+        """
+            Adds a single line using the line method shpaml.convert_line would use to convert it.
+        """
+        match = shpaml.LINE_DISPATCH.match(line.strip())
+        method = match.lastgroup
+        group = match.re.groupindex[method] + 1
+        if method == 'OUTER_CLOSING_TAG':
+            self.startTag(match.group(group), True)
+            self.addLine(match.group(group + 1))
+            self.endElement(None)
+        elif method == 'TEXT_ENCLOSING_TAG':
+            self.startTag(match.group(group), True)
+            self.addText(match.group(group + 1))
+            self.endElement(None)
+        elif method == 'SELF_CLOSING_TAG':
+            self.startTag(match.group(group).strip(), False)
+            self.endElement(None)
+        else:
+            self.addText(match.group(group).rstrip())
+
+    def startTag(self, markup, sugar):
+        """
+            Starts the element described by the markup of a shpaml tag (see shpaml.apply_jquery).
+        """
+        tag = self.tags.get((markup, sugar))
+        if tag is None:
+            tag = self.tags[(markup, sugar)] = self.parseTag(markup, sugar)
+        if not self.elements and self.root is not None:
+            raise self.Unsupported()
+        self.startElement(*tag)
+
+    def parseTag(self, markup, sugar):
+        """
+            Returns the (create, attributes) of the xml start tag shpaml would produce for the markup.
+        """
+        if sugar and shpaml.DIV_SHORTCUT.match(markup):
+            markup = 'div' + markup
+        tag = shpaml.TAG_WHITESPACE_ATTRS.match(markup)
+        if not tag:
+            raise self.Unsupported()
+
+        (create, whitespace, attributeText) = tag.groups()
+        (create, rest) = shpaml.tag_and_rest(create)
+        (ids, classes, accessors) = shpaml.ids_and_classes(rest)
+        attributeText = whitespace + shpaml.AUTO_QUOTE_ATTRIBUTES(attributeText)
+        if classes:
+            attributeText += ' class="%s"' % classes
+        if ids:
+            attributeText += ' id="%s"' % ids
+        if accessors:
+            attributeText += ' accessor="%s"' % accessors
+
+        attributes = []
+        position = 0
+        for attribute in XML_ATTRIBUTE.finditer(attributeText):
+            if attribute.start() != position:
+                raise self.Unsupported()
+            (name, doubleQuoted, singleQuoted) = attribute.groups()
+            value = doubleQuoted if doubleQuoted is not None else singleQuoted
+            if '\t' in value or name in attributes[::2]:
+                raise self.Unsupported()
+            attributes.extend((name, value))
+            position = attribute.end()
+        if not XML_NAME.match(create) or attributeText[position:].strip(' \t'):
+            raise self.Unsupported()
+        return (create, attributes)
+
+    def newLine(self):
+        """
+            Starts a new line of (virtual) shpaml output.
+        """
+        if self.lines:
+            self.addText('\n')
+        self.lines += 1
+
+    def addText(self, text):
+        if not text:
+            return
+        if not self.elements and text.strip(' \t\n'):
+            raise self.Unsupported()
+        self.characters(text)
+
+
+def internTemplate(template, table=None):
+    """
+        Returns the template with every structurally identical subtree (and property tuple) replaced by a single
+        shared instance:
+            table - pass in a dictionary to share subtrees across every template interned with it
+    """
+    if table is None:
+        table = {}
+    if isinstance(template, basestring):
+        return table.setdefault(template, template)
+
+    properties = table.setdefault(propertiesKey(template.properties), template.properties)
+    changed = properties is not template.properties
+    childElements = template.childElements
+    if childElements:
+        childElements = tuple([internTemplate(child, table) for child in childElements])
+        changed = changed or any(child is not original for child, original in zip(childElements,
+                                                                                   template.childElements))
+    if changed:
+        template = Template(template.create, template.accessor, template.id, template.name, childElements,
+                            properties)
+    return table.setdefault(template, template)
+
 def fromFile(templateFile, formatType=SHPAML):
     """
         Returns a parsable dictionary representation of the interface:
             templateFile - a file containing an xml representation of the interface
     """
     if formatType == XML:
-        return __createTemplateFromXML(minidom.parse(templateFile).childNodes[0])
+        if hasattr(templateFile, 'read'):
+            return TemplateBuilder().parseFile(templateFile)
+        with open(templateFile, 'rb') as openFile:
+            return TemplateBuilder().parseFile(openFile)
     elif formatType == SHPAML:
         with open(templateFile) as openFile:
             return fromSHPAML(openFile.read())
@@ -103,45 +461,312 @@ def fromXML(xml):
         Returns a parsable dictionary representation of the interface:
             xml - a string containing an xml representation of the interface
     """
-    xmlStructure = minidom.parseString(xml)
-    return __createTemplateFromXML(xmlStructure.childNodes[0])
+    return TemplateBuilder().parse(xml)
 
 def fromSHPAML(shpamlTemplate):
     """
         Returns a parsable dictionary representation of the interface:
             shpaml - a string containing a shpaml representation of the interface
     """
-    xmlStructure = minidom.parseString(shpaml.convert_text(shpamlTemplate))
-    return __createTemplateFromXML(xmlStructure.childNodes[0])
+    try:
+        return SHPAMLBuilder().parse(shpamlTemplate)
+    except SHPAMLBuilder.Unsupported:
+        return TemplateBuilder().parse(shpaml.convert_text(shpamlTemplate))
 
-def __createTemplateFromXML(xml):
+def writeVarints(values, output):
     """
-        Parses an xml string converting it to an easily parse-able python template representation:
-            xml - a string containing an xml representation of the interface
+        Appends a section to the output bytearray made up of its byte length followed by every unsigned integer in
+        values, each stored using 7 bits per byte (with the high bit set on every byte but the last).
+    """
+    section = bytearray()
+    append = section.append
+    for value in values:
+        while value > 127:
+            append((value & 127) | 128)
+            value >>= 7
+        append(value)
+
+    length = len(section)
+    while length > 127:
+        output.append((length & 127) | 128)
+        length >>= 7
+    output.append(length)
+    output.extend(section)
+
+def readVarints(data, offset):
+    """
+        Reads the section written by writeVarints found at offset in data (a bytearray), returning
+        (values, offsetAfterSection).
+    """
+    length = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        length |= (byte & 127) << shift
+        shift += 7
+        if byte < 128:
+            break
+
+    section = data[offset:offset + length]
+    if not section or max(section) < 128:
+        return (list(section), offset + length)
+
+    values = []
+    append = values.append
+    value = shift = 0
+    for byte in section:
+        if byte < 128:
+            append(value | (byte << shift) if shift else byte)
+            value = shift = 0
+        else:
+            value |= (byte & 127) << shift
+            shift += 7
+    return (values, offset + length)
+
+
+class BundleWriter(object):
+    """
+        Serializes Template trees into the compact binary bundle format read by TemplateBundle. After BINARY_MAGIC
+        every part is a varint section (see writeVarints):
+            strings - the length (in characters) of every string, followed by a section holding the byte length of
+                      their utf8 representation, and then every string utf8 encoded back to back
+            values - a varint per value: its kind (see VALUE_KINDS) in the low 3 bits and its string index or zigzag
+                     encoded integer above that
+            properties - the length of every property tuple followed by its (name value, value) index pairs
+            shapes - the (create, accessor, id, name, properties) indexes of every distinct element
+            entries - the name value of every template and where its section starts relative to the end of entries
+            templates - a section per template holding its tree flattened in postorder: a text child is (0, value)
+                        and an element is (kind, shape) where kind is 1 for childElements=None and 2 + the number of
+                        children otherwise
+        Strings, values, property tuples and element shapes are each only stored once no matter how often they
+        are used.
+    """
+    __slots__ = ('strings', 'values', 'properties', 'shapes', 'entries')
+
+    def __init__(self):
+        self.strings = OrderedDict()
+        self.values = OrderedDict()
+        self.properties = OrderedDict()
+        self.shapes = OrderedDict()
+        self.entries = []
+
+    def string(self, string):
+        if not isinstance(string, unicode):
+            string = string.decode('utf8')
+        index = self.strings.get(string)
+        if index is None:
+            index = self.strings[string] = len(self.strings)
+        return index
+
+    def value(self, value):
+        key = (type(value), value)
+        index = self.values.get(key)
+        if index is None:
+            if value is True or value is False or value is None:
+                encoded = VALUE_KINDS[value]
+            elif isinstance(value, basestring):
+                encoded = self.string(value) << 3 | VALUE_STRING
+            elif isinstance(value, numbers.Integral):
+                encoded = (value * 2 if value >= 0 else -value * 2 - 1) << 3 | VALUE_INTEGER
+            elif isinstance(value, float):
+                encoded = self.string(repr(value)) << 3 | VALUE_FLOAT
+            else:
+                raise ValueError("A %s value (%r) can not be stored in a binary template bundle" %
+                                 (type(value).__name__, value))
+            index = self.values[key] = (len(self.values), encoded)
+        return index[0]
+
+    def propertyTuple(self, properties):
+        key = tuple((self.value(name), self.value(value)) for name, value in properties)
+        index = self.properties.get(key)
+        if index is None:
+            index = self.properties[key] = len(self.properties)
+        return index
+
+    def shape(self, template):
+        key = (self.value(template.create), self.value(template.accessor), self.value(template.id),
+               self.value(template.name), self.propertyTuple(template.properties))
+        index = self.shapes.get(key)
+        if index is None:
+            index = self.shapes[key] = len(self.shapes)
+        return index
+
+    def flatten(self, template, output):
+        if not isinstance(template, Template):
+            output.extend((0, self.value(template)))
+            return
+
+        if template.childElements is None:
+            kind = 1
+        else:
+            kind = len(template.childElements) + 2
+            for child in template.childElements:
+                self.flatten(child, output)
+        output.extend((kind, self.shape(template)))
+
+    def add(self, name, template):
+        """
+            Adds a named template to the bundle.
+        """
+        flattened = []
+        self.flatten(template, flattened)
+        self.entries.append((self.value(name), flattened))
+
+    def toBinary(self):
+        """
+            Returns the bytes representing every template added to the bundle.
+        """
+        output = bytearray(BINARY_MAGIC)
+        writeVarints([len(string) for string in self.strings], output)
+        encoded = u"".join(self.strings).encode('utf8')
+        writeVarints((len(encoded), ), output)
+        output.extend(encoded)
+
+        writeVarints([value for index, value in itervalues(self.values)], output)
+
+        properties = []
+        for pairs in self.properties:
+            properties.append(len(pairs))
+            for pair in pairs:
+                properties.extend(pair)
+        writeVarints(properties, output)
+
+        shapes = []
+        for shape in self.shapes:
+            shapes.extend(shape)
+        writeVarints(shapes, output)
+
+        templates = bytearray()
+        names = []
+        for name, flattened in self.entries:
+            names.extend((name, len(templates)))
+            writeVarints(flattened, templates)
+        writeVarints(names, output)
+        output.extend(templates)
+        return bytes(output)
+
+
+class TemplateBundle(object):
+    """
+        A read only mapping of names to the Templates stored in a binary bundle (see toBundle). The shared tables
+        are decoded when the bundle is loaded, but each template is only rebuilt the first time it is accessed.
+    """
+    __slots__ = ('data', 'values', 'shapes', 'entries', 'templates')
+
+    def __init__(self, data):
+        data = bytearray(data)
+        if data[:len(BINARY_MAGIC)] != bytearray(BINARY_MAGIC):
+            raise ValueError("The data passed in is not a binary template bundle")
+
+        (lengths, offset) = readVarints(data, len(BINARY_MAGIC))
+        ((size, ), offset) = readVarints(data, offset)
+        text = data[offset:offset + size].decode('utf8')
+        strings = []
+        position = 0
+        for length in lengths:
+            strings.append(text[position:position + length])
+            position += length
+
+        (encoded, offset) = readVarints(data, offset + size)
+        values = self.values = []
+        for value in encoded:
+            kind = value & 7
+            if kind == VALUE_STRING:
+                values.append(strings[value >> 3])
+            elif kind == VALUE_INTEGER:
+                value >>= 3
+                values.append(value >> 1 if not value & 1 else -((value + 1) >> 1))
+            elif kind == VALUE_FLOAT:
+                values.append(float(strings[value >> 3]))
+            else:
+                values.append(CONSTANT_VALUES[kind])
+
+        (encoded, offset) = readVarints(data, offset)
+        properties = []
+        index = 0
+        while index < len(encoded):
+            end = index + 1 + encoded[index] * 2
+            properties.append(tuple([(values[encoded[pair]], values[encoded[pair + 1]])
+                                     for pair in range(index + 1, end, 2)]))
+            index = end
+
+        (encoded, offset) = readVarints(data, offset)
+        self.shapes = [(values[encoded[index]], values[encoded[index + 1]], values[encoded[index + 2]],
+                        values[encoded[index + 3]], properties[encoded[index + 4]])
+                       for index in range(0, len(encoded), 5)]
+
+        (encoded, offset) = readVarints(data, offset)
+        self.entries = OrderedDict((values[encoded[index]], offset + encoded[index + 1])
+                                   for index in range(0, len(encoded), 2))
+        self.data = data
+        self.templates = {}
+
+    def __getitem__(self, name):
+        template = self.templates.get(name)
+        if template is None:
+            template = self.templates[name] = self.build(readVarints(self.data, self.entries[name])[0])
+        return template
+
+    def build(self, flattened):
+        """
+            Rebuilds a template from its flattened (postorder) representation.
+        """
+        values = self.values
+        shapes = self.shapes
+        stack = []
+        append = stack.append
+        for index in range(0, len(flattened), 2):
+            kind = flattened[index]
+            if not kind:
+                append(values[flattened[index + 1]])
+                continue
+
+            if kind == 1:
+                childElements = None
+            elif kind == 2:
+                childElements = ()
+            else:
+                childElements = tuple(stack[2 - kind:])
+                del stack[2 - kind:]
+            (create, accessor, id, name, properties) = shapes[flattened[index + 1]]
+            append(Template(create, accessor, id, name, childElements, properties))
+        return stack[0]
+
+    def get(self, name, default=None):
+        if name in self.entries:
+            return self[name]
+        return default
+
+    def keys(self):
+        return list(self.entries)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def toBundle(templates):
+    """
+        Returns a compact binary representation of a dictionary of names to Templates, loadable using TemplateBundle
+    """
+    writer = BundleWriter()
+    for name, template in sorted(iteritems(templates)):
+        writer.add(name, template)
+    return writer.toBinary()
+
+def toBinary(template):
+    """
+        Returns a compact binary representation of a single Template, loadable using fromBinary
+    """
+    return toBundle({"":template})
+
+def fromBinary(data):
+    """
+        Returns the Template stored in the binary representation created by toBinary
     """
-    if isinstance(xml, minidom.Text):
-        return xml.nodeValue.strip()
-
-    (create, attributes, children) = (xml.tagName, xml.attributes, xml.childNodes)
-    accessor = attributes.get('accessor', "")
-    id = attributes.get('id', "")
-    name = attributes.get('name', "")
-    if accessor:
-        accessor = accessor.value
-        attributes.removeNamedItem('accessor')
-    if id:
-        id = id.value
-        attributes.removeNamedItem('id')
-    if name:
-        name = name.value
-        attributes.removeNamedItem('name')
-
-    properties = tuple(((attribute[0], interpretFromString(attribute[1])) for attribute in attributes.items()))
-    if children:
-        childNodes = (__createTemplateFromXML(node) for node in children if
-                      node.__class__ in (minidom.Element, minidom.Text))
-        childElements = tuple(child for child in childNodes if child)
-    else:
-        childElements = None
-
-    return Template(create, accessor, id, name, childElements, properties)
+    return TemplateBundle(data)[""]